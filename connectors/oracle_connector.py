@@ -4,9 +4,20 @@ The function ``get_oracle_connection`` expects a mapping with the keys
 ``user``, ``password``, ``host``, ``port`` and ``service`` and will raise a
 ``KeyError`` when any of them are missing.  Connection errors are logged before
 being re-raised so callers get useful diagnostics.
+
+Connections get an output type handler (see :func:`make_output_type_handler`)
+so values arrive in the shape the comparator normalizes fastest: non-integer
+``NUMBER`` columns as ``float`` (or ``str``), dates as native ``datetime`` and
+LOBs as ``str``/``bytes`` instead of LOB locators that need one round trip per
+value. It is configured through ``source.output_types`` in the YAML config.
+
+``create_oracle_pool`` returns an :class:`OraclePool` backed by the driver's
+session pool, configured through ``source.pool``.
 """
 
-from typing import Optional
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator, Optional
 
 from utils.logger import debug_log
 
@@ -16,9 +27,54 @@ except ImportError:
     raise ImportError("Please install 'oracledb' via pip: pip install oracledb")
 
 
-def get_oracle_connection(env: dict, config: Optional[dict] = None):
-    """Return an Oracle :class:`oracledb.Connection` instance."""
+NUMBER_MODES = ("float", "str", "decimal")
+
+
+def make_output_type_handler(
+    numbers: str = "float",
+    lobs_as_values: bool = True,
+    key_columns: Iterable[str] = (),
+) -> Callable:
+    """Return an ``outputtypehandler`` converting values while fetching.
+
+    ``numbers`` selects how ``NUMBER`` columns with a fractional scale (or no
+    declared precision) are returned: ``"float"`` binds them as
+    ``BINARY_DOUBLE``, ``"str"`` as text and ``"decimal"`` as
+    :class:`decimal.Decimal`. Integer columns (scale ``0``) and the
+    *key_columns* (compared case-insensitively) keep the driver's default,
+    whole numbers as Python ``int``. Keys declared as plain ``NUMBER`` then
+    stay exact and are not written as ``"123.0"``. With ``lobs_as_values``
+    CLOB, NCLOB and BLOB columns are fetched inline as ``str``/``bytes``.
+    """
+    if numbers not in NUMBER_MODES:
+        raise ValueError(f"Unsupported Oracle number mode: {numbers}")
+    number_type = {"float": float, "str": str, "decimal": Decimal}[numbers]
+    lob_types = {
+        oracledb.DB_TYPE_CLOB: oracledb.DB_TYPE_LONG,
+        oracledb.DB_TYPE_NCLOB: oracledb.DB_TYPE_LONG_NVARCHAR,
+        oracledb.DB_TYPE_BLOB: oracledb.DB_TYPE_LONG_RAW,
+    }
+    keys = {c.upper() for c in key_columns}
+
+    def handler(cursor, metadata):
+        type_code = metadata.type_code
+        if type_code is oracledb.DB_TYPE_NUMBER:
+            if metadata.scale == 0 and metadata.precision:
+                return None
+            if metadata.name.upper() in keys:
+                return None
+            if number_type is str:
+                return cursor.var(str, 60, arraysize=cursor.arraysize)
+            return cursor.var(number_type, arraysize=cursor.arraysize)
+        if lobs_as_values and type_code in lob_types:
+            return cursor.var(lob_types[type_code], arraysize=cursor.arraysize)
+        # DATE and TIMESTAMP columns already arrive as ``datetime``.
+        return None
 
+    return handler
+
+
+def _env_dsn(env: dict):
     try:
         user = env["user"]
         password = env["password"]
@@ -27,11 +83,103 @@ def get_oracle_connection(env: dict, config: Optional[dict] = None):
         service = env["service"]
     except KeyError as exc:  # pragma: no cover - defensive branch
         raise KeyError(f"Missing Oracle environment key: {exc}") from exc
+    return user, password, oracledb.makedsn(host, port, service_name=service)
+
+
+def _configured_handler(config: Optional[dict]) -> Optional[Callable]:
+    output_types = ((config or {}).get("source") or {}).get("output_types") or {}
+    if not output_types.get("enabled", True):
+        return None
+    source = (config or {}).get("source") or {}
+    pk = (config or {}).get("primary_key")
+    key_columns = [source.get("columns", {}).get(pk, pk)] if pk else []
+    return make_output_type_handler(
+        output_types.get("numbers", "float"),
+        output_types.get("lobs_as_values", True),
+        key_columns,
+    )
+
+
+def get_oracle_connection(env: dict, config: Optional[dict] = None):
+    """Return an Oracle :class:`oracledb.Connection` instance."""
 
-    dsn = oracledb.makedsn(host, port, service_name=service)
+    user, password, dsn = _env_dsn(env)
     debug_log(f"Connecting to Oracle with DSN: {dsn}", config, level="low")
     try:
-        return oracledb.connect(user=user, password=password, dsn=dsn)
+        conn = oracledb.connect(user=user, password=password, dsn=dsn)
     except Exception as exc:  # pragma: no cover - connection failure
         debug_log(f"Oracle connection failed: {exc}", config, level="low")
         raise
+    handler = _configured_handler(config)
+    if handler is not None:
+        conn.outputtypehandler = handler
+    return conn
+
+
+class OraclePool:
+    """Thin wrapper over :func:`oracledb.create_pool`.
+
+    The driver pool bounds sessions, waits for a free one and pings sessions
+    idle longer than ``ping_interval``. The wrapper installs the output type
+    handler on each acquired connection and mirrors
+    :class:`connectors.pool.ConnectionPool` so callers treat both alike.
+    """
+
+    def __init__(self, pool, handler: Optional[Callable] = None):
+        self.pool = pool
+        self.handler = handler
+
+    def acquire(self, timeout: Optional[float] = None):
+        # The wait is bounded by the pool's ``wait_timeout``.
+        conn = self.pool.acquire()
+        if self.handler is not None:
+            conn.outputtypehandler = self.handler
+        return conn
+
+    def release(self, conn, *, discard: bool = False) -> None:
+        if discard:
+            self.pool.drop(conn)
+        else:
+            self.pool.release(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator:
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    def close(self) -> None:
+        self.pool.close(force=True)
+
+
+def create_oracle_pool(env: dict, config: Optional[dict] = None) -> OraclePool:
+    """Return an :class:`OraclePool` sized by ``source.pool``.
+
+    ``max_size`` bounds the sessions, ``min_size`` is opened up front and
+    ``check_after`` maps to the driver's ``ping_interval``.
+    """
+    cfg = ((config or {}).get("source") or {}).get("pool") or {}
+    user, password, dsn = _env_dsn(env)
+    max_size = max(1, int(cfg.get("max_size", 4)))
+    debug_log(f"Creating Oracle pool ({max_size} sessions) for DSN: {dsn}", config, level="low")
+    try:
+        pool = oracledb.create_pool(
+            user=user,
+            password=password,
+            dsn=dsn,
+            min=min(int(cfg.get("min_size", 1)), max_size),
+            max=max_size,
+            increment=1,
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=int(cfg.get("timeout", 300) * 1000),
+            ping_interval=int(cfg.get("check_after", 30)),
+        )
+    except Exception as exc:  # pragma: no cover - connection failure
+        debug_log(f"Oracle pool creation failed: {exc}", config, level="low")
+        raise
+    return OraclePool(pool, _configured_handler(config))
@@ -0,0 +1,150 @@
+"""A small thread-safe connection pool with health checks.
+
+``oracledb`` ships its own session pool (see
+:func:`connectors.oracle_connector.create_oracle_pool`) but ``pyodbc`` only
+offers driver-manager pooling without a bound or validation, so
+:func:`connectors.sqlserver_connector.create_sqlserver_pool` builds on
+:class:`ConnectionPool`. Both expose ``acquire``/``release``/``connection``
+and ``close`` so callers treat them alike.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from utils.logger import debug_log
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection becomes available in time."""
+
+
+class ConnectionPool:
+    """Hand out at most ``max_size`` connections created by *factory*.
+
+    Idle connections are reused most-recently-released first. One that sat
+    idle for ``check_after`` seconds is validated with *health_check* before
+    reuse and replaced if the check fails or raises. Released connections
+    are rolled back so no open transaction leaks to the next user.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        *,
+        max_size: int = 4,
+        health_check: Optional[Callable[[Any], bool]] = None,
+        check_after: float = 30.0,
+        timeout: Optional[float] = 300.0,
+        name: str = "pool",
+        config: Optional[dict] = None,
+    ):
+        self.factory = factory
+        self.max_size = max(1, int(max_size))
+        self.health_check = health_check
+        self.check_after = check_after
+        self.timeout = timeout
+        self.name = name
+        self.config = config
+        self._idle: List[Tuple[Any, float]] = []
+        self._busy = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _healthy(self, conn: Any) -> bool:
+        if self.health_check is None:
+            return True
+        try:
+            return bool(self.health_check(conn))
+        except Exception as exc:
+            debug_log(f"{self.name}: health check failed: {exc}", self.config, level="medium")
+            return False
+
+    @staticmethod
+    def _discard(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """Return a connection, waiting up to *timeout* seconds for one."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"{self.name} is closed")
+                if self._idle or self._busy + len(self._idle) < self.max_size:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout(
+                        f"{self.name}: no connection available within {timeout}s"
+                    )
+                self._cond.wait(remaining)
+            idle = self._idle.pop() if self._idle else None
+            self._busy += 1
+        try:
+            if idle is not None:
+                conn, released_at = idle
+                if time.monotonic() - released_at < self.check_after or self._healthy(conn):
+                    return conn
+                debug_log(f"{self.name}: replacing stale connection", self.config, level="medium")
+                self._discard(conn)
+            return self.factory()
+        except BaseException:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn: Any, *, discard: bool = False) -> None:
+        """Return *conn* to the pool, closing it when ``discard`` is set."""
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            self._busy -= 1
+            if discard or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Context manager acquiring a connection and releasing it on exit.
+
+        Like ``with pyodbc.connect(...)`` the transaction is committed when the
+        block succeeds. The connection is discarded instead of reused if the
+        block raises.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    def close(self) -> None:
+        """Close idle connections; busy ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
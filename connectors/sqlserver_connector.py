@@ -5,10 +5,14 @@
 keys ``driver``, ``server`` and ``database`` as well as ``trusted_connection``
 and ``trust_server_certificate``.  Missing keys raise ``KeyError`` while
 connection failures are logged then re-raised for callers to handle.
+
+``create_sqlserver_pool`` wraps the same factory in a bounded
+:class:`connectors.pool.ConnectionPool` so partitions reuse connections.
 """
 
 from typing import Optional
 
+from connectors.pool import ConnectionPool
 from utils.logger import debug_log
 
 import pyodbc
@@ -43,3 +47,31 @@ def get_sqlserver_connection(env: dict, config: Optional[dict] = None):
     except Exception as exc:  # pragma: no cover - connection failure
         debug_log(f"SQL Server connection failed: {exc}", config, level="low")
         raise
+
+
+def _ping(conn) -> bool:
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1")
+        return cur.fetchone() is not None
+    finally:
+        cur.close()
+
+
+def create_sqlserver_pool(env: dict, config: Optional[dict] = None) -> ConnectionPool:
+    """Return a pool of SQL Server connections sized by ``destination.pool``.
+
+    ``max_size`` bounds the open connections, ``check_after`` is the idle
+    time in seconds after which a connection is pinged before reuse and
+    ``timeout`` how long :meth:`ConnectionPool.acquire` waits for one.
+    """
+    cfg = ((config or {}).get("destination") or {}).get("pool") or {}
+    return ConnectionPool(
+        lambda: get_sqlserver_connection(env, config),
+        max_size=cfg.get("max_size", 4),
+        health_check=_ping,
+        check_after=cfg.get("check_after", 30),
+        timeout=cfg.get("timeout", 300),
+        name="sqlserver-pool",
+        config=config,
+    )
@@ -7,64 +7,128 @@ from datetime import datetime
 
 from typing import Any, Iterable, Optional, Tuple, List
 import gc
-import xxhash
 import multiprocessing as mp
 import platform
 import os
+from collections import deque
+from functools import partial
 from itertools import islice, chain
 from pqdm.processes import pqdm
 from pqdm.threads import pqdm as pqdm_threads
-from concurrent.futures import (
-    ThreadPoolExecutor,
-    ProcessPoolExecutor,
-    as_completed,
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+from logic.comparison_plan import (
+    DATE,
+    DATETIME,
+    NORMALIZERS,
+    NUMERIC,
+    NUMERIC_TOLERANCE,
+    STRING,
+    ComparisonPlan,
+    build_plan_from_rows,
+    sanitize,
+    values_equal,
 )
-
-from dateutil import parser
-
+from logic.row_hasher import RowHasher
+from logic.row_schema import RowSchema, as_dict, row_value
+from logic.shared_batches import SharedBatch, compare_shared_batches, hash_shared_rows
 from utils.logger import debug_log
 from tqdm import tqdm
 
 if platform.system() == "Windows":
     mp.freeze_support()
+import numpy as np
 import pandas as pd
 
 
-def normalize_value(val: Any) -> str:
+def normalize_value(val: Any, kind: Optional[str] = None) -> str:
     """Normalize a single value for hashing consistency.
 
     The same sanitization rules used for direct value comparisons are
     applied here so that logically equivalent values (e.g. ``18.2`` and
     ``18.20`` or date strings with and without a time component) hash to
-    the same value.
+    the same value. When *kind* is supplied the matching normalizer from
+    :mod:`logic.comparison_plan` is used instead of probing the value.
     """
-    val = sanitize(val)
+    val = NORMALIZERS.get(kind, sanitize)(val) if kind else sanitize(val)
     if val is None:
         return "NULL"
     if isinstance(val, float):
         return f"{val:.5f}"
+    if isinstance(val, bytes):
+        return val.hex()
     return str(val).strip()
 
 
-def compute_row_hash(row: dict) -> str:
-    """Generate a consistent and fast hash for the provided row."""
-    ordered_keys = sorted(row.keys())
-    h = xxhash.xxh64()
-    for k in ordered_keys:
-        val = normalize_value(row.get(k))
-        h.update(val.encode("utf-8"))
-    return h.hexdigest()
+def compute_row_hash(
+    row: dict,
+    plan: Optional[ComparisonPlan] = None,
+    schema: Optional[RowSchema] = None,
+) -> str:
+    """Generate a consistent hash for the provided row.
+
+    ``plan`` supplies the column kinds so values are normalized without
+    type probing. Columns missing from the plan fall back to :func:`sanitize`.
+    Columns are hashed in sorted order, so a tuple row described by
+    ``schema`` hashes like the equivalent dict row. Hashing many rows of one table is faster
+    through a :class:`~logic.row_hasher.RowHasher` built once.
+    """
+    if schema is not None:
+        return RowHasher.for_schema(schema, plan).hash_values(row)
+    return RowHasher(sorted(row.keys()), plan).hash_row(row)
+
+
+def _row_hasher(
+    rows: list[dict],
+    plan: Optional[ComparisonPlan],
+    schema: Optional[RowSchema] = None,
+) -> Optional[RowHasher]:
+    """Return a hasher for *rows* if they all share the first row's columns."""
+    if schema is not None:
+        return RowHasher.for_schema(schema, plan)
+    if not rows:
+        return None
+    keys = rows[0].keys()
+    if any(row.keys() != keys for row in rows):
+        return None
+    return RowHasher(sorted(keys), plan)
+
+
+def _hash_row(row: dict, plan: Optional[ComparisonPlan] = None) -> str:
+    """Top-level function so it can be used with multiprocessing."""
+    return compute_row_hash(row, plan)
+
+
+def _hash_rows(rows: list[dict], hasher: RowHasher) -> list[str]:
+    """Top-level function so it can be used with multiprocessing."""
+    return hasher.hash_rows(rows)
 
 
-def _hash_row(row: dict) -> str:
+def _hash_tuples(rows: list[tuple], hasher: RowHasher) -> list[str]:
     """Top-level function so it can be used with multiprocessing."""
-    return compute_row_hash(row)
+    return hasher.hash_batch(rows)
 
 
 def compute_row_hashes_parallel(
-    rows: list[dict], *, workers: int = 4, mode: str = None
+    rows: list[dict],
+    *,
+    workers: int = 4,
+    mode: str = None,
+    plan: Optional[ComparisonPlan] = None,
+    shared_memory: bool = True,
+    schema: Optional[RowSchema] = None,
+    executor: Optional[Executor] = None,
 ) -> list[str]:
-    """Compute hashes for rows in parallel using thread or process mode."""
+    """Compute hashes for rows in parallel using thread or process mode.
+
+    Rows sharing one set of columns are hashed in chunks by a single
+    :class:`~logic.row_hasher.RowHasher`. In process mode with a ``plan``
+    the rows are encoded once into a
+    :class:`~logic.shared_batches.SharedBatch` and workers hash row ranges
+    from shared memory instead of unpickling every row dictionary. Pass
+    ``schema`` when *rows* are tuples from ``fetch_rows(row_mode="tuple")``
+    and a process ``executor`` to reuse its workers across calls.
+    """
     if mode is None:
         mode = "process" if platform.system() == "Windows" else "thread"
     if mode not in ("thread", "process"):
@@ -76,15 +140,77 @@ def compute_row_hashes_parallel(
         None,
         level="high",
     )
-    return list(
-        pq(rows, n_jobs=workers, function=_hash_row, desc="Hashing rows", disable=True)
+    hasher = _row_hasher(rows, plan, schema)
+    if hasher is None:
+        function = partial(_hash_row, plan=plan) if plan is not None else _hash_row
+        return list(
+            pq(rows, n_jobs=workers, function=function, desc="Hashing rows", disable=True)
+        )
+    if not rows:
+        return []
+    if mode == "process" and shared_memory and plan is not None:
+        return _hash_rows_shared(
+            rows, workers=workers, plan=plan, hasher=hasher, schema=schema, executor=executor
+        )
+    # One task per worker keeps per-task overhead negligible.
+    step = -(-len(rows) // max(1, workers))
+    chunks = [rows[i:i + step] for i in range(0, len(rows), step)]
+    hashed = pq(
+        chunks,
+        n_jobs=workers,
+        function=partial(_hash_tuples if schema else _hash_rows, hasher=hasher),
+        desc="Hashing rows",
+        disable=True,
     )
+    return [h for chunk in hashed for h in chunk]
+
+
+def _hash_rows_shared(
+    rows: list[dict],
+    *,
+    workers: int,
+    plan: ComparisonPlan,
+    hasher: RowHasher,
+    schema: Optional[RowSchema] = None,
+    executor: Optional[Executor] = None,
+) -> list[str]:
+    """Hash *rows* sharing ``hasher.columns`` in worker processes through shared memory.
+
+    A pool is started for the call unless *executor* is given.
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return _hash_rows_shared(
+                rows, workers=workers, plan=plan, hasher=hasher, schema=schema, executor=executor
+            )
+    step = -(-len(rows) // max(1, workers))
+    with SharedBatch(rows, hasher.columns, plan, schema=schema) as batch:
+        futures = [
+            executor.submit(hash_shared_rows, batch.layout, start, min(start + step, len(rows)))
+            for start in range(0, len(rows), step)
+        ]
+        return [f"{int(h):016x}" for future in futures for h in future.result()]
+
+
+def _hash_pool(
+    workers: int, mode: str, plan: Optional[ComparisonPlan], shared_memory: bool = True
+) -> Optional[Executor]:
+    """Return a process pool when hashing would otherwise start one per call."""
+    if mode == "process" and shared_memory and plan is not None:
+        return ProcessPoolExecutor(max_workers=workers)
+    return None
 
 
-def _hash_pair(pair: tuple) -> tuple[str, str]:
-    """Return ``(src_hash, dest_hash)`` for a row pair."""
-    src_row, dest_row = pair[0], pair[1]
-    return compute_row_hash(src_row), compute_row_hash(dest_row)
+def _hash_pairs(
+    src_rows: list,
+    dest_rows: list,
+    *,
+    executor: Optional[Executor] = None,
+    **kwargs: Any,
+) -> tuple[list[str], list[str]]:
+    """Hash both sides of a chunk in one pass and split the hashes again."""
+    hashes = compute_row_hashes_parallel(src_rows + dest_rows, executor=executor, **kwargs)
+    return hashes[:len(src_rows)], hashes[len(src_rows):]
 
 
 def discard_matching_rows_by_hash(
@@ -95,49 +221,109 @@ def discard_matching_rows_by_hash(
     workers: int = 4,
     mode: str = "thread",
     config: dict | None = None,
+    plan: Optional[ComparisonPlan] = None,
+    chunk_size: int = 100_000,
+    stats: Optional[dict] = None,
 ) -> tuple[list[dict], list[dict], int, int]:
-    """Return filtered row lists with matching hashes removed."""
+    """Drop row pairs whose hashes match from both lists in place.
 
-    source_by_pk = {row[primary_key]: row for row in src_rows}
-    dest_by_pk = {row[primary_key]: row for row in dest_rows}
+    Both lists must be ordered by ``primary_key`` as returned by
+    :func:`runners.reconcile.fetch_rows`. They are merged in a single pass;
+    rows sharing a key are hashed ``chunk_size`` pairs at a time and matching
+    pairs are marked, then each list is compacted in place so surviving rows
+    keep their order and no PK dictionaries or sorted copies are built.
 
-    intersect = sorted(set(source_by_pk) & set(dest_by_pk))
-    if not intersect:
-        return src_rows, dest_rows, 0, 0
+    Returns ``(src_rows, dest_rows, discarded, kept)`` where ``kept`` counts
+    intersecting pairs whose hashes differ. When ``stats`` is given it is
+    updated with ``pairs``, ``discarded``, ``kept``, ``source_only`` and
+    ``dest_only`` counts.
 
+    Each chunk's source and destination rows are hashed in one pass; in
+    process mode one worker pool serves every chunk.
+    """
+    src_drop = bytearray(len(src_rows))
+    dest_drop = bytearray(len(dest_rows))
+    executor = _hash_pool(workers, mode, plan)
+    counts = {"pairs": 0, "discarded": 0, "kept": 0, "source_only": 0, "dest_only": 0}
+
+    def flush(src_idx: list[int], dest_idx: list[int]) -> None:
+        src_hashes, dest_hashes = _hash_pairs(
+            [src_rows[i] for i in src_idx],
+            [dest_rows[j] for j in dest_idx],
+            workers=workers,
+            mode=mode,
+            plan=plan,
+            executor=executor,
+        )
+        for i, j, s_h, d_h in zip(src_idx, dest_idx, src_hashes, dest_hashes):
+            if s_h == d_h:
+                src_drop[i] = dest_drop[j] = 1
+                counts["discarded"] += 1
+        counts["pairs"] += len(src_idx)
+
+    i = j = 0
+    src_idx: list[int] = []
+    dest_idx: list[int] = []
+    n_src, n_dest = len(src_rows), len(dest_rows)
+    try:
+        while i < n_src and j < n_dest:
+            src_key = src_rows[i][primary_key]
+            dest_key = dest_rows[j][primary_key]
+            if src_key == dest_key:
+                src_idx.append(i)
+                dest_idx.append(j)
+                i += 1
+                j += 1
+                if len(src_idx) >= chunk_size:
+                    flush(src_idx, dest_idx)
+                    src_idx, dest_idx = [], []
+            elif src_key < dest_key:
+                i += 1
+                counts["source_only"] += 1
+            else:
+                j += 1
+                counts["dest_only"] += 1
+        counts["source_only"] += n_src - i
+        counts["dest_only"] += n_dest - j
+        if src_idx:
+            flush(src_idx, dest_idx)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    counts["kept"] = counts["pairs"] - counts["discarded"]
+
+    if counts["discarded"]:
+        _compact(src_rows, src_drop)
+        _compact(dest_rows, dest_drop)
     debug_log(
-        f"Hashing {len(intersect)} intersecting rows for cleanup",
+        f"Hash cleanup: {counts['pairs']} intersecting pairs, "
+        f"{counts['discarded']} discarded, {counts['kept']} kept",
         config,
         level="medium",
     )
+    if stats is not None:
+        stats.update(counts)
+    return src_rows, dest_rows, counts["discarded"], counts["kept"]
 
-    src_hashes = compute_row_hashes_parallel(
-        [source_by_pk[k] for k in intersect], workers=workers, mode=mode
-    )
-    dest_hashes = compute_row_hashes_parallel(
-        [dest_by_pk[k] for k in intersect], workers=workers, mode=mode
-    )
-
-    discarded = 0
-    for pk, s_h, d_h in zip(intersect, src_hashes, dest_hashes):
-        if s_h == d_h:
-            source_by_pk.pop(pk, None)
-            dest_by_pk.pop(pk, None)
-            discarded += 1
-
-    kept = len(intersect) - discarded
 
-    filtered_src = sorted(source_by_pk.values(), key=lambda r: r[primary_key])
-    filtered_dest = sorted(dest_by_pk.values(), key=lambda r: r[primary_key])
-
-    return filtered_src, filtered_dest, discarded, kept
+def _compact(rows: list, drop: bytearray) -> None:
+    """Remove ``rows[i]`` where ``drop[i]`` is set, keeping order, in place."""
+    write = 0
+    for read, flag in enumerate(drop):
+        if not flag:
+            rows[write] = rows[read]
+            write += 1
+    del rows[write:]
 
 
 def _chunked(iterable: Iterable, size: int) -> Iterable[list]:
-    """Yield lists of *size* elements from *iterable*."""
-    data = list(iterable)
-    for i in range(0, len(data), size):
-        yield data[i:i + size]
+    """Yield lists of *size* elements from *iterable* without materializing it."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 def _filter_pairs_by_hash(
@@ -146,11 +332,15 @@ def _filter_pairs_by_hash(
     workers: int = 4,
     chunk_size: int = 100_000,
     mode: str = "process" if platform.system() == "Windows" else "thread",
+    plan: Optional[ComparisonPlan] = None,
+    shared_memory: bool = True,
+    schema: Optional[RowSchema] = None,
 ) -> Iterable[tuple]:
     """Yield row pairs where source and destination row hashes differ.
 
     ``mode`` selects ``"thread"`` or ``"process"`` execution for hash
-    computation.
+    computation; ``shared_memory`` is passed to
+    :func:`compute_row_hashes_parallel`.
     """
     debug_log(
         f"_filter_pairs_by_hash using mode={mode}",
@@ -164,77 +354,91 @@ def _filter_pairs_by_hash(
             None,
             level="medium",
         )
-        src_rows = [p[0] for p in chunk]
-        dest_rows = [p[1] for p in chunk]
-        src_hashes = compute_row_hashes_parallel(src_rows, workers=workers, mode=mode)
-        dest_hashes = compute_row_hashes_parallel(dest_rows, workers=workers, mode=mode)
+        src_hashes, dest_hashes = _hash_pairs(
+            [p[0] for p in chunk],
+            [p[1] for p in chunk],
+            workers=workers,
+            mode=mode,
+            plan=plan,
+            shared_memory=shared_memory,
+            schema=schema,
+            executor=executor,
+        )
         result: list[tuple] = []
         for pair, s_h, d_h in zip(chunk, src_hashes, dest_hashes):
             if s_h != d_h:
                 result.append(pair)
         return result
 
-    # Stream chunks to avoid materializing all pairs at once
-    for i, chunk in enumerate(
-        tqdm(_chunked(list(row_pairs), chunk_size), desc="Filtering mismatched row hashes", unit="chunk")
-    ):
-        for pair in process(chunk, i):
-            yield pair
-        # Explicitly free memory from processed chunk
-        del chunk
-        gc.collect()
-
-
-def values_equal(source_val: Any, dest_val: Any) -> bool:
-    """Return ``True`` if the two provided values should be considered equal."""
-    # Attempt numeric comparison with tolerance
+    # One worker pool for every chunk; closing the generator shuts it down.
+    executor = _hash_pool(workers, mode, plan, shared_memory)
     try:
-        a = float(source_val)
-        b = float(dest_val)
-        if abs(a - b) < 1e-5:
-            return True
-    except Exception:
-        pass
-
-    # Attempt date comparison ignoring time component
-    try:
-        d1 = parser.parse(str(source_val)).date()
-        d2 = parser.parse(str(dest_val)).date()
-        if d1 == d2:
-            return True
-    except Exception:
-        pass
+        # Stream chunks to avoid materializing all pairs at once
+        for i, chunk in enumerate(
+            tqdm(_chunked(row_pairs, chunk_size), desc="Filtering mismatched row hashes", unit="chunk")
+        ):
+            for pair in process(chunk, i):
+                yield pair
+            # Explicitly free memory from processed chunk
+            del chunk
+            gc.collect()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def sanitize_row(
+    row: dict, columns: Iterable[str], plan: Optional[ComparisonPlan] = None
+) -> dict:
+    """Return a new row dict with sanitized values for *columns*."""
+    if plan is not None:
+        return plan.normalize_row(row, columns)
+    return {col: sanitize(row.get(col)) for col in columns}
 
-    # Fallback to string equality
-    return str(source_val) == str(dest_val)
 
+def _plan_for_rows(
+    plan: Optional[ComparisonPlan], rows: Iterable[dict], columns: Iterable[str]
+) -> ComparisonPlan:
+    """Return *plan* or infer one from *rows* when it is ``None``."""
+    if plan is not None:
+        return plan
+    return build_plan_from_rows(rows, columns)
 
-def sanitize(value: Any) -> Any:
-    """Normalize *value* for comparison purposes."""
-    if value is None:
-        return None
-    try:
-        return float(value)
-    except Exception:
-        pass
-    try:
-        return parser.parse(str(value)).date()
-    except Exception:
-        pass
-    return str(value).strip()
 
+def _plan_for_pairs(
+    plan: Optional[ComparisonPlan],
+    row_pairs: Iterable[tuple],
+    *,
+    sample_size: int = 1000,
+    schema: Optional[RowSchema] = None,
+) -> tuple[Optional[ComparisonPlan], Iterable[tuple]]:
+    """Return ``(plan, row_pairs)`` inferring a plan from the first pairs.
 
-def sanitize_row(row: dict, columns: Iterable[str]) -> dict:
-    """Return a new row dict with sanitized values for *columns*."""
-    return {col: sanitize(row.get(col)) for col in columns}
+    The sampled pairs are chained back in front of the remaining iterator so
+    callers can still consume every pair.
+    """
+    if plan is not None:
+        return plan, row_pairs
+    it = iter(row_pairs)
+    head = list(islice(it, sample_size))
+    if not head:
+        return None, head
+    columns = list(head[0][2].keys())
+    rows = chain.from_iterable(
+        (as_dict(item[0], schema), as_dict(item[1], schema)) for item in head
+    )
+    plan = build_plan_from_rows(rows, columns, sample_size=2 * len(head))
+    return plan, chain(head, it)
 
 
 def compare_row_pair(args: tuple) -> Optional[list[dict]]:
     """Compare a single pair of rows for multiprocessing."""
-    source_row, dest_row, column_map, config = args
+    source_row, dest_row, column_map, config = args[:4]
+    plan = args[4] if len(args) > 4 else None
+    plan = _plan_for_rows(plan, (source_row, dest_row), column_map.keys())
 
     if config.get("comparison", {}).get("use_row_hash", False):
-        if compute_row_hash(source_row) == compute_row_hash(dest_row):
+        if compute_row_hash(source_row, plan) == compute_row_hash(dest_row, plan):
             return None
 
     return compare_rows(
@@ -243,6 +447,7 @@ def compare_row_pair(args: tuple) -> Optional[list[dict]]:
         column_map,
         use_row_hash=config.get("comparison", {}).get("use_row_hash", False),
         config=config,
+        plan=plan,
     )
 
 
@@ -254,10 +459,20 @@ def compare_row_pair_by_pk(
     *,
     hashes: Optional[Tuple[str, str]] = None,
     partition: Optional[dict] = None,
+    plan: Optional[ComparisonPlan] = None,
+    schema: Optional[RowSchema] = None,
 ) -> Optional[dict]:
-    """Compare two rows and return mismatches keyed by primary key."""
+    """Compare two rows and return mismatches keyed by primary key.
+
+    ``plan`` fixes the normalizer used for each column. When omitted a plan is
+    inferred from the two rows which is only suitable for one-off calls.
+    ``schema`` describes tuple rows from ``fetch_rows(row_mode="tuple")``.
+    """
+    plan = _plan_for_rows(
+        plan, (as_dict(src_row, schema), as_dict(dest_row, schema)), columns
+    )
     pk_col = config.get("columns", {}).get("primary_key", config.get("primary_key"))
-    pk = src_row.get(pk_col)
+    pk = row_value(src_row, pk_col, schema)
     include_nulls = config.get("comparison", {}).get("include_nulls", False)
     use_row_hash = config.get("comparison", {}).get("use_row_hash", False)
 
@@ -266,24 +481,22 @@ def compare_row_pair_by_pk(
         if hashes:
             src_hash, dest_hash = hashes
         else:
-            src_hash = compute_row_hash(src_row)
-            dest_hash = compute_row_hash(dest_row)
+            src_hash = compute_row_hash(src_row, plan, schema)
+            dest_hash = compute_row_hash(dest_row, plan, schema)
         if src_hash == dest_hash:
             return None
 
     debug_log(
-        f"Comparing row with PK={pk} using columns: {columns}", config, level="high"
+        "Comparing row with PK=%s using columns: %s", config, pk, columns, level="high"
     )
-    for col in columns:
-        src_val = sanitize(src_row.get(col))
-        dest_val = sanitize(dest_row.get(col))
-        debug_log(f"  {col}: src={src_val} dest={dest_val}", config, level="high")
 
     mismatches: list[dict] = []
     for col in columns:
-        src_val = sanitize(src_row.get(col))
-        dest_val = sanitize(dest_row.get(col))
-        if values_equal(src_val, dest_val):
+        normalize = plan.normalizer(col)
+        src_val = normalize(row_value(src_row, col, schema))
+        dest_val = normalize(row_value(dest_row, col, schema))
+        debug_log("  %s: src=%s dest=%s", config, col, src_val, dest_val, level="high")
+        if plan.values_equal(col, src_val, dest_val):
             continue
         if not include_nulls and (src_val is None or dest_val is None):
             continue
@@ -302,8 +515,10 @@ def compare_row_pair_by_pk(
     # rows during reconciliation.
     if mismatches:
         debug_log(
-            f"Row {pk}: {len(mismatches)} mismatching columns",
+            "Row %s: %d mismatching columns",
             config,
+            pk,
+            len(mismatches),
             level="medium",
         )
         result = {"primary_key": pk, "mismatches": mismatches}
@@ -319,10 +534,14 @@ def compare_rows(
     column_map: dict,
     use_row_hash: bool = False,
     config: Optional[dict] = None,
+    plan: Optional[ComparisonPlan] = None,
 ) -> list[dict]:
     """
     Compares two rows column-by-column using the logical column names.
 
+    ``plan`` fixes the normalizer used for each column. When omitted a plan is
+    inferred from the two rows.
+
     Returns a list of mismatched columns with source and destination values.
     Each mismatch is represented as:
         {
@@ -332,37 +551,46 @@ def compare_rows(
         }
     """
     mismatches = []
+    plan = _plan_for_rows(plan, (source_row, dest_row), column_map.keys())
     pk_field = next(iter(column_map.keys()))
     debug_log(
-        f"Comparing source row {source_row.get(pk_field)}",
+        "Comparing source row %s",
         config,
+        source_row.get(pk_field),
         level="high",
     )
     src_hash = dest_hash = None
 
     if use_row_hash:
-        src_hash = compute_row_hash(source_row)
-        dest_hash = compute_row_hash(dest_row)
+        src_hash = compute_row_hash(source_row, plan)
+        dest_hash = compute_row_hash(dest_row, plan)
         debug_log(
-            f"Source hash: {src_hash}, Dest hash: {dest_hash}",
+            "Source hash: %s, Dest hash: %s",
             config,
+            src_hash,
+            dest_hash,
             level="high",
         )
         if src_hash == dest_hash:
             debug_log(
-                f"Skipping row {source_row.get(pk_field)} - hashes match",
+                "Skipping row %s - hashes match",
                 config,
+                source_row.get(pk_field),
                 level="high",
             )
             return mismatches
     column_iter = column_map.keys()
     for logical_col in column_iter:
-        src_val = sanitize(source_row.get(logical_col))
-        dest_val = sanitize(dest_row.get(logical_col))
-        if not values_equal(src_val, dest_val):
+        normalize = plan.normalizer(logical_col)
+        src_val = normalize(source_row.get(logical_col))
+        dest_val = normalize(dest_row.get(logical_col))
+        if not plan.values_equal(logical_col, src_val, dest_val):
             debug_log(
-                f"MISMATCH: col={logical_col}, src={src_val}, dest={dest_val}",
+                "MISMATCH: col=%s, src=%s, dest=%s",
                 config,
+                logical_col,
+                src_val,
+                dest_val,
                 level="high",
             )
             mismatch = {
@@ -378,112 +606,255 @@ def compare_rows(
     return mismatches
 
 
+def _column_equality(
+    kind: str, src: pd.Series, dest: pd.Series, src_null, dest_null
+) -> tuple:
+    """Return ``(equal, undecided)`` masks for two raw value columns.
+
+    Values are normalized with vectorized pandas operations chosen by the
+    column *kind*. ``undecided`` marks non-null positions the vectorized path
+    could not convert (for example non-ISO date strings); callers resolve
+    them with the scalar normalizers of the comparison plan.
+    """
+    present = ~src_null & ~dest_null
+    equal = np.zeros(len(src), dtype=bool)
+    if kind == NUMERIC:
+        a = pd.to_numeric(src, errors="coerce").to_numpy(dtype=float)
+        b = pd.to_numeric(dest, errors="coerce").to_numpy(dtype=float)
+        valid = ~np.isnan(a) & ~np.isnan(b)
+        equal[valid] = np.isclose(
+            a[valid], b[valid], rtol=0.0, atol=NUMERIC_TOLERANCE
+        )
+        return equal, present & ~valid
+    if kind in (DATE, DATETIME):
+        # Comparisons ignore the time component so only ``YYYY-MM-DD`` is parsed.
+        a = pd.to_datetime(
+            src.astype(str).str.strip().str.slice(0, 10),
+            format="%Y-%m-%d",
+            errors="coerce",
+        ).to_numpy()
+        b = pd.to_datetime(
+            dest.astype(str).str.strip().str.slice(0, 10),
+            format="%Y-%m-%d",
+            errors="coerce",
+        ).to_numpy()
+        valid = ~np.isnat(a) & ~np.isnat(b)
+        equal[valid] = a[valid] == b[valid]
+        return equal, present & ~valid
+    if kind == STRING:
+        a = src.astype(str).str.strip().to_numpy()
+        b = dest.astype(str).str.strip().to_numpy()
+        return (a == b) & present, np.zeros(len(src), dtype=bool)
+    # Binary and unresolved columns are compared value by value.
+    return equal, present
+
+
+def _compare_block(
+    block: list[tuple],
+    columns: list[str],
+    plan: ComparisonPlan,
+    config: dict,
+    schema: Optional[RowSchema] = None,
+) -> list[dict]:
+    """Return flat mismatch records for one block of row pairs.
+
+    With ``use_row_hash`` the records carry ``source_hash``/``dest_hash`` and
+    pairs whose hashes match are skipped, as in :func:`compare_row_pair_by_pk`.
+    Hashes are only computed for pairs with a mismatching column.
+    """
+    pk_col = config.get("columns", {}).get("primary_key", config.get("primary_key"))
+    include_nulls = config.get("comparison", {}).get("include_nulls", False)
+    hash_one = None
+    if config.get("comparison", {}).get("use_row_hash", False):
+        hasher = _row_hasher([block[0][0]], plan, schema)
+        hash_one = hasher.hash_values if schema is not None else hasher.hash_row
+    hashes: dict[int, tuple] = {}
+    results: list[dict] = []
+    for col in columns:
+        src = pd.Series([row_value(item[0], col, schema) for item in block], dtype=object)
+        dest = pd.Series([row_value(item[1], col, schema) for item in block], dtype=object)
+        src_null = src.isna().to_numpy()
+        dest_null = dest.isna().to_numpy()
+        equal, undecided = _column_equality(
+            plan.kind(col), src, dest, src_null, dest_null
+        )
+        equal |= src_null & dest_null
+        normalize = plan.normalizer(col)
+        for idx in np.flatnonzero(undecided):
+            equal[idx] = plan.values_equal(
+                col, normalize(src.iat[idx]), normalize(dest.iat[idx])
+            )
+        for idx in np.flatnonzero(~equal):
+            if not include_nulls and (src_null[idx] or dest_null[idx]):
+                continue
+            item = block[idx]
+            if hash_one is not None:
+                if idx not in hashes:
+                    hashes[idx] = (hash_one(item[0]), hash_one(item[1]))
+                src_hash, dest_hash = hashes[idx]
+                if src_hash == dest_hash:
+                    continue
+            mismatch = {
+                "primary_key": row_value(item[0], pk_col, schema),
+                "column": col,
+                "source_value": normalize(src.iat[idx]),
+                "dest_value": normalize(dest.iat[idx]),
+            }
+            if hash_one is not None:
+                mismatch["source_hash"] = src_hash
+                mismatch["dest_hash"] = dest_hash
+            if len(item) > 4 and item[4] is not None:
+                mismatch["partition"] = item[4]
+            results.append(mismatch)
+    return results
+
+
 def compare_row_pairs_serial(
     row_pairs: Iterable[tuple],
     *,
     progress=None,
+    plan: Optional[ComparisonPlan] = None,
+    block_size: int = 50_000,
+    schema: Optional[RowSchema] = None,
 ) -> Iterable[dict]:
     """Yield mismatch details for each pair keyed by primary key.
 
     ``row_pairs`` must yield ``(src_row, dest_row, columns, config)`` tuples and
-    may optionally include a partition mapping as a 5th element. The previous
-    implementation materialised all pairs before processing which meant progress
-    bars only appeared once the entire input was exhausted. This streaming
-    version processes each pair as it arrives so progress is updated in real
-    time. Row hashing and column filtering are handled per pair and results are
-    yielded immediately.
+    may optionally include a partition mapping as a 5th element. Pairs are
+    consumed in blocks of ``block_size`` so memory is bounded by the block
+    rather than the partition. Each block is normalized column by column with
+    vectorized pandas operations selected by ``plan`` (inferred from the first
+    pairs if omitted) and its mismatches are yielded before the next block is
+    read. Pass ``schema`` when the rows are tuples.
     """
-
-    # Collect all rows for batch comparison
-    src_rows, dest_rows, partitions = [], [], []
-    col_maps, configs = [], []
-
-    for item in row_pairs:
-        if len(item) == 4:
-            src_row, dest_row, col_map, config = item
-            part = None
-        else:
-            src_row, dest_row, col_map, config, part = item
-        src_rows.append(src_row)
-        dest_rows.append(dest_row)
-        col_maps.append(col_map)
-        configs.append(config)
-        partitions.append(part)
-
-    if not src_rows or not dest_rows:
+    plan, row_pairs = _plan_for_pairs(plan, row_pairs, schema=schema)
+    if plan is None:
         return
 
-    if progress is not None:
-        progress.total = len(src_rows)
-        if hasattr(progress, "refresh"):
-            progress.refresh()
-
-    columns = list(col_maps[0].keys())
-    only_cols = configs[0].get("comparison", {}).get("only_columns")
-    if only_cols:
-        columns = [c for c in columns if c in only_cols]
+    seen = 0
+    for i, block in enumerate(_chunked(row_pairs, block_size)):
+        config = block[0][3]
+        columns = list(block[0][2].keys())
+        only_cols = config.get("comparison", {}).get("only_columns")
+        if only_cols:
+            columns = [c for c in columns if c in only_cols]
+
+        seen += len(block)
+        if progress is not None:
+            progress.total = seen
+            if hasattr(progress, "refresh"):
+                progress.refresh()
+
+        results = _compare_block(block, columns, plan, config, schema)
+        debug_log(
+            f"Block {i + 1}: {len(block)} pairs, {len(results)} mismatches",
+            config,
+            level="high",
+        )
+        # Progress counts compared pairs, like the parallel engines.
+        if progress is not None:
+            if hasattr(progress, "update"):
+                progress.update(len(block))
+            else:
+                progress.n += len(block)
+                progress.refresh()
+        del block
+        yield from results
 
-    df_src = pd.DataFrame(src_rows)[columns]
-    df_dest = pd.DataFrame(dest_rows)[columns]
 
-    # Sanitize using vectorized logic
-    df_src = df_src.applymap(sanitize)
-    df_dest = df_dest.applymap(sanitize)
+def _compare_pair_batch(
+    pairs: list[tuple],
+    columns: list[str],
+    config: dict,
+    plan: Optional[ComparisonPlan],
+    schema: Optional[RowSchema] = None,
+) -> list[dict]:
+    """Compare ``(src_row, dest_row, partition)`` tuples sharing one config.
 
-    from concurrent.futures import ThreadPoolExecutor
+    Defined at module level so process pools can pickle it. ``config`` and
+    ``plan`` are sent once per batch instead of once per pair, and row hashes
+    use one :class:`~logic.row_hasher.RowHasher` built from the first row.
+    """
+    hash_one = None
+    if pairs and config.get("comparison", {}).get("use_row_hash", False):
+        hasher = _row_hasher([pairs[0][0]], plan, schema)
+        hash_one = hasher.hash_values if schema is not None else hasher.hash_row
+    results: list[dict] = []
+    for src_row, dest_row, part in pairs:
+        hashes = (hash_one(src_row), hash_one(dest_row)) if hash_one else None
+        result = compare_row_pair_by_pk(
+            src_row,
+            dest_row,
+            columns,
+            config,
+            hashes=hashes,
+            partition=part,
+            plan=plan,
+            schema=schema,
+        )
+        if result:
+            results.append(result)
+    return results
 
-    mismatches = []
 
-    def compare_column(col):
-        results = []
-        src_col = df_src[col].to_numpy()
-        dest_col = df_dest[col].to_numpy()
-        equal_mask = src_col == dest_col
+def _resolve_shared_candidates(
+    pairs: list[tuple],
+    columns: list[str],
+    config: dict,
+    plan: ComparisonPlan,
+    candidates: list[tuple[int, int]],
+    schema: Optional[RowSchema] = None,
+) -> list[dict]:
+    """Build mismatch results for cells flagged by :func:`compare_shared_batches`.
 
-        for idx, match in enumerate(equal_mask):
-            if match:
-                continue
-            if not configs[idx].get("comparison", {}).get("include_nulls", False):
-                if pd.isnull(src_col[idx]) or pd.isnull(dest_col[idx]):
-                    continue
-            mismatch = {
-                "primary_key": src_rows[idx].get(
-                    configs[idx]
-                    .get("columns", {})
-                    .get("primary_key", configs[idx].get("primary_key"))
-                ),
-                "column": col,
-                "source_value": src_col[idx],
-                "dest_value": dest_col[idx],
-            }
-            if partitions[idx] is not None:
-                mismatch["partition"] = partitions[idx]
-            results.append(mismatch)
-        return results
+    Only the flagged columns of each row are re-checked so the output matches
+    :func:`_compare_pair_batch` for the same pairs.
+    """
+    by_row: dict[int, list[int]] = {}
+    for row, col in candidates:
+        by_row.setdefault(row, []).append(col)
+    results: list[dict] = []
+    for row in sorted(by_row):
+        src_row, dest_row, part = pairs[row]
+        cols = [columns[c] for c in sorted(by_row[row])]
+        result = compare_row_pair_by_pk(
+            src_row, dest_row, cols, config, partition=part, plan=plan, schema=schema
+        )
+        if result:
+            results.append(result)
+    return results
 
-    with ThreadPoolExecutor(max_workers=min(len(columns), (os.cpu_count() or 1))) as executor:
-        futures = [executor.submit(compare_column, col) for col in columns]
-        for future in as_completed(futures):
-            results = future.result()
-            mismatches.extend(results)
-            if progress is not None:
-                if hasattr(progress, "update"):
-                    progress.update(len(results))
-                else:
-                    progress.n += len(results)
-                    progress.refresh()
 
-    for result in mismatches:
-        debug_log(
-            f"Yielding mismatch result for PK={result.get('primary_key')}: {result}",
-            configs[0],
-            level="high",
-        )
-        yield result
+def _pair_batches(
+    row_pairs: Iterable[tuple], batch_size: int
+) -> Iterable[tuple[list[tuple], list[str], dict]]:
+    """Group *row_pairs* into ``(pairs, columns, config)`` micro-batches.
 
-    # Explicitly free memory from large structures
-    del df_src, df_dest, mismatches
-    gc.collect()
+    A new batch starts whenever the column mapping or config object changes
+    so every batch can be compared with a single column list.
+    """
+    batch: list[tuple] = []
+    batch_key = None
+    columns: list[str] = []
+    config: dict = {}
+    for item in row_pairs:
+        if len(item) == 4:
+            src_row, dest_row, col_map, item_config = item
+            part = None
+        else:
+            src_row, dest_row, col_map, item_config, part = item
+        key = (id(col_map), id(item_config))
+        if key != batch_key or len(batch) >= batch_size:
+            if batch:
+                yield batch, columns, config
+            batch = []
+            batch_key = key
+            config = item_config
+            only_cols = config.get("comparison", {}).get("only_columns")
+            columns = [c for c in col_map.keys() if not only_cols or c in only_cols]
+        batch.append((src_row, dest_row, part))
+    if batch:
+        yield batch, columns, config
 
 
 def compare_row_pairs_parallel_detailed(
@@ -492,6 +863,11 @@ def compare_row_pairs_parallel_detailed(
     workers: int = 4,
     progress=None,
     parallel_mode: str = "thread",
+    plan: Optional[ComparisonPlan] = None,
+    batch_size: int = 2000,
+    max_in_flight: Optional[int] = None,
+    shared_memory: bool = True,
+    schema: Optional[RowSchema] = None,
 ) -> Iterable[dict]:
     """Yield mismatch details for each pair keyed by primary key in parallel.
 
@@ -500,15 +876,31 @@ def compare_row_pairs_parallel_detailed(
     (default) and ``"process"``. When ``parallel_mode`` is ``"batch"`` the call
     is delegated to :func:`compare_row_pairs_parallel_batch`.
     ``row_pairs`` must yield ``(src_row, dest_row, columns, config)`` tuples and
-    may optionally include a partition mapping as a 5th element.
+    may optionally include a partition mapping as a 5th element. ``plan`` is
+    shared by every comparison and inferred from the first pairs if omitted.
+
+    Pairs are grouped into tasks of ``batch_size`` and at most
+    ``max_in_flight`` tasks (default ``2 * workers``) are pending at any time,
+    so only a bounded window of rows is pinned in memory. Results are yielded
+    in submission order.
+
+    In process mode with ``shared_memory`` each task's rows are encoded into
+    :class:`~logic.shared_batches.SharedBatch` blocks; workers receive only
+    their layouts and return the cells that may differ, which are confirmed
+    here with :func:`compare_row_pair_by_pk`. Pass ``schema`` when the rows
+    are tuples.
     """
 
     if parallel_mode == "batch":
-        return compare_row_pairs_parallel_batch(
-            row_pairs, workers=workers, progress=progress, parallel_mode="thread"
+        yield from compare_row_pairs_parallel_batch(
+            row_pairs,
+            workers=workers,
+            progress=progress,
+            parallel_mode="thread",
+            plan=plan,
+            schema=schema,
         )
-
-    cfg_ref: Optional[dict] = None
+        return
 
     # Determine total count up front when possible so callers like ``tqdm``
     # can display bounded progress bars. If ``row_pairs`` has no length,
@@ -523,55 +915,72 @@ def compare_row_pairs_parallel_detailed(
         progress.total = total
         progress.refresh()
 
-    def prepare_row_pairs_generator():
-        nonlocal cfg_ref
-        for item in row_pairs:
-            if len(item) == 4:
-                src_row, dest_row, col_map, config = item
-                part = None
-            else:
-                src_row, dest_row, col_map, config, part = item
-            cfg_ref = cfg_ref or config
-            cols = [
-                c
-                for c in col_map.keys()
-                if not config.get("comparison", {}).get("only_columns")
-                or c in config["comparison"]["only_columns"]
-            ]
-            yield {
-                "src_row": src_row,
-                "dest_row": dest_row,
-                "columns": cols,
-                "config": config,
-                "partition": part,
-            }
-
-    # If progress is not None and total is None, try to estimate total
-    # This is not possible without materializing, so skip.
+    plan, row_pairs = _plan_for_pairs(plan, row_pairs, schema=schema)
+    window = max_in_flight or max(1, 2 * workers)
 
-    debug_log(f"Executor: {'ThreadPoolExecutor' if parallel_mode == 'thread' else 'ProcessPoolExecutor'} with {workers} workers", cfg_ref, level="medium")
+    debug_log(
+        f"Executor: {'ThreadPoolExecutor' if parallel_mode == 'thread' else 'ProcessPoolExecutor'} "
+        f"with {workers} workers, batch_size={batch_size}, max_in_flight={window}",
+        None,
+        level="medium",
+    )
     executor_cls = ThreadPoolExecutor if parallel_mode == "thread" else ProcessPoolExecutor
     if parallel_mode == "process" and platform.system() == "Windows":
         mp.freeze_support()
-    with executor_cls(max_workers=workers) as executor:
-        futures = [
-            executor.submit(compare_row_pair_by_pk, **kwargs)
-            for kwargs in prepare_row_pairs_generator()
-        ]
 
-        for future in as_completed(futures):
-            result = future.result()
-            if progress is not None:
-                if hasattr(progress, "update"):
-                    progress.update(1)
-                else:
-                    progress.n += 1
-                    progress.refresh()
-            if result:
-                yield result
+    use_shared = parallel_mode == "process" and shared_memory
+
+    def drain_one(pending: deque) -> list[dict]:
+        future, count, shared = pending.popleft()
+        if shared is None:
+            results = future.result()
+        else:
+            pairs, columns, config, batches = shared
+            try:
+                candidates = future.result()
+            finally:
+                for batch in batches:
+                    batch.release()
+            results = _resolve_shared_candidates(
+                pairs, columns, config, plan, candidates, schema
+            )
+        if progress is not None:
+            if hasattr(progress, "update"):
+                progress.update(count)
+            else:
+                progress.n += count
+                progress.refresh()
+        return results
 
-    # Explicitly free memory from large structures if any
-    gc.collect()
+    with executor_cls(max_workers=workers) as executor:
+        pending: deque = deque()
+        try:
+            for pairs, columns, config in _pair_batches(row_pairs, batch_size):
+                if len(pending) >= window:
+                    yield from drain_one(pending)
+                if use_shared:
+                    batches = (
+                        SharedBatch([p[0] for p in pairs], columns, plan, schema=schema),
+                        SharedBatch([p[1] for p in pairs], columns, plan, schema=schema),
+                    )
+                    future = executor.submit(
+                        compare_shared_batches, batches[0].layout, batches[1].layout
+                    )
+                    pending.append((future, len(pairs), (pairs, columns, config, batches)))
+                else:
+                    future = executor.submit(
+                        _compare_pair_batch, pairs, columns, config, plan, schema
+                    )
+                    pending.append((future, len(pairs), None))
+            while pending:
+                yield from drain_one(pending)
+        finally:
+            # Unlink blocks of tasks abandoned by an error or an early close.
+            for future, _, shared in pending:
+                future.cancel()
+                if shared is not None:
+                    for batch in shared[3]:
+                        batch.release()
 
 
 def compare_row_pairs_parallel_batch(
@@ -581,23 +990,44 @@ def compare_row_pairs_parallel_batch(
     progress=None,
     chunk_size: int = 100_000,
     parallel_mode: str = "process" if platform.system() == "Windows" else "thread",
+    plan: Optional[ComparisonPlan] = None,
+    batch_size: int = 2000,
+    max_in_flight: Optional[int] = None,
+    shared_memory: bool = True,
+    schema: Optional[RowSchema] = None,
 ) -> Iterable[dict]:
     """Filter row pairs by hash in chunks then compare mismatched pairs.
 
     ``parallel_mode`` controls whether hashing and comparison use threads or
     processes. Accepted values mirror those of
-    :func:`compare_row_pairs_parallel_detailed`.
+    :func:`compare_row_pairs_parallel_detailed`, which also receives
+    ``batch_size``, ``max_in_flight`` and ``shared_memory``.
     """
     debug_log(
         f"compare_row_pairs_parallel_batch using parallel_mode={parallel_mode}",
         None,
         level="high",
     )
+    plan, row_pairs = _plan_for_pairs(plan, row_pairs, schema=schema)
     filtered = _filter_pairs_by_hash(
-        row_pairs, workers=workers, chunk_size=chunk_size, mode=parallel_mode
+        row_pairs,
+        workers=workers,
+        chunk_size=chunk_size,
+        mode=parallel_mode,
+        plan=plan,
+        shared_memory=shared_memory,
+        schema=schema,
     )
     for result in compare_row_pairs_parallel_detailed(
-        filtered, workers=workers, progress=progress, parallel_mode="thread"
+        filtered,
+        workers=workers,
+        progress=progress,
+        parallel_mode="thread",
+        plan=plan,
+        batch_size=batch_size,
+        max_in_flight=max_in_flight,
+        shared_memory=shared_memory,
+        schema=schema,
     ):
         yield result
 
@@ -607,7 +1037,17 @@ def compare_row_pairs(
     *,
     workers: int = 4,
     progress=None,
+    plan: Optional[ComparisonPlan] = None,
+    schema: Optional[RowSchema] = None,
 ) -> Iterable[dict]:
+    """Dispatch *row_pairs* to the configured comparison engine.
+
+    A single :class:`~logic.comparison_plan.ComparisonPlan` is used for every
+    pair. Pass ``plan`` to reuse one built per table; otherwise it is inferred
+    from a sample of the first pairs. ``schema`` describes tuple rows from
+    ``fetch_rows(row_mode="tuple")``; dict rows need none.
+    """
+    plan, row_pairs = _plan_for_pairs(plan, row_pairs, schema=schema)
     it = iter(row_pairs)
     first = next(it, None)
     if first is None:
@@ -633,8 +1073,26 @@ def compare_row_pairs(
                 workers=workers,
                 progress=progress,
                 parallel_mode=parallel_mode,
+                plan=plan,
+                batch_size=config.get("comparison", {}).get("task_batch_size", 2000),
+                max_in_flight=config.get("comparison", {}).get("max_in_flight"),
+                shared_memory=config.get("comparison", {}).get("shared_memory", True),
+                schema=schema,
             )
         return compare_row_pairs_parallel_detailed(
-            pairs, workers=workers, progress=progress, parallel_mode=parallel_mode
+            pairs,
+            workers=workers,
+            progress=progress,
+            parallel_mode=parallel_mode,
+            plan=plan,
+            batch_size=config.get("comparison", {}).get("task_batch_size", 2000),
+            max_in_flight=config.get("comparison", {}).get("max_in_flight"),
+            shared_memory=config.get("comparison", {}).get("shared_memory", True),
+            schema=schema,
         )
-    return compare_row_pairs_serial(pairs, progress=progress)
+    block_size = (
+        config.get("comparison", {}).get("block_size", 50_000) if config else 50_000
+    )
+    return compare_row_pairs_serial(
+        pairs, progress=progress, plan=plan, block_size=block_size, schema=schema
+    )
@@ -0,0 +1,389 @@
+"""Per-table column comparison plans.
+
+Historically every cell went through :func:`sanitize`, which tries ``float()``
+and then ``dateutil.parser.parse()`` until one of them succeeds.  A
+:class:`ComparisonPlan` resolves the *kind* of every column once per table,
+either from a DB-API cursor description or from a small sample of rows, and
+maps each column to a specialised normalizer so rows no longer pay for
+exception-driven type probing.
+
+Columns whose kind cannot be determined (for example a sample containing only
+``NULL`` values) use the ``auto`` kind which falls back to :func:`sanitize`.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from dateutil import parser
+
+NUMERIC = "numeric"
+DATE = "date"
+DATETIME = "datetime"
+STRING = "string"
+BINARY = "binary"
+AUTO = "auto"
+
+KINDS = (NUMERIC, DATE, DATETIME, STRING, BINARY, AUTO)
+
+# Tolerance used when comparing numeric values.
+NUMERIC_TOLERANCE = 1e-5
+
+
+def sanitize(value: Any) -> Any:
+    """Normalize *value* for comparison purposes."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except Exception:
+        pass
+    try:
+        return parser.parse(str(value)).date()
+    except Exception:
+        pass
+    return str(value).strip()
+
+
+def values_equal(source_val: Any, dest_val: Any) -> bool:
+    """Return ``True`` if the two provided values should be considered equal."""
+    # Attempt numeric comparison with tolerance
+    try:
+        a = float(source_val)
+        b = float(dest_val)
+        if abs(a - b) < NUMERIC_TOLERANCE:
+            return True
+    except Exception:
+        pass
+
+    # Attempt date comparison ignoring time component
+    try:
+        d1 = parser.parse(str(source_val)).date()
+        d2 = parser.parse(str(dest_val)).date()
+        if d1 == d2:
+            return True
+    except Exception:
+        pass
+
+    # Fallback to string equality
+    return str(source_val) == str(dest_val)
+
+
+# ---------------------------------------------------------------------------
+# Normalizers
+# ---------------------------------------------------------------------------
+
+
+def normalize_numeric(value: Any) -> Any:
+    """Return *value* as ``float`` or a stripped string if it is not numeric."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        # ``NaN`` shows up when pandas fills missing numeric cells.
+        return None if value != value else value
+    if isinstance(value, (int, Decimal)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+
+
+def _parse_date_str(text: str) -> Any:
+    text = text.strip()
+    # Fast path for ISO-like ``YYYY-MM-DD[ hh:mm:ss[.fffffff]]`` values which
+    # is what both drivers produce when dates are rendered as text.
+    if len(text) >= 10 and text[4] == "-" and text[7] == "-":
+        try:
+            return date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+        except ValueError:
+            pass
+    try:
+        return parser.parse(text).date()
+    except (ValueError, OverflowError):
+        return text
+
+
+def normalize_date(value: Any) -> Any:
+    """Return *value* as a :class:`datetime.date`.
+
+    Time components are dropped which mirrors the behaviour of
+    :func:`sanitize` so that ``2020-10-04 00:00:00`` equals ``2020-10-04``.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse_date_str(str(value))
+
+
+# Date and datetime columns share the same normalizer because comparisons
+# deliberately ignore the time component.
+normalize_datetime = normalize_date
+
+
+def normalize_string(value: Any) -> Any:
+    """Return *value* as a stripped string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip()
+    return str(value).strip()
+
+
+def normalize_binary(value: Any) -> Any:
+    """Return *value* as immutable ``bytes``."""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return str(value).strip().encode("utf-8")
+
+
+NORMALIZERS: Dict[str, Callable[[Any], Any]] = {
+    NUMERIC: normalize_numeric,
+    DATE: normalize_date,
+    DATETIME: normalize_datetime,
+    STRING: normalize_string,
+    BINARY: normalize_binary,
+    AUTO: sanitize,
+}
+
+
+# ---------------------------------------------------------------------------
+# Kind inference
+# ---------------------------------------------------------------------------
+
+# ``oracledb`` exposes ``DbType`` objects in ``cursor.description``; matching
+# on the type name avoids importing the driver here.
+_DB_TYPE_KINDS = {
+    "DB_TYPE_NUMBER": NUMERIC,
+    "DB_TYPE_BINARY_DOUBLE": NUMERIC,
+    "DB_TYPE_BINARY_FLOAT": NUMERIC,
+    "DB_TYPE_BINARY_INTEGER": NUMERIC,
+    "DB_TYPE_BOOLEAN": NUMERIC,
+    "DB_TYPE_DATE": DATETIME,
+    "DB_TYPE_TIMESTAMP": DATETIME,
+    "DB_TYPE_TIMESTAMP_TZ": DATETIME,
+    "DB_TYPE_TIMESTAMP_LTZ": DATETIME,
+    "DB_TYPE_CHAR": STRING,
+    "DB_TYPE_NCHAR": STRING,
+    "DB_TYPE_VARCHAR": STRING,
+    "DB_TYPE_NVARCHAR": STRING,
+    "DB_TYPE_LONG": STRING,
+    "DB_TYPE_CLOB": STRING,
+    "DB_TYPE_NCLOB": STRING,
+    "DB_TYPE_RAW": BINARY,
+    "DB_TYPE_LONG_RAW": BINARY,
+    "DB_TYPE_BLOB": BINARY,
+}
+
+
+# Large object types whose values have no declared maximum size.
+_LOB_TYPES = {
+    "DB_TYPE_CLOB",
+    "DB_TYPE_NCLOB",
+    "DB_TYPE_BLOB",
+    "DB_TYPE_LONG",
+    "DB_TYPE_LONG_NVARCHAR",
+    "DB_TYPE_LONG_RAW",
+}
+
+
+def size_from_description(desc: Sequence[Any]) -> Optional[int]:
+    """Return the declared size of a described column, ``None`` if unbounded.
+
+    ``oracledb`` reports the size in characters as ``display_size`` while
+    ``pyodbc`` only fills ``internal_size`` and reports ``0`` for ``MAX``
+    types. LOB columns are always unbounded.
+    """
+    name = getattr(desc[1], "name", None)
+    if name is not None and str(name).upper() in _LOB_TYPES:
+        return None
+    for size in desc[2:4]:
+        if isinstance(size, int) and size > 0:
+            return size
+    return None
+
+
+def kind_from_type_code(type_code: Any) -> str:
+    """Return the column kind for a DB-API ``type_code``.
+
+    ``pyodbc`` reports Python classes such as ``int`` or ``datetime`` whereas
+    ``oracledb`` reports ``DbType`` objects.  Unknown codes map to ``auto``.
+    """
+    if isinstance(type_code, type):
+        if issubclass(type_code, (bool, int, float, Decimal)):
+            return NUMERIC
+        if issubclass(type_code, datetime):
+            return DATETIME
+        if issubclass(type_code, date):
+            return DATE
+        if issubclass(type_code, (bytes, bytearray, memoryview)):
+            return BINARY
+        if issubclass(type_code, str):
+            return STRING
+        return AUTO
+    name = getattr(type_code, "name", None) or str(type_code)
+    return _DB_TYPE_KINDS.get(str(name).upper(), AUTO)
+
+
+def kind_from_value(value: Any) -> Optional[str]:
+    """Return the kind of a single sampled *value* or ``None`` for nulls."""
+    if value is None:
+        return None
+    if isinstance(value, (bool, int, float, Decimal)):
+        return NUMERIC
+    if isinstance(value, datetime):
+        return DATETIME
+    if isinstance(value, date):
+        return DATE
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return BINARY
+    text = str(value).strip()
+    try:
+        float(text)
+        return NUMERIC
+    except ValueError:
+        pass
+    try:
+        parser.parse(text)
+    except (ValueError, OverflowError):
+        return STRING
+    return DATETIME if len(text) > 10 else DATE
+
+
+def merge_kinds(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """Combine two column kinds into one that can normalize both inputs.
+
+    Numeric and date normalizers tolerate string input so they win over
+    ``string``.  Incompatible combinations degrade to ``auto``.
+    """
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    pair = {a, b}
+    if AUTO in pair:
+        return AUTO
+    if pair == {DATE, DATETIME}:
+        return DATETIME
+    if STRING in pair:
+        other = (pair - {STRING}).pop()
+        if other in (NUMERIC, DATE, DATETIME):
+            return other
+    return AUTO
+
+
+def infer_kind(values: Iterable[Any]) -> str:
+    """Return the kind shared by the sampled *values*."""
+    kind: Optional[str] = None
+    for value in values:
+        kind = merge_kinds(kind, kind_from_value(value))
+        if kind == AUTO:
+            break
+    return kind or AUTO
+
+
+class ComparisonPlan:
+    """Fixed column kinds and normalizers used to compare rows of one table.
+
+    ``sizes`` optionally records each column's declared size (``None`` for
+    LOB and ``MAX`` columns) when the plan is built from a cursor
+    description.
+    """
+
+    def __init__(self, kinds: Dict[str, str], sizes: Optional[Dict[str, Optional[int]]] = None):
+        unknown = set(kinds.values()) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Unknown column kinds: {sorted(unknown)}")
+        self.kinds = dict(kinds)
+        self.sizes = dict(sizes or {})
+        self.normalizers = {col: NORMALIZERS[k] for col, k in self.kinds.items()}
+
+    def __repr__(self) -> str:
+        return f"ComparisonPlan({self.kinds!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ComparisonPlan) and other.kinds == self.kinds
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.kinds)
+
+    def kind(self, column: str) -> str:
+        return self.kinds.get(column, AUTO)
+
+    def normalizer(self, column: str) -> Callable[[Any], Any]:
+        return self.normalizers.get(column, sanitize)
+
+    def normalize(self, column: str, value: Any) -> Any:
+        return self.normalizers.get(column, sanitize)(value)
+
+    def normalize_row(self, row: dict, columns: Optional[Iterable[str]] = None) -> dict:
+        """Return a new dict with normalized values for *columns*."""
+        cols = self.kinds if columns is None else columns
+        return {c: self.normalizers.get(c, sanitize)(row.get(c)) for c in cols}
+
+    def values_equal(self, column: str, a: Any, b: Any) -> bool:
+        """Compare two already normalized values of *column*."""
+        if a is None or b is None:
+            return a is None and b is None
+        kind = self.kinds.get(column, AUTO)
+        if kind == AUTO:
+            return values_equal(a, b)
+        if kind == NUMERIC and isinstance(a, float) and isinstance(b, float):
+            return abs(a - b) < NUMERIC_TOLERANCE
+        return a == b
+
+    def merge(self, other: "ComparisonPlan") -> "ComparisonPlan":
+        """Return a plan that can normalize values described by both plans."""
+        kinds = dict(self.kinds)
+        for col, kind in other.kinds.items():
+            kinds[col] = merge_kinds(kinds.get(col), kind) or AUTO
+        return ComparisonPlan(kinds)
+
+
+def build_plan_from_description(
+    description: Optional[Sequence[Sequence[Any]]],
+    columns: Sequence[str],
+) -> ComparisonPlan:
+    """Build a plan from a DB-API ``cursor.description``.
+
+    ``columns`` holds the logical column names in select order which is how
+    :func:`runners.reconcile.fetch_rows` labels its rows.
+    """
+    kinds: Dict[str, str] = {}
+    sizes: Dict[str, Optional[int]] = {}
+    for col, desc in zip(columns, description or ()):
+        kinds[col] = kind_from_type_code(desc[1])
+        if len(desc) > 3:
+            sizes[col] = size_from_description(desc)
+    for col in columns:
+        kinds.setdefault(col, AUTO)
+    return ComparisonPlan(kinds, sizes)
+
+
+def build_plan_from_rows(
+    rows: Iterable[dict],
+    columns: Iterable[str],
+    *,
+    sample_size: int = 1000,
+) -> ComparisonPlan:
+    """Infer a plan from up to ``sample_size`` row dictionaries."""
+    columns = list(columns)
+    kinds: Dict[str, Optional[str]] = {c: None for c in columns}
+    for idx, row in enumerate(rows):
+        if idx >= sample_size:
+            break
+        for col in columns:
+            if kinds[col] == AUTO:
+                continue
+            kinds[col] = merge_kinds(kinds[col], kind_from_value(row.get(col)))
+    return ComparisonPlan({c: k or AUTO for c, k in kinds.items()})
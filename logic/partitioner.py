@@ -1,6 +1,6 @@
 """Utilities for iterating over configured table partitions."""
 
-from typing import Dict, Iterable
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 
 def get_partitions(config: Dict) -> Iterable[Dict]:
@@ -26,3 +26,98 @@ def get_partitions(config: Dict) -> Iterable[Dict]:
                 "year": year,
                 "month": month
             }
+
+
+def split_pk_ranges(partition: Dict, boundaries: Sequence) -> List[Dict]:
+    """Return *partition* split at the sorted primary key *boundaries*.
+
+    Each sub-partition carries ``pk_range = (low, high)`` selecting
+    ``low <= pk < high``; the first range has no lower and the last no upper
+    bound so together they cover every key exactly once, whatever either
+    side holds. ``range``/``ranges`` number the pieces for labels.
+    """
+    bounds = sorted(set(boundaries))
+    if not bounds:
+        return [partition]
+    edges = [None] + bounds + [None]
+    ranges = len(edges) - 1
+    return [
+        {**partition, "pk_range": (edges[i], edges[i + 1]), "range": i + 1, "ranges": ranges}
+        for i in range(ranges)
+    ]
+
+
+def split_large_partitions(
+    partitions: Iterable[Dict],
+    count_rows: Callable[[Dict], int],
+    fetch_boundaries: Callable[[Dict, int], Sequence],
+    *,
+    threshold: int,
+    target_rows: int,
+) -> List[Dict]:
+    """Split partitions holding more than *threshold* rows into PK ranges.
+
+    ``count_rows(partition)`` estimates a partition's rows and
+    ``fetch_boundaries(partition, pieces)`` returns ``pieces - 1`` primary
+    keys dividing it into ranges of about *target_rows* rows. Smaller
+    partitions are returned unchanged.
+    """
+    result: List[Dict] = []
+    for partition in partitions:
+        rows = count_rows(partition)
+        if rows <= threshold:
+            result.append(partition)
+            continue
+        pieces = -(-rows // max(1, target_rows))
+        result.extend(split_pk_ranges(partition, fetch_boundaries(partition, pieces)))
+    return result
+
+
+# ``{bucket: (row_count, checksum_1, checksum_2)}`` as returned by
+# :func:`runners.reconcile.fetch_bucket_checksums`.
+BucketChecksums = Dict[int, Tuple[int, int, int]]
+ChecksumFetcher = Callable[[int, Optional[Tuple[int, Sequence[int]]]], BucketChecksums]
+
+
+def drill_down_checksums(
+    fetch_source: ChecksumFetcher,
+    fetch_dest: ChecksumFetcher,
+    *,
+    fanout: int = 16,
+    leaf_size: int = 10_000,
+    max_depth: int = 6,
+) -> Tuple[int, List[int], Dict[str, int]]:
+    """Locate primary key buckets whose aggregate checksums differ.
+
+    ``fetch_source`` and ``fetch_dest`` are called as
+    ``fetch(modulus, parent)`` and return bucket checksums for one side.
+    The first level uses ``modulus=1`` so identical partitions cost a single
+    round trip per side. Mismatching buckets are split ``fanout`` ways per
+    level until none holds more than ``leaf_size`` rows or ``max_depth`` is
+    reached.
+
+    Returns ``(modulus, buckets, stats)``. ``buckets`` is empty when both
+    sides match, otherwise rows with ``pk_bucket % modulus`` in ``buckets``
+    must be fetched and compared row by row.
+    """
+    modulus = 1
+    parent: Optional[Tuple[int, Sequence[int]]] = None
+    stats = {"levels": 0, "buckets_checked": 0}
+    for depth in range(max_depth + 1):
+        src = fetch_source(modulus, parent)
+        dest = fetch_dest(modulus, parent)
+        stats["levels"] += 1
+        keys = sorted(set(src) | set(dest))
+        stats["buckets_checked"] += len(keys)
+        empty = (0, 0, 0)
+        mismatched = [b for b in keys if src.get(b, empty) != dest.get(b, empty)]
+        if not mismatched:
+            return modulus, [], stats
+        largest = max(
+            max(src.get(b, empty)[0], dest.get(b, empty)[0]) for b in mismatched
+        )
+        if largest <= leaf_size or depth == max_depth:
+            return modulus, mismatched, stats
+        parent = (modulus, mismatched)
+        modulus *= fanout
+    return modulus, mismatched, stats  # pragma: no cover - loop always returns
@@ -1,8 +1,13 @@
 """Output utilities for writing discrepancy reports."""
 
-import csv
-import os
-from typing import Iterable, List, Dict, Any
+import json
+import queue
+import threading
+from contextlib import nullcontext
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional
+from logic.sinks import CsvSink
 from utils.logger import debug_log
 
 # Suppress dateutil UnknownTimezoneWarning globally
@@ -16,10 +21,148 @@ except Exception:  # pragma: no cover - optional dependency
     pyodbc = None  # type: ignore
 
 
+WRITE_STRATEGIES = ("merge", "delete_insert")
+KEY_COLUMNS = ("primary_key", "column")
+
+# ``[type]`` codes stored by the typed layout.
+TYPE_CODES = {"mismatch": "M", "missing_in_dest": "S", "extra_in_dest": "D"}
+
+# Column types of the typed layout; other columns are VARCHAR(MAX). The
+# key columns stay within SQL Server's 900 byte index key limit.
+TYPED_COLUMNS = {
+    "primary_key": "VARCHAR(400)",
+    "type": "CHAR(1)",
+    "column": "VARCHAR(128)",
+    "year": "SMALLINT",
+    "month": "TINYINT",
+    "week": "TINYINT",
+    "source_hash": "VARCHAR(128)",
+    "dest_hash": "VARCHAR(128)",
+    "payload": "VARBINARY(MAX)",
+}
+# Order of the clustered index, matching the partition, type and column
+# filters of ``fix_mismatches`` and ``clear_partition_output``.
+CLUSTER_COLUMNS = ("year", "month", "week", "type", "column", "primary_key")
+
+
+def encode_record(record: Dict, typed: bool = False) -> Dict:
+    """Return *record* in the layout stored by :class:`DiscrepancyWriter`.
+
+    Full rows of ``missing_in_dest``/``extra_in_dest`` records are dumped as
+    JSON. The typed layout moves them to ``payload`` (compressed by SQL
+    Server) and stores the one character ``[type]`` code; otherwise the JSON
+    stays in the value column. Records without a ``type`` are unchanged.
+    """
+    if "type" not in record:
+        return record
+    record = dict(record)
+    payload = None
+    for side in ("source_value", "dest_value"):
+        if isinstance(record.get(side), dict):
+            payload = json.dumps(record[side], default=str)
+            record[side] = None if typed else payload
+    if typed:
+        record["type"] = TYPE_CODES.get(record["type"], record["type"])
+        record["payload"] = payload
+    return record
+
+
+@lru_cache(maxsize=None)
+def _writer_sql(
+    kind: str, target_table: str, temp_table: str, columns: tuple, compress: tuple = ()
+) -> str:
+    """Return the *kind* statement of :class:`DiscrepancyWriter` for *columns*.
+
+    Statements are cached per table and column set so every writer of a run
+    sends identical text and SQL Server reuses the compiled plans.
+    ``"stage"`` is the parameterised multi-row insert into *target_table*;
+    ``"merge"``, ``"delete"`` and ``"append"`` move *temp_table* into it.
+    Values of the *compress* columns are wrapped in ``COMPRESS()`` on their
+    way into *target_table*.
+    """
+    cols = ", ".join(f"[{c}]" for c in columns)
+    key_cols = [c for c in KEY_COLUMNS if c in columns]
+
+    def value(c: str, expr: str) -> str:
+        return f"COMPRESS({expr})" if c in compress else expr
+
+    if kind == "stage":
+        return (
+            f"INSERT INTO {target_table} ({cols}) "
+            f"VALUES ({', '.join(value(c, '?') for c in columns)})"
+        )
+    if kind == "append":
+        select = ", ".join(value(c, f"[{c}]") for c in columns)
+        return f"INSERT INTO {target_table} ({cols}) SELECT {select} FROM {temp_table}"
+    if not key_cols:
+        raise ValueError("Cannot merge without key columns")
+    # ``column`` is NULL for missing/extra rows, so match NULLs too.
+    on_clause = " AND ".join(
+        f"(target.[{c}] = source.[{c}] OR (target.[{c}] IS NULL AND source.[{c}] IS NULL))"
+        for c in key_cols
+    )
+    if kind == "delete":
+        return (
+            f"DELETE target FROM {target_table} AS target "
+            f"INNER JOIN {temp_table} AS source ON {on_clause}"
+        )
+    if kind == "merge":
+        update_clause = ", ".join(
+            f"target.[{c}] = {value(c, f'source.[{c}]')}" for c in columns if c not in key_cols
+        )
+        insert_vals = ", ".join(value(c, f"source.[{c}]") for c in columns)
+        matched = f"WHEN MATCHED THEN UPDATE SET {update_clause}" if update_clause else ""
+        return f"""
+        MERGE {target_table} AS target
+        USING {temp_table} AS source
+        ON {on_clause}
+        {matched}
+        WHEN NOT MATCHED THEN INSERT ({cols}) VALUES ({insert_vals});
+        """
+    raise ValueError(f"Unknown statement kind: {kind}")
+
+
 class DiscrepancyWriter:
-    """Incrementally write discrepancy records to a SQL Server table."""
+    """Incrementally write discrepancy records to a SQL Server table.
+
+    Batches are bulk loaded into a session temp table created once per
+    writer and truncated between batches, then moved into the target with
+    the ``strategy``: ``"merge"`` upserts on ``primary_key``/``column``,
+    ``"delete_insert"`` deletes the writer's *partition* from the target in
+    the first batch's transaction, or on :meth:`close` if nothing was
+    written (without a partition, each batch's keys), and then only
+    appends. Schemas without either key column are appended with
+    one ``executemany`` per batch. Statement text is cached per column set
+    (see :func:`_writer_sql`) so SQL Server reuses the plans.
+
+    Records are stored through :func:`encode_record`. With ``typed`` a new
+    table gets the :data:`TYPED_COLUMNS` types, a page compressed clustered
+    index in :data:`CLUSTER_COLUMNS` order and an index on
+    ``primary_key``/``column``; existing tables are used as they are, so it
+    is opt-in for tables created by earlier versions.
 
-    def __init__(self, conn: Any, schema: str, table: str, batch_size: int = 1000):
+    ``flushed`` counts the records committed so far; ``on_flush`` is called
+    with it after every committed batch so callers can checkpoint progress.
+    Every statement runs inside ``write_slot()`` when given, so callers can
+    cap concurrent writes per batch rather than per writer.
+    """
+
+    temp_table = "#temp_discrepancies"
+
+    def __init__(
+        self,
+        conn: Any,
+        schema: str,
+        table: str,
+        batch_size: int = 1000,
+        on_flush: Optional[Callable[[int], None]] = None,
+        strategy: str = "merge",
+        partition: Optional[Dict] = None,
+        typed: bool = False,
+        write_slot: Optional[Callable[[], ContextManager]] = None,
+    ):
+        if strategy not in WRITE_STRATEGIES:
+            raise ValueError(f"Unsupported write strategy: {strategy}")
         self.conn = conn
         self.schema = schema
         self.table = table
@@ -27,36 +170,69 @@ class DiscrepancyWriter:
         self.columns: List[str] | None = None
         self.buffer: List[Dict] = []
         self.prepared = False
+        self.flushed = 0
+        self.on_flush = on_flush
+        self.strategy = strategy
+        self.partition = partition
+        self.typed = typed
+        self.write_slot = write_slot or nullcontext
+        self._staged = False
+        self._partition_cleared = False
 
     def _full_table(self) -> str:
         return f"{self.schema}.{self.table}" if self.schema else self.table
 
+    def _column_type(self, column: str, staging: bool = False) -> str:
+        if not self.typed:
+            return "VARCHAR(500)" if column in KEY_COLUMNS else "VARCHAR(MAX)"
+        if staging and column == "payload":
+            # Staged as JSON text, compressed when moved into the target.
+            return "NVARCHAR(MAX)"
+        return TYPED_COLUMNS.get(column, "VARCHAR(MAX)")
+
+    def _compressed(self) -> tuple:
+        return ("payload",) if self.typed and "payload" in self.columns else ()
+
+    def _index_sql(self, full_table: str) -> str:
+        if not self.typed:
+            return ""
+        statements = []
+        cluster = [c for c in CLUSTER_COLUMNS if c in self.columns]
+        if cluster:
+            statements.append(
+                f"CREATE CLUSTERED INDEX [CX_{self.table}_partition] ON {full_table} "
+                f"({', '.join(f'[{c}]' for c in cluster)}) WITH (DATA_COMPRESSION = PAGE)"
+            )
+        keys = [c for c in KEY_COLUMNS if c in self.columns]
+        if keys:
+            statements.append(
+                f"CREATE NONCLUSTERED INDEX [IX_{self.table}_key] ON {full_table} "
+                f"({', '.join(f'[{c}]' for c in keys)}) WITH (DATA_COMPRESSION = PAGE)"
+            )
+        return "\n".join(statements)
+
     def _prepare_table(self, record: Dict):
         if self.prepared:
             return
         self.columns = list(record.keys())
         cursor = self.conn.cursor()
         full_table = self._full_table()
-        column_defs = ", ".join(
-            (
-                f"[{c}] VARCHAR(500)"
-                if c in ("primary_key", "column")
-                else f"[{c}] VARCHAR(MAX)"
-            )
-            for c in self.columns
-        )
+        column_defs = ", ".join(f"[{c}] {self._column_type(c)}" for c in self.columns)
         create_sql = f"""
         IF OBJECT_ID('{full_table}', 'U') IS NULL
         BEGIN
             CREATE TABLE {full_table} ({column_defs})
+            {self._index_sql(full_table)}
         END
         """
-        cursor.execute(create_sql)
-        debug_log(f"Ensuring discrepancy table exists: {full_table}", {}, level="low")
-        self.conn.commit()
+        with self.write_slot():
+            cursor.execute(create_sql)
+            debug_log(f"Ensuring discrepancy table exists: {full_table}", {}, level="low")
+            self.conn.commit()
         self.prepared = True
 
     def write(self, record: Dict):
+        record = encode_record(record, self.typed)
         self._prepare_table(record)
         self.buffer.append(record)
         if len(self.buffer) >= self.batch_size:
@@ -69,16 +245,11 @@ class DiscrepancyWriter:
             return
         cursor = self.conn.cursor()
         full_table = self._full_table()
-        temp_table = "#temp_discrepancies"
+        temp_table = self.temp_table
 
         try:
-            if any(c in self.columns for c in ("primary_key", "column")):
-                self._create_temp_table(cursor, temp_table)
-                self._bulk_insert_temp(cursor, temp_table, self.buffer)
-                self._merge_temp_into_target(cursor, temp_table, full_table)
-            else:
-                self._merge_records(cursor, full_table, self.buffer)
-            self.conn.commit()
+            with self.write_slot():
+                self._write_batch(cursor, full_table, temp_table)
             debug_log(
                 f"Merged {len(self.buffer)} rows from temp into {full_table}",
                 {},
@@ -87,97 +258,78 @@ class DiscrepancyWriter:
         except Exception as e:
             debug_log(f"Failed to merge rows into {full_table}: {e}", {}, level="high")
             raise
+        self.flushed += len(self.buffer)
         self.buffer.clear()
+        if self.on_flush is not None:
+            self.on_flush(self.flushed)
+
+    def _write_batch(self, cursor, full_table: str, temp_table: str):
+        if any(c in self.columns for c in KEY_COLUMNS):
+            self._create_temp_table(cursor, temp_table)
+            self._bulk_insert(cursor, temp_table, self.buffer)
+            if self.strategy == "delete_insert":
+                self._replace_into_target(cursor, temp_table, full_table)
+            else:
+                self._merge_temp_into_target(cursor, temp_table, full_table)
+        else:
+            # Schemas without ``primary_key``/``column`` (tests, one-off
+            # scripts) have nothing to merge on, so batches are appended.
+            self._bulk_insert(cursor, full_table, self.buffer, self._compressed())
+        self.conn.commit()
 
     def _create_temp_table(self, cursor, temp_table: str):
+        """Create the staging table on first use, afterwards empty it."""
+        if self._staged:
+            cursor.execute(f"TRUNCATE TABLE {temp_table}")
+            return
         column_defs = ", ".join(
-            (
-                f"[{c}] VARCHAR(500)"
-                if c in ("primary_key", "column")
-                else f"[{c}] VARCHAR(MAX)"
-            )
-            for c in self.columns
+            f"[{c}] {self._column_type(c, staging=True)}" for c in self.columns
         )
         cursor.execute(
             f"IF OBJECT_ID('tempdb..{temp_table}') IS NOT NULL DROP TABLE {temp_table}"
         )
         cursor.execute(f"CREATE TABLE {temp_table} ({column_defs})")
+        self._staged = True
 
-    def _bulk_insert_temp(self, cursor, temp_table: str, records: List[Dict]):
-        insert_sql = f"INSERT INTO {temp_table} ({', '.join(f'[{c}]' for c in self.columns)}) VALUES ({', '.join('?' for _ in self.columns)})"
+    def _bulk_insert(self, cursor, table: str, records: List[Dict], compress: tuple = ()):
+        insert_sql = _writer_sql("stage", table, "", tuple(self.columns), compress)
         values = [[rec[c] for c in self.columns] for rec in records]
         cursor.fast_executemany = True
         cursor.executemany(insert_sql, values)
         cursor.fast_executemany = False
 
-    def _merge_temp_into_target(self, cursor, temp_table: str, target_table: str):
-        key_cols = [c for c in ("primary_key", "column") if c in self.columns]
-        if not key_cols:
-            raise ValueError("Cannot merge without key columns")
-
-        on_clause = " AND ".join(f"target.[{c}] = source.[{c}]" for c in key_cols)
-        update_clause = ", ".join(
-            f"target.[{c}] = source.[{c}]" for c in self.columns if c not in key_cols
-        )
-        insert_cols = ", ".join(f"[{c}]" for c in self.columns)
-        insert_vals = ", ".join(f"source.[{c}]" for c in self.columns)
-
-        merge_sql = f"""
-        MERGE {target_table} AS target
-        USING {temp_table} AS source
-        ON {on_clause}
-        WHEN MATCHED THEN UPDATE SET {update_clause}
-        WHEN NOT MATCHED THEN INSERT ({insert_cols}) VALUES ({insert_vals});
-        """
-        cursor.execute(merge_sql)
-
-    def _merge_records(self, cursor, full_table: str, records: List[Dict]):
-        # Only treat these as key columns if they are present in the record. This
-        # allows ``DiscrepancyWriter`` to be used with arbitrary schemas in
-        # tests or one-off scripts where ``primary_key``/``column`` fields may be
-        # absent. If no key columns are available we fall back to a simple
-        # ``INSERT`` statement.
-        key_cols = [c for c in ("primary_key", "column") if c in self.columns]
-
-        for rec in records:
-            if not key_cols:
-                insert_cols = ", ".join(f"[{col}]" for col in self.columns)
-                insert_vals = ", ".join("?" for _ in self.columns)
-                insert_sql = (
-                    f"INSERT INTO {full_table} ({insert_cols}) VALUES ({insert_vals})"
+    def _replace_into_target(self, cursor, temp_table: str, target_table: str):
+        """Delete the rows the batch replaces, then append it."""
+        columns = tuple(self.columns)
+        if self.partition is not None:
+            if not self._partition_cleared:
+                # Committed with this batch, so a failed insert keeps the old rows.
+                clear_partition_output(
+                    self.conn, self.schema, self.table, self.partition, commit=False
                 )
-                cursor.execute(insert_sql, [rec[col] for col in self.columns])
-                continue
-
-            update_set = ", ".join(
-                f"[{col}] = ?" for col in self.columns if col not in key_cols
-            )
-            insert_cols = ", ".join(f"[{col}]" for col in self.columns)
-            insert_vals = ", ".join("?" for _ in self.columns)
+                self._partition_cleared = True
+        else:
+            cursor.execute(_writer_sql("delete", target_table, temp_table, columns))
+        cursor.execute(
+            _writer_sql("append", target_table, temp_table, columns, self._compressed())
+        )
 
-            on_clause = " AND ".join(
-                f"target.[{col}] = source.[{col}]" for col in key_cols
-            )
-            using_select = ", ".join(f"? AS [{col}]" for col in key_cols)
-
-            merge_sql = f"""
-            MERGE {full_table} AS target
-            USING (SELECT {using_select}) AS source
-            ON {on_clause}
-            WHEN MATCHED THEN
-                UPDATE SET {update_set}
-            WHEN NOT MATCHED THEN
-                INSERT ({insert_cols}) VALUES ({insert_vals});
-            """
-            values = (
-                [rec[col] for col in key_cols]
-                + [rec[col] for col in self.columns if col not in key_cols]
-                + [rec[col] for col in self.columns]
-            )
-            cursor.execute(merge_sql, values)
+    def _merge_temp_into_target(self, cursor, temp_table: str, target_table: str):
+        cursor.execute(
+            _writer_sql("merge", target_table, temp_table, tuple(self.columns), self._compressed())
+        )
 
     def close(self):
         self.flush()
+        if (
+            self.strategy == "delete_insert"
+            and self.partition is not None
+            and not self._partition_cleared
+        ):
+            # No discrepancies this time: the previous run's rows are stale.
+            with self.write_slot():
+                clear_partition_output(self.conn, self.schema, self.table, self.partition)
+            self._partition_cleared = True
 
     # ------------------------------------------------------------------
     # Context manager helpers make ``DiscrepancyWriter`` usable with ``with``
@@ -191,18 +343,186 @@ class DiscrepancyWriter:
         self.close()
 
 
+class AsyncDiscrepancyWriter:
+    """Write discrepancy batches from a background thread.
+
+    Records fill a buffer of ``batch_size`` records on the caller's thread.
+    Full buffers are handed through a queue of at most ``max_pending``
+    batches to a writer thread which owns *conn* and runs the temp table,
+    ``executemany`` and ``MERGE`` of :class:`DiscrepancyWriter`. The compare
+    loop therefore keeps filling the next buffer while the previous one is
+    written, and blocks only when ``max_pending`` batches are already
+    waiting. An error in the writer thread is re-raised by the next
+    :meth:`write`, :meth:`flush` or :meth:`close` call. ``flushed``,
+    ``on_flush`` (called from the writer thread) and further keyword
+    arguments such as ``strategy`` behave as on :class:`DiscrepancyWriter`.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        conn: Any,
+        schema: str,
+        table: str,
+        batch_size: int = 1000,
+        on_flush: Optional[Callable[[int], None]] = None,
+        max_pending: int = 2,
+        **writer_options: Any,
+    ):
+        self.batch_size = batch_size
+        self._writer = DiscrepancyWriter(
+            conn, schema, table, batch_size, on_flush, **writer_options
+        )
+        self.buffer: List[Dict] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"discrepancy-writer-{table}", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def flushed(self) -> int:
+        return self._writer.flushed
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is self._STOP:
+                    if self._error is None:
+                        # Lets the wrapped writer finish, e.g. clear an empty partition.
+                        self._writer.close()
+                    return
+                if self._error is None and batch:
+                    # Runs on this thread only; the producer never touches
+                    # the wrapped writer after start-up.
+                    self._writer._prepare_table(batch[0])
+                    self._writer.buffer = batch
+                    self._writer.flush()
+            except BaseException as exc:
+                debug_log(f"Background discrepancy write failed: {exc}", {}, level="low")
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _submit(self) -> None:
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        # Blocks while ``max_pending`` batches wait: back-pressure on the producer.
+        self._queue.put(batch)
+
+    def write(self, record: Dict) -> None:
+        self._raise_error()
+        # Encoded here, like DiscrepancyWriter.write, before the writer thread stages it.
+        self.buffer.append(encode_record(record, self._writer.typed))
+        if len(self.buffer) >= self.batch_size:
+            self._submit()
+
+    def flush(self) -> None:
+        """Hand over the partial buffer and wait until everything is written."""
+        self._raise_error()
+        self._submit()
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.close()
+        except Exception as write_exc:
+            if exc_type is None:
+                raise
+            # Do not mask the error that ended the block.
+            debug_log(f"Discarding writer error after failure: {write_exc}", {}, level="low")
+
+
+def pk_range_clauses(partition: Dict, column: str = "[primary_key]") -> tuple:
+    """Return the clauses and parameters limiting *column* to ``pk_range``.
+
+    Keys are stored as text, so numeric bounds compare the key cast to a
+    number.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    low, high = partition.get("pk_range") or (None, None)
+    for bound, op in ((low, ">="), (high, "<")):
+        if bound is None:
+            continue
+        numeric = isinstance(bound, (int, float, Decimal)) and not isinstance(bound, bool)
+        key = f"TRY_CAST({column} AS DECIMAL(38, 10))" if numeric else column
+        clauses.append(f"{key} {op} ?")
+        params.append(bound)
+    return clauses, params
+
+
+def clear_partition_output(
+    conn: Any, schema: str, table: str, partition: Dict, *, commit: bool = True
+) -> int:
+    """Delete the discrepancy rows written for *partition* and return the count.
+
+    Used before re-processing a partition whose previous attempt was
+    interrupted. A ``pk_range`` limits the delete to that range of keys.
+    Does nothing if the output table does not exist yet. With
+    ``commit=False`` the delete joins the caller's transaction.
+    """
+    full_table = f"{schema}.{table}" if schema else table
+    clauses = ["[year] = ?", "[month] = ?"]
+    params: List[Any] = [partition.get("year"), partition.get("month")]
+    if partition.get("week") is not None:
+        clauses.append("[week] = ?")
+        params.append(partition["week"])
+    else:
+        clauses.append("[week] IS NULL")
+    range_clauses, range_params = pk_range_clauses(partition)
+    clauses += range_clauses
+    params += range_params
+    cursor = conn.cursor()
+    cursor.execute(
+        f"IF OBJECT_ID('{full_table}', 'U') IS NOT NULL "
+        f"DELETE FROM {full_table} WHERE {' AND '.join(clauses)}",
+        tuple(params),
+    )
+    deleted = max(cursor.rowcount, 0)
+    if commit:
+        conn.commit()
+    debug_log(f"Cleared {deleted} rows of {partition} from {full_table}", {}, level="low")
+    return deleted
+
+
 def write_discrepancies_to_csv(discrepancies: Iterable[Dict], output_path: str):
-    """Write discrepancy records to a CSV file."""
-    discrepancies = list(discrepancies)
-    if not discrepancies:
+    """Stream discrepancy records to a CSV file."""
+    sink = CsvSink(output_path)
+    try:
+        for record in discrepancies:
+            sink.write(record)
+    except BaseException:
+        sink.discard()
+        raise
+    if not sink.buffer and not sink.flushed:
+        sink.discard()
         print("No discrepancies found.")
         return
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    with open(output_path, mode="w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=discrepancies[0].keys())
-        writer.writeheader()
-        writer.writerows(discrepancies)
+    sink.close()
 
     print(f"Discrepancy report written to: {output_path}")
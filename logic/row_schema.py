@@ -0,0 +1,54 @@
+"""Column index schema for compact tuple rows.
+
+By default :func:`runners.reconcile.fetch_rows` yields one ``dict`` per row.
+With ``row_mode="tuple"`` it yields the driver's row tuples unchanged and a
+single :class:`RowSchema` shared by every row of the table maps logical
+column names to positions. Consumers look values up with :func:`row_value`
+(or :meth:`RowSchema.value`) which accepts both shapes.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+ROW_MODES = ("dict", "tuple")
+
+
+class RowSchema:
+    """Map the logical column names of tuple rows to their positions."""
+
+    def __init__(self, columns: Iterable[str]):
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.index: Dict[str, int] = {c: i for i, c in enumerate(self.columns)}
+
+    def value(self, row: Sequence[Any], column: str) -> Any:
+        """Return *column* of *row*, ``None`` if the schema lacks it."""
+        idx = self.index.get(column)
+        return None if idx is None else row[idx]
+
+    def to_dict(self, row: Sequence[Any]) -> Dict[str, Any]:
+        """Return *row* as a ``{column: value}`` dictionary."""
+        return dict(zip(self.columns, row))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RowSchema) and self.columns == other.columns
+
+    def __hash__(self) -> int:
+        return hash(self.columns)
+
+    def __repr__(self) -> str:
+        return f"RowSchema({list(self.columns)!r})"
+
+
+def row_value(row: Any, column: str, schema: Optional[RowSchema] = None) -> Any:
+    """Return *column* of a dict row, or of a tuple row described by *schema*."""
+    if schema is None:
+        return row.get(column)
+    return schema.value(row, column)
+
+
+def as_dict(row: Any, schema: Optional[RowSchema] = None) -> Any:
+    """Return *row* as a dictionary, converting tuple rows with *schema*."""
+    if row is None or schema is None:
+        return row
+    return schema.to_dict(row)
@@ -0,0 +1,253 @@
+"""Columnar shared-memory row batches for process-mode workers.
+
+Pickling row dictionaries to worker processes costs about as much as the
+work done there. :class:`SharedBatch` encodes a list of rows once into a
+single :mod:`multiprocessing.shared_memory` block laid out column by column:
+
+* numeric columns become ``float64`` arrays,
+* date and datetime columns become ``int64`` day numbers,
+* everything else (and values the vectorized conversion rejected) becomes
+  UTF-8 text addressed through an ``int64`` offsets array,
+
+plus a ``uint8`` flag per cell (``0`` value, ``1`` null, ``2`` text fallback).
+Only a small picklable layout dictionary is sent to workers, which map the
+block with :mod:`numpy` without copying and return hash arrays or the cells
+that could not be proven equal. Text is produced with
+:func:`logic.row_hasher.encode_value` so hashes computed here equal
+:meth:`logic.row_hasher.RowHasher.hash_row` with the default ``xxh3_64``.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import xxhash
+
+from logic.comparison_plan import (
+    DATE,
+    DATETIME,
+    NUMERIC,
+    NUMERIC_TOLERANCE,
+    ComparisonPlan,
+)
+from logic.row_hasher import FIELD_SEPARATOR, NULL_MARKER, encode_value
+from logic.row_schema import RowSchema, row_value
+
+VALUE = 0
+NULL = 1
+TEXT = 2
+
+# ``date.toordinal()`` of 1970-01-01 so day numbers map back to dates.
+_EPOCH_ORDINAL = 719163
+_ALIGN = 8
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _encode_column(
+    values: List[Any], kind: str
+) -> Tuple[str, Optional[np.ndarray], np.ndarray, List[bytes]]:
+    """Return ``(code, values, flags, texts)`` for one column."""
+    series = pd.Series(values, dtype=object)
+    if kind == NUMERIC:
+        # ``normalize_numeric`` maps ``NaN`` to ``None``; other kinds keep it.
+        null = np.fromiter(
+            (v is None or (isinstance(v, float) and v != v) for v in values),
+            dtype=bool,
+            count=len(values),
+        )
+    else:
+        null = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    if kind == NUMERIC:
+        code = "f"
+        array = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+        fallback = ~null & np.isnan(array)
+    elif kind in (DATE, DATETIME):
+        code = "d"
+        parsed = pd.to_datetime(
+            series.astype(str).str.strip().str.slice(0, 10),
+            format="%Y-%m-%d",
+            errors="coerce",
+        ).to_numpy()
+        fallback = ~null & np.isnat(parsed)
+        array = parsed.astype("datetime64[D]").astype(np.int64)
+    else:
+        code = "s"
+        array = None
+        fallback = ~null
+    flags = np.where(null, NULL, np.where(fallback, TEXT, VALUE)).astype(np.uint8)
+    texts = [
+        encode_value(values[i], kind) if fallback[i] else b""
+        for i in range(len(values))
+    ]
+    return code, array, flags, texts
+
+
+class SharedBatch:
+    """Rows encoded column by column into one shared memory block.
+
+    Use as a context manager or call :meth:`release` once workers are done;
+    the block is unlinked then. Workers only receive :attr:`layout`. *rows*
+    are dictionaries, or tuples described by ``schema``.
+    """
+
+    def __init__(
+        self,
+        rows: Sequence[Any],
+        columns: Sequence[str],
+        plan: ComparisonPlan,
+        *,
+        schema: Optional[RowSchema] = None,
+    ):
+        n = len(rows)
+        encoded = []
+        size = 0
+        for col in columns:
+            code, array, flags, texts = _encode_column(
+                [row_value(row, col, schema) for row in rows], plan.kind(col)
+            )
+            lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            spec: Dict[str, Any] = {"name": col, "code": code}
+            if array is not None:
+                spec["values"] = size
+                size += _aligned(array.nbytes)
+            spec["flags"] = size
+            size += _aligned(flags.nbytes)
+            spec["text_offsets"] = size
+            size += _aligned(offsets.nbytes)
+            spec["text"] = size
+            spec["text_size"] = int(offsets[-1])
+            size += _aligned(int(offsets[-1]))
+            encoded.append((spec, array, flags, offsets, b"".join(texts)))
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        buf = self._shm.buf
+        for spec, array, flags, offsets, text in encoded:
+            if array is not None:
+                np.ndarray(array.shape, array.dtype, buffer=buf, offset=spec["values"])[:] = array
+            np.ndarray(flags.shape, np.uint8, buffer=buf, offset=spec["flags"])[:] = flags
+            np.ndarray(offsets.shape, np.int64, buffer=buf, offset=spec["text_offsets"])[:] = offsets
+            buf[spec["text"]:spec["text"] + len(text)] = text
+        self.layout = {
+            "name": self._shm.name,
+            "rows": n,
+            "columns": [spec for spec, *_ in encoded],
+        }
+
+    def release(self) -> None:
+        """Close and unlink the shared memory block."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> "SharedBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+class _BatchView:
+    """Zero-copy numpy views over a :class:`SharedBatch` inside a worker."""
+
+    def __init__(self, layout: dict):
+        self.rows = layout["rows"]
+        self._shm = shared_memory.SharedMemory(name=layout["name"])
+        buf = self._shm.buf
+        n = self.rows
+        self.columns = []
+        for spec in layout["columns"]:
+            values = None
+            if spec["code"] == "f":
+                values = np.ndarray((n,), np.float64, buffer=buf, offset=spec["values"])
+            elif spec["code"] == "d":
+                values = np.ndarray((n,), np.int64, buffer=buf, offset=spec["values"])
+            flags = np.ndarray((n,), np.uint8, buffer=buf, offset=spec["flags"])
+            offsets = np.ndarray((n + 1,), np.int64, buffer=buf, offset=spec["text_offsets"])
+            text = buf[spec["text"]:spec["text"] + spec["text_size"]]
+            self.columns.append((spec["code"], values, flags, offsets, text))
+
+    def text(self, col: int, row: int) -> bytes:
+        _, _, _, offsets, text = self.columns[col]
+        return bytes(text[offsets[row]:offsets[row + 1]])
+
+    def canonical(self, col: int, row: int) -> bytes:
+        """Return the bytes :func:`encode_value` would produce for a cell."""
+        code, values, flags, _, _ = self.columns[col]
+        flag = flags[row]
+        if flag == NULL:
+            return NULL_MARKER
+        if flag == TEXT or code == "s":
+            return self.text(col, row)
+        if code == "f":
+            return b"%.5f" % values[row]
+        return date.fromordinal(int(values[row]) + _EPOCH_ORDINAL).isoformat().encode("utf-8")
+
+    def close(self) -> None:
+        # Views must be dropped before the mapping can be closed.
+        self.columns = []
+        self._shm.close()
+
+
+def hash_shared_rows(layout: dict, start: int, stop: int) -> np.ndarray:
+    """Return ``xxh3_64`` integer digests for rows ``start:stop`` of a batch."""
+    view = _BatchView(layout)
+    try:
+        cols = range(len(view.columns))
+        canonical = view.canonical
+        out = np.empty(stop - start, dtype=np.uint64)
+        for i, row in enumerate(range(start, stop)):
+            out[i] = xxhash.xxh3_64_intdigest(
+                FIELD_SEPARATOR.join([canonical(col, row) for col in cols])
+            )
+        return out
+    finally:
+        view.close()
+
+
+def _candidate_cells(src: _BatchView, dest: _BatchView) -> List[Tuple[int, int]]:
+    candidates: List[Tuple[int, int]] = []
+    for col, (s_col, d_col) in enumerate(zip(src.columns, dest.columns)):
+        code, s_values, s_flags, _, _ = s_col
+        _, d_values, d_flags, _, _ = d_col
+        equal = (s_flags == NULL) & (d_flags == NULL)
+        if code == "s":
+            both = (s_flags == TEXT) & (d_flags == TEXT)
+            for row in np.flatnonzero(both):
+                equal[row] = src.text(col, row) == dest.text(col, row)
+        else:
+            both = (s_flags == VALUE) & (d_flags == VALUE)
+            if code == "f":
+                equal[both] = np.abs(s_values[both] - d_values[both]) < NUMERIC_TOLERANCE
+            else:
+                equal[both] = s_values[both] == d_values[both]
+        candidates.extend((int(r), col) for r in np.flatnonzero(~equal))
+    return candidates
+
+
+def compare_shared_batches(src_layout: dict, dest_layout: dict) -> List[Tuple[int, int]]:
+    """Return ``(row, column)`` cells of two aligned batches that may differ.
+
+    Cells are only skipped when they are provably equal under the comparison
+    plan: both ``NULL``, numbers within :data:`NUMERIC_TOLERANCE`, the same
+    day or identical normalized text. Everything else, including values that
+    fell back to text, is returned for the caller to check with the plan's
+    scalar normalizers.
+    """
+    src = _BatchView(src_layout)
+    dest = _BatchView(dest_layout)
+    try:
+        # Kept in a helper so no view outlives the call before ``close``.
+        return _candidate_cells(src, dest)
+    finally:
+        src.close()
+        dest.close()
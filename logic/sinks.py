@@ -0,0 +1,279 @@
+"""Streaming file sinks for discrepancy records.
+
+File sinks persist discrepancies without SQL Server so a reconciliation can
+run against a read-only destination. They share the interface of
+:class:`logic.reporter.DiscrepancyWriter`: ``write``, ``flush`` and
+``close``, a ``flushed`` count reported to ``on_flush`` after every batch
+and use as a context manager. Records are buffered ``batch_size`` at a time,
+so memory stays bounded however many discrepancies a partition has.
+
+:func:`open_sink` picks the sink from ``output.format`` and writes each
+partition to its own file, ``<directory>/<table>/<partition>.<ext>``. The
+file is written under a temporary name and renamed when the sink closes
+cleanly, so an interrupted partition leaves no partial file and processing
+it again simply replaces the previous output.
+"""
+
+from __future__ import annotations
+
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from utils import format_partition
+from utils.logger import debug_log
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+# Stream compression of the text formats and the suffix it adds.
+TEXT_COMPRESSION = {
+    "gzip": (gzip.open, ".gz"),
+    "bz2": (bz2.open, ".bz2"),
+    "xz": (lzma.open, ".xz"),
+}
+
+
+def flatten_record(record: Dict) -> Dict:
+    """Return *record* with full-row dictionaries dumped as JSON text."""
+    return {
+        k: json.dumps(v, default=str) if isinstance(v, dict) else v
+        for k, v in record.items()
+    }
+
+
+class FileSink(ABC):
+    """Base class buffering records and writing them to *path* in batches.
+
+    Subclasses implement :meth:`_open`, :meth:`_write_batch` and
+    :meth:`_close`. Leaving the ``with`` block with an exception discards
+    the file instead of publishing it.
+    """
+
+    extension = ""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int = 1000,
+        on_flush: Optional[Callable[[int], None]] = None,
+        compression: Optional[str] = None,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.compression = compression
+        self.buffer: List[Dict] = []
+        self.flushed = 0
+        self._tmp = f"{path}.tmp"
+        self._opened = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @abstractmethod
+    def _open(self) -> None:
+        """Open the temporary file for writing."""
+
+    @abstractmethod
+    def _write_batch(self, records: List[Dict]) -> None:
+        """Append *records* to the open file."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Finish and close the temporary file."""
+
+    def write(self, record: Dict) -> None:
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        if not self._opened:
+            self._open()
+            self._opened = True
+        self._write_batch(self.buffer)
+        self.flushed += len(self.buffer)
+        self.buffer.clear()
+        if self.on_flush is not None:
+            self.on_flush(self.flushed)
+
+    def close(self) -> None:
+        """Write the remaining records and publish the file at ``path``.
+
+        A sink that received no records still publishes an empty file so
+        the partition's previous output is replaced.
+        """
+        self.flush()
+        if not self._opened:
+            self._open()
+            self._opened = True
+        self._close()
+        os.replace(self._tmp, self.path)
+        debug_log(f"Wrote {self.flushed} discrepancies to {self.path}", {}, level="low")
+
+    def discard(self) -> None:
+        """Drop buffered records and the unfinished file."""
+        self.buffer.clear()
+        if self._opened:
+            self._close()
+            self._opened = False
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class _TextSink(FileSink):
+    """Sink writing a text file, optionally stream compressed."""
+
+    def __init__(self, path: str, **kwargs: Any):
+        super().__init__(path, **kwargs)
+        if self.compression is not None and self.compression not in TEXT_COMPRESSION:
+            raise ValueError(f"Unsupported compression for {self.extension}: {self.compression}")
+        self._file: Any = None
+
+    def _open(self) -> None:
+        if self.compression is None:
+            self._file = open(self._tmp, "w", newline="", encoding="utf-8")
+        else:
+            opener = TEXT_COMPRESSION[self.compression][0]
+            self._file = opener(self._tmp, "wt", newline="", encoding="utf-8")
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class JsonlSink(_TextSink):
+    """One JSON object per line; full rows stay nested objects."""
+
+    extension = "jsonl"
+
+    def _write_batch(self, records: List[Dict]) -> None:
+        self._file.write(
+            "".join(json.dumps(r, default=str) + "\n" for r in records)
+        )
+
+
+class CsvSink(_TextSink):
+    """CSV with a header taken from the first record."""
+
+    extension = "csv"
+
+    def _open(self) -> None:
+        super()._open()
+        self._writer: Optional[csv.DictWriter] = None
+
+    def _write_batch(self, records: List[Dict]) -> None:
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(records[0]))
+            self._writer.writeheader()
+        self._writer.writerows(flatten_record(r) for r in records)
+
+
+class ParquetSink(FileSink):
+    """Parquet file with one row group per batch.
+
+    Every column is stored as a string (full rows as JSON) because value
+    columns mix the types of all compared columns.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, path: str, **kwargs: Any):
+        if pa is None:
+            raise ImportError(
+                "Parquet output needs 'pyarrow'. Install it via pip: pip install pyarrow"
+            )
+        super().__init__(path, **kwargs)
+        self._writer: Any = None
+        self._columns: List[str] = []
+
+    def _open(self) -> None:
+        self._writer = None
+
+    def _write_batch(self, records: List[Dict]) -> None:
+        if self._writer is None:
+            self._columns = list(records[0])
+            schema = pa.schema([(c, pa.string()) for c in self._columns])
+            self._writer = pq.ParquetWriter(
+                self._tmp, schema, compression=self.compression or "snappy"
+            )
+        rows = [flatten_record(r) for r in records]
+        data = {
+            c: [None if r.get(c) is None else str(r[c]) for r in rows]
+            for c in self._columns
+        }
+        self._writer.write_table(pa.Table.from_pydict(data, schema=self._writer.schema_arrow))
+
+    def _close(self) -> None:
+        if self._writer is None:
+            # No records: an empty file without columns.
+            self._writer = pq.ParquetWriter(self._tmp, pa.schema([]))
+        self._writer.close()
+        self._writer = None
+
+
+SINKS = {cls.extension: cls for cls in (JsonlSink, CsvSink, ParquetSink)}
+
+
+def sink_path(
+    directory: str,
+    table: str,
+    partition: Optional[Dict],
+    extension: str,
+    compression: Optional[str] = None,
+) -> str:
+    """Return the file of *partition*'s discrepancies."""
+    label = format_partition(partition) if partition else "all"
+    suffix = TEXT_COMPRESSION[compression][1] if compression in TEXT_COMPRESSION else ""
+    return os.path.join(directory, table, f"{label}.{extension}{suffix}")
+
+
+def open_sink(
+    config: dict,
+    partition: Optional[Dict] = None,
+    *,
+    on_flush: Optional[Callable[[int], None]] = None,
+) -> FileSink:
+    """Build the file sink selected by ``output.format`` for *partition*.
+
+    Raises ``ValueError`` for formats without a file sink.
+    """
+    output = config.get("output", {})
+    fmt = output.get("format", "jsonl")
+    cls = SINKS.get(fmt)
+    if cls is None:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    compression = output.get("compression")
+    if cls is ParquetSink:
+        batch_size = output.get("row_group_rows", 100_000)
+    else:
+        batch_size = output.get("batch_size", 1000)
+    path = sink_path(
+        output.get("directory", "reports"),
+        output.get("table", "discrepancies"),
+        partition,
+        cls.extension,
+        compression if cls is not ParquetSink else None,
+    )
+    return cls(path, batch_size=batch_size, on_flush=on_flush, compression=compression)
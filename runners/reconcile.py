@@ -1,10 +1,141 @@
 """Query helpers used by the reconciliation runner."""
 
-from typing import Dict, Iterable, Optional
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from logic.comparison_plan import (
+    BINARY,
+    DATE,
+    DATETIME,
+    NUMERIC,
+    ComparisonPlan,
+)
+from logic.row_schema import ROW_MODES
+from utils.batch_sizer import BatchSizer
 from utils.logger import debug_log
 
 
+def _placeholder(dialect: str, idx: int) -> str:
+    """Return the bind placeholder for parameter number *idx*."""
+    return f":{idx}" if dialect == "oracle" else "?"
+
+
+def _partition_filter(
+    dialect: str,
+    columns: Dict,
+    partition: Dict,
+    primary_key: str,
+    year_column: str,
+    month_column: str,
+    week_column: Optional[str] = None,
+    pk_value: Optional[str] = None,
+    pk_values: Optional[Sequence[Any]] = None,
+    pk_buckets: Optional[Tuple[str, int, Sequence[int]]] = None,
+    modified_since: Optional[Tuple[str, Any]] = None,
+) -> Tuple[str, List[Any]]:
+    """Return the ``WHERE`` clause and parameters selecting *partition*.
+
+    A ``pk_range`` entry of *partition* (see
+    :func:`logic.partitioner.split_pk_ranges`) limits it to
+    ``low <= pk < high``.
+
+    ``pk_buckets`` is a ``(bucket_expression, modulus, buckets)`` tuple as
+    produced by the checksum drill-down. Bucket ids are computed locally and
+    inlined as integer literals. ``modified_since`` is a
+    ``(column, watermark)`` tuple keeping rows modified after the watermark.
+    """
+    # Cast partition identifiers to strings so that filtering works for
+    # both numeric and varchar column types. This avoids implicit type
+    # conversion issues when year/month columns are stored as VARCHAR.
+    year = str(partition["year"])
+    month = str(partition["month"])
+    week = str(partition.get("week")) if "week" in partition else None
+
+    params: List[Any] = [year, month]
+    clauses = [
+        f"{year_column} = {_placeholder(dialect, 1)}",
+        f"{month_column} = {_placeholder(dialect, 2)}",
+    ]
+    if "week" in partition and week_column:
+        params.append(week)
+        clauses.append(f"{week_column} = {_placeholder(dialect, len(params))}")
+    pk_range = partition.get("pk_range")
+    if pk_range is not None:
+        low, high = pk_range
+        if low is not None:
+            params.append(low)
+            clauses.append(f"{columns[primary_key]} >= {_placeholder(dialect, len(params))}")
+        if high is not None:
+            params.append(high)
+            clauses.append(f"{columns[primary_key]} < {_placeholder(dialect, len(params))}")
+    if pk_value is not None:
+        params.append(str(pk_value))
+        clauses.append(
+            f"{columns[primary_key]} = {_placeholder(dialect, len(params))}"
+        )
+    if pk_values is not None:
+        marks = []
+        for value in pk_values:
+            params.append(value)
+            marks.append(_placeholder(dialect, len(params)))
+        clauses.append(f"{columns[primary_key]} IN ({', '.join(marks)})")
+    if pk_buckets is not None:
+        expr, modulus, buckets = pk_buckets
+        clauses.append(_bucket_filter(dialect, expr, modulus, buckets))
+    if modified_since is not None:
+        column, watermark = modified_since
+        params.append(watermark)
+        clauses.append(f"{column} > {_placeholder(dialect, len(params))}")
+    return " AND ".join(clauses), params
+
+
+def _bucket_filter(dialect: str, expr: str, modulus: int, buckets: Sequence[int]) -> str:
+    """Return a predicate keeping rows whose ``expr mod modulus`` is in *buckets*."""
+    ids = ", ".join(str(int(b)) for b in buckets)
+    if dialect == "oracle":
+        return f"MOD({expr}, {int(modulus)}) IN ({ids})"
+    return f"({expr}) % {int(modulus)} IN ({ids})"
+
+
+def _open_cursor(conn, dialect: str, batch_size: int):
+    """Return a cursor tuned to fetch ``batch_size`` rows per round trip.
+
+    Both attributes must be set before ``execute``. ``prefetchrows`` one
+    above ``arraysize`` lets Oracle return the first batch together with
+    the execute call and avoids an extra round trip to detect the end of
+    small result sets.
+    """
+    cursor = conn.cursor()
+    cursor.arraysize = batch_size
+    if dialect == "oracle":
+        cursor.prefetchrows = batch_size + 1
+    return cursor
+
+
+def _build_query(
+    dialect: str,
+    select_clause: str,
+    full_table: str,
+    where_clause: str,
+    params: List[Any],
+    order_by: str,
+    limit: Optional[int],
+) -> Tuple[str, tuple]:
+    """Assemble a partition query with ordering and an optional row limit."""
+    query = f"""
+            SELECT {select_clause}
+            FROM {full_table}
+            WHERE {where_clause}"""
+    query += f" ORDER BY {order_by}"
+    if limit is not None:
+        params = params + [int(limit)]
+        if dialect == "oracle":
+            query += f" FETCH FIRST :{len(params)} ROWS ONLY"
+        else:
+            query += " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+    return query, tuple(params)
+
+
 def fetch_rows(
     conn,
     schema: str,
@@ -20,6 +151,12 @@ def fetch_rows(
     config: Optional[dict] = None,
     limit: Optional[int] = None,
     pk_value: Optional[str] = None,
+    on_description: Optional[Callable[[Sequence], None]] = None,
+    pk_values: Optional[Sequence[Any]] = None,
+    pk_buckets: Optional[Tuple[str, int, Sequence[int]]] = None,
+    row_mode: str = "dict",
+    fetch_options: Optional[dict] = None,
+    modified_since: Optional[Tuple[str, Any]] = None,
 ) -> Iterable[Dict]:
     """Yield rows filtered by partition in primary key order.
 
@@ -32,14 +169,34 @@ def fetch_rows(
     pk_value:
         When provided, restrict results to only the row matching this primary
         key value.
+    on_description:
+        Optional callback receiving ``cursor.description`` once the query has
+        executed. Used to build a comparison plan without sampling rows.
+    pk_values:
+        Optional collection of primary key values. Only matching rows are
+        returned. See :func:`fetch_rows_by_pk` for large key lists.
+    pk_buckets:
+        Optional ``(bucket_expression, modulus, buckets)`` restricting the
+        query to the primary key buckets found by the checksum drill-down.
+        See :func:`pk_bucket_expression`.
+    row_mode:
+        ``"dict"`` (default) yields ``{logical_column: value}`` dictionaries.
+        ``"tuple"`` yields the driver's row tuples unchanged, with values in
+        ``columns`` order; describe them with
+        :class:`logic.row_schema.RowSchema` built from ``columns``.
+    fetch_options:
+        The side's ``fetch`` section from the YAML config. Unless
+        ``adaptive`` is false the ``fetchmany`` size is tuned per round trip
+        by :class:`utils.batch_sizer.BatchSizer`, starting from the row width
+        in the cursor description. ``batch_size`` there overrides the
+        argument of the same name.
+    modified_since:
+        Optional ``(column, watermark)`` tuple. Only rows whose physical
+        ``column`` is later than ``watermark`` are returned; used by the
+        incremental mode.
     """
-    # Cast partition identifiers to strings so that filtering works for
-    # both numeric and varchar column types. This avoids implicit type
-    # conversion issues when year/month columns are stored as VARCHAR.
-    year = str(partition["year"])
-    month = str(partition["month"])
-    week = str(partition.get("week")) if "week" in partition else None
-
+    if row_mode not in ROW_MODES:
+        raise ValueError(f"Unsupported row mode: {row_mode}")
     logical_cols = list(columns.keys())
     physical_cols = [columns[c] for c in logical_cols]
     select_clause = ", ".join(physical_cols)
@@ -47,63 +204,757 @@ def fetch_rows(
     full_table = f"{schema}.{table}" if schema else table
 
     dialect = dialect.lower()
-    if dialect == "oracle":
-        query = f"""
-            SELECT {select_clause}
-            FROM {full_table}
-            WHERE {year_column} = :1 AND {month_column} = :2"""
-        params = [year, month]
-        param_idx = 3
-        if "week" in partition and week_column:
-            query += f" AND {week_column} = :3"
-            params.append(week)
-            param_idx = 4
-        if pk_value is not None:
-            query += f" AND {columns[primary_key]} = :{param_idx}"
-            params.append(str(pk_value))
-            param_idx += 1
-        query += f" ORDER BY {columns[primary_key]}"
-        if limit is not None:
-            query += f" FETCH FIRST :{param_idx} ROWS ONLY"
-            params.append(int(limit))
-        params = tuple(params)
-    elif dialect == "sqlserver":
-        query = f"""
-            SELECT {select_clause}
-            FROM {full_table}
-            WHERE {year_column} = ? AND {month_column} = ?"""
-        params = [year, month]
-        if "week" in partition and week_column:
-            query += f" AND {week_column} = ?"
-            params.append(week)
-        if pk_value is not None:
-            query += f" AND {columns[primary_key]} = ?"
-            params.append(str(pk_value))
-        query += f" ORDER BY {columns[primary_key]}"
-        if limit is not None:
-            query += " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
-            params.append(int(limit))
-        params = tuple(params)
-    else:
+    if dialect not in ("oracle", "sqlserver"):
         raise ValueError(f"Unsupported SQL dialect: {dialect}")
 
+    where_clause, params = _partition_filter(
+        dialect,
+        columns,
+        partition,
+        primary_key,
+        year_column,
+        month_column,
+        week_column,
+        pk_value=pk_value,
+        pk_values=pk_values,
+        pk_buckets=pk_buckets,
+        modified_since=modified_since,
+    )
+    query, params = _build_query(
+        dialect,
+        select_clause,
+        full_table,
+        where_clause,
+        params,
+        columns[primary_key],
+        limit,
+    )
+
     debug_log(
         f"Executing query: {query.strip()} | Params: {params}",
         config,
         level="medium",
     )
-    read_cursor = conn.cursor()
+    sizer = None
+    if fetch_options is not None:
+        batch_size = fetch_options.get("batch_size") or batch_size
+        sizer = BatchSizer.from_config(fetch_options)
+    read_cursor = _open_cursor(conn, dialect, batch_size)
     try:
         read_cursor.execute(query, params)
     except Exception as exc:  # pragma: no cover - database error
         debug_log(f"Query execution failed: {exc}", config, level="low")
         raise
-    read_cursor.arraysize = batch_size
+    description = getattr(read_cursor, "description", None)
+    if on_description is not None:
+        on_description(description)
+    if sizer is not None:
+        batch_size = read_cursor.arraysize = sizer.start(description)
 
     while True:
+        started = time.perf_counter()
         rows = read_cursor.fetchmany(batch_size)
+        if sizer is not None:
+            size = sizer.observe(rows, time.perf_counter() - started)
+            if size != batch_size:
+                debug_log(
+                    "Fetch batch %d -> %d rows (%.0f bytes/row)",
+                    config,
+                    batch_size,
+                    size,
+                    sizer.row_bytes,
+                    level="high",
+                )
+                batch_size = read_cursor.arraysize = size
         if not rows:
             break
+        if row_mode == "tuple":
+            yield from rows
+            continue
         for row in rows:
             yield dict(zip(logical_cols, row))
 
+
+def fetch_rows_by_pk(
+    conn,
+    schema: str,
+    table: str,
+    columns: Dict,
+    partition: Dict,
+    primary_key: str,
+    year_column: str,
+    month_column: str,
+    pk_values: Sequence[Any],
+    *,
+    chunk_size: int = 1000,
+    **kwargs,
+) -> Iterable[Dict]:
+    """Yield rows for the sorted *pk_values* in primary key order.
+
+    Keys are sent in ``IN`` lists of at most ``chunk_size`` values which keeps
+    Oracle below its 1000 element limit and SQL Server below 2100 parameters.
+    """
+    for start in range(0, len(pk_values), chunk_size):
+        chunk = list(pk_values[start:start + chunk_size])
+        yield from fetch_rows(
+            conn,
+            schema,
+            table,
+            columns,
+            partition,
+            primary_key,
+            year_column,
+            month_column,
+            pk_values=chunk,
+            **kwargs,
+        )
+
+
+def fetch_pks(
+    conn,
+    schema: str,
+    table: str,
+    columns: Dict,
+    partition: Dict,
+    primary_key: str,
+    year_column: str,
+    month_column: str,
+    **kwargs,
+) -> List[Any]:
+    """Return the partition's primary keys in order, selecting only that column.
+
+    Accepts the keyword arguments of :func:`fetch_rows`, e.g.
+    ``modified_since`` to list keys changed after a watermark.
+    """
+    kwargs["row_mode"] = "tuple"
+    return [
+        row[0]
+        for row in fetch_rows(
+            conn,
+            schema,
+            table,
+            {primary_key: columns[primary_key]},
+            partition,
+            primary_key,
+            year_column,
+            month_column,
+            **kwargs,
+        )
+    ]
+
+
+def diff_incremental_keys(
+    src_changed: Iterable[Any],
+    dest_changed: Iterable[Any],
+    src_pks: Iterable[Any],
+    dest_pks: Iterable[Any],
+) -> Tuple[List[Any], Dict[str, int]]:
+    """Return the sorted keys an incremental run must compare, plus stats.
+
+    Keys modified on either side since the watermark are compared. Keys
+    present on one side only (inserted without a timestamp or deleted on the
+    other) are found by anti-joining both key lists.
+    """
+    changed = set(src_changed) | set(dest_changed)
+    src_set = set(src_pks)
+    dest_set = set(dest_pks)
+    source_only = src_set - dest_set
+    dest_only = dest_set - src_set
+    pks = sorted(changed | source_only | dest_only)
+    stats = {
+        "changed": len(changed),
+        "source_only": len(source_only),
+        "dest_only": len(dest_only),
+        "compared": len(pks),
+    }
+    return pks, stats
+
+
+# ---------------------------------------------------------------------------
+# Server-side row hashes
+# ---------------------------------------------------------------------------
+
+# Algorithm names understood by ``STANDARD_HASH`` and ``HASHBYTES``.
+HASH_ALGORITHMS = {
+    "MD5": ("MD5", "MD5"),
+    "SHA1": ("SHA1", "SHA1"),
+    "SHA256": ("SHA256", "SHA2_256"),
+}
+
+# Matches the ``f"{value:.5f}"`` rendering used by ``normalize_value``.
+_ORACLE_NUMBER_FORMAT = "FM" + "9" * 32 + "0.00000"
+
+# Oracle's RAW limit with ``MAX_STRING_SIZE = STANDARD``: every group of
+# values is converted to a RAW of UTF-16 bytes before it is hashed.
+HASH_GROUP_BYTES = 2000
+
+# Most UTF-16 bytes a character can take (a surrogate pair).
+_UTF16_CHAR_BYTES = 4
+
+# Widest canonical text of values stored as numbers, dates or other scalars.
+_NUMBER_WIDTH = 41
+_DATE_WIDTH = 10
+_SCALAR_WIDTH = 64
+
+# Length of the longest hex digest (SHA-256).
+_HEX_DIGEST_WIDTH = 64
+
+
+def _column_hash_expression(
+    column: str, kind: str, dialect: str, physical_kind: Optional[str] = None
+) -> str:
+    """Return SQL rendering *column* as canonical text for hashing.
+
+    ``kind`` is the comparison kind shared by both sides while
+    ``physical_kind`` describes how this side stores the column. Character
+    columns holding numbers or dates are converted so both databases render
+    the same text. Values that cannot be converted keep their trimmed text
+    which at worst causes an extra full-row comparison. ``NULL`` and, as in
+    Oracle, empty strings render as ``NULL``.
+    """
+    physical_kind = physical_kind or kind
+    text_typed = physical_kind not in (NUMERIC, DATE, DATETIME, BINARY)
+    if dialect == "oracle":
+        trimmed = f"TRIM({column})"
+        if kind == NUMERIC:
+            if text_typed:
+                number = f"TO_NUMBER({trimmed} DEFAULT NULL ON CONVERSION ERROR)"
+                return (
+                    f"COALESCE(TO_CHAR(ROUND({number}, 5), "
+                    f"'{_ORACLE_NUMBER_FORMAT}'), {trimmed})"
+                )
+            return f"TO_CHAR(ROUND({column}, 5), '{_ORACLE_NUMBER_FORMAT}')"
+        if kind in (DATE, DATETIME):
+            return (
+                f"SUBSTR({trimmed}, 1, 10)"
+                if text_typed
+                else f"TO_CHAR({column}, 'YYYY-MM-DD')"
+            )
+        if kind == BINARY:
+            return f"RAWTOHEX({column})"
+        # TRIM keeps NVARCHAR2 values in the national character set.
+        return trimmed
+
+    trimmed = f"LTRIM(RTRIM({column}))"
+    if kind == NUMERIC:
+        if text_typed:
+            return (
+                f"COALESCE(CONVERT(VARCHAR(50), TRY_CAST({trimmed} AS DECIMAL(38, 5))), "
+                f"{trimmed})"
+            )
+        return f"CONVERT(VARCHAR(50), CAST({column} AS DECIMAL(38, 5)))"
+    if kind in (DATE, DATETIME):
+        return f"LEFT({trimmed}, 10)" if text_typed else f"CONVERT(CHAR(10), {column}, 23)"
+    if kind == BINARY:
+        return f"CONVERT(VARCHAR(MAX), {column}, 2)"
+    # Oracle stores empty strings as NULL so mirror that here.
+    return f"NULLIF(LTRIM(RTRIM(CAST({column} AS NVARCHAR(MAX)))), '')"
+
+
+def _hash_input(text: str, dialect: str) -> str:
+    """Return SQL turning the text expression *text* into UTF-16LE bytes.
+
+    ``HASHBYTES`` hashes ``NVARCHAR`` as UTF-16LE; Oracle converts
+    explicitly, so both sides hash the same bytes whatever their character
+    sets.
+    """
+    if dialect == "oracle":
+        return f"UTL_I18N.STRING_TO_RAW({text}, 'AL16UTF16LE')"
+    return f"CAST({text} AS NVARCHAR(MAX))"
+
+
+def _hash_piece(
+    text: str, dialect: str, start: Optional[int] = None, length: Optional[int] = None
+) -> str:
+    """Return the separator and national text of *text*, or of one slice of it.
+
+    ``NULL`` is written as ``CHR(0)``, the first slice carrying the marker.
+    """
+    if dialect == "oracle":
+        value = text if start is None else f"SUBSTR({text}, {start}, {length})"
+        value = f"TO_NCHAR({value})"
+        if start is None or start == 1:
+            value = f"NVL({value}, NCHR(0))"
+        return f"NCHR(31) || {value}"
+    value = f"CAST({text} AS NVARCHAR(MAX))"
+    if start is not None:
+        value = f"SUBSTRING({value}, {start}, {length})"
+    marker = "NCHAR(0)" if start is None or start == 1 else "N''"
+    return f"NCHAR(31) + COALESCE({value}, {marker})"
+
+
+def _text_width(kind: str, physical_kind: str, size: Optional[int]) -> Optional[int]:
+    """Return the widest text :func:`_column_hash_expression` renders.
+
+    ``size`` is the declared size of a column stored as *physical_kind*;
+    ``None`` means unbounded.
+    """
+    if kind in (DATE, DATETIME):
+        return _DATE_WIDTH
+    if BINARY in (kind, physical_kind):
+        return None if size is None else 2 * size
+    if physical_kind == NUMERIC:
+        return _NUMBER_WIDTH
+    if physical_kind in (DATE, DATETIME):
+        return _SCALAR_WIDTH
+    if size is None:
+        return None
+    return max(size, _NUMBER_WIDTH) if kind == NUMERIC else size
+
+
+def hash_column_widths(
+    columns: Iterable[str],
+    plan: ComparisonPlan,
+    *physical_plans: Optional[ComparisonPlan],
+) -> Dict[str, Optional[int]]:
+    """Return the widest canonical text, in characters, of *columns*.
+
+    Widths are derived from the sizes each side's physical plan recorded
+    from its cursor description; ``None`` marks columns unbounded on either
+    side (LOB and ``MAX`` columns). Columns a side has no size for are left
+    out. Pass the result to :func:`row_hash_expression` on both sides so
+    their expressions group the columns identically.
+    """
+    widths: Dict[str, Optional[int]] = {}
+    for col in columns:
+        side_widths = []
+        for physical in physical_plans:
+            if physical is None or col not in physical.sizes:
+                break
+            side_widths.append(
+                _text_width(plan.kind(col), physical.kind(col), physical.sizes[col])
+            )
+        else:
+            if side_widths:
+                widths[col] = None if None in side_widths else max(side_widths)
+    return widths
+
+
+def row_hash_expression(
+    columns: Dict,
+    plan: ComparisonPlan,
+    dialect: str,
+    *,
+    algorithm: str = "MD5",
+    physical_plan: Optional[ComparisonPlan] = None,
+    widths: Optional[Dict[str, Optional[int]]] = None,
+    max_bytes: int = HASH_GROUP_BYTES,
+) -> str:
+    """Return a SQL expression hashing the canonical text of *columns*.
+
+    Both databases hash the values as UTF-16LE text. Each value is preceded
+    by a ``CHR(31)`` separator so ``("ab", "c")`` and ``("a", "bc")``
+    produce different hashes, and ``NULL`` is written as ``CHR(0)`` like
+    :class:`logic.row_hasher.RowHasher` does.
+
+    Values are packed into groups of at most *max_bytes* UTF-16 bytes, sized
+    from *widths* (see :func:`hash_column_widths`); columns wider than a
+    group are split into slices and columns of unknown width are hashed on
+    their own. Several group digests are hashed again as hex text. Columns
+    whose width is ``None`` (LOBs) cannot be hashed by ``STANDARD_HASH`` and
+    are left out, so differences confined to them are not detected. The
+    expression is built identically for both dialects so equal rows produce
+    equal bytes.
+    """
+    dialect = dialect.lower()
+    try:
+        oracle_alg, sqlserver_alg = HASH_ALGORITHMS[algorithm.upper()]
+    except KeyError as exc:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm}") from exc
+
+    if dialect == "oracle":
+        concat = " || "
+
+        def digest(expr: str) -> str:
+            return f"STANDARD_HASH({expr}, '{oracle_alg}')"
+
+        def hex_digest(expr: str) -> str:
+            return f"RAWTOHEX({expr})"
+
+    elif dialect == "sqlserver":
+        concat = " + "
+
+        def digest(expr: str) -> str:
+            return f"HASHBYTES('{sqlserver_alg}', {expr})"
+
+        def hex_digest(expr: str) -> str:
+            return f"CONVERT(VARCHAR(64), {expr}, 2)"
+
+    else:
+        raise ValueError(f"Unsupported SQL dialect: {dialect}")
+
+    budget = max_bytes // _UTF16_CHAR_BYTES
+    # Characters of one value or slice; the separator takes one more.
+    slice_width = budget - 1
+    if slice_width < _NUMBER_WIDTH:
+        raise ValueError(f"Hash group of {max_bytes} bytes is too small")
+    widths = widths or {}
+
+    pieces: List[Tuple[str, int]] = []
+    for logical, physical in columns.items():
+        if logical in widths and widths[logical] is None:
+            continue
+        text = _column_hash_expression(
+            physical,
+            plan.kind(logical),
+            dialect,
+            physical_plan.kind(logical) if physical_plan is not None else None,
+        )
+        width = widths.get(logical)
+        if width is None:
+            pieces.append((_hash_piece(text, dialect), budget))
+        elif width <= slice_width:
+            pieces.append((_hash_piece(text, dialect), width + 1))
+        else:
+            pieces.extend(
+                (_hash_piece(text, dialect, start, slice_width), budget)
+                for start in range(1, width + 1, slice_width)
+            )
+    if not pieces:
+        raise ValueError("No hashable columns")
+
+    groups: List[List[str]] = []
+    used = budget
+    for piece, chars in pieces:
+        if used + chars > budget:
+            groups.append([])
+            used = 0
+        groups[-1].append(piece)
+        used += chars
+    digests = [digest(_hash_input(concat.join(g), dialect)) for g in groups]
+    fanout = max_bytes // _HEX_DIGEST_WIDTH
+    while len(digests) > 1:
+        digests = [
+            digest(concat.join(hex_digest(d) for d in digests[i:i + fanout]))
+            for i in range(0, len(digests), fanout)
+        ]
+    return digests[0]
+
+
+def fetch_row_hashes(
+    conn,
+    schema: str,
+    table: str,
+    columns: Dict,
+    partition: Dict,
+    primary_key: str,
+    year_column: str,
+    month_column: str,
+    plan: ComparisonPlan,
+    *,
+    batch_size: int = 10_000,
+    dialect: str = "sqlserver",
+    week_column: Optional[str] = None,
+    config: Optional[dict] = None,
+    limit: Optional[int] = None,
+    pk_value: Optional[str] = None,
+    algorithm: str = "MD5",
+    physical_plan: Optional[ComparisonPlan] = None,
+    widths: Optional[Dict[str, Optional[int]]] = None,
+    max_bytes: int = HASH_GROUP_BYTES,
+) -> Iterable[Tuple[Any, bytes]]:
+    """Yield ``(pk, hash)`` tuples computed by the database in PK order.
+
+    Only the primary key and a digest of the canonical row text travel over
+    the wire. ``columns`` selects the hashed columns and must contain
+    ``primary_key``; ``widths`` and ``max_bytes`` are passed to
+    :func:`row_hash_expression`.
+    """
+    dialect = dialect.lower()
+    hash_expr = row_hash_expression(
+        columns, plan, dialect, algorithm=algorithm, physical_plan=physical_plan,
+        widths=widths, max_bytes=max_bytes,
+    )
+    full_table = f"{schema}.{table}" if schema else table
+    where_clause, params = _partition_filter(
+        dialect,
+        columns,
+        partition,
+        primary_key,
+        year_column,
+        month_column,
+        week_column,
+        pk_value=pk_value,
+    )
+    query, params = _build_query(
+        dialect,
+        f"{columns[primary_key]}, {hash_expr}",
+        full_table,
+        where_clause,
+        params,
+        columns[primary_key],
+        limit,
+    )
+
+    debug_log(
+        f"Executing hash query: {query.strip()} | Params: {params}",
+        config,
+        level="medium",
+    )
+    read_cursor = _open_cursor(conn, dialect, batch_size)
+    try:
+        read_cursor.execute(query, params)
+    except Exception as exc:  # pragma: no cover - database error
+        debug_log(f"Hash query execution failed: {exc}", config, level="low")
+        raise
+
+    while True:
+        rows = read_cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for pk, digest in rows:
+            yield pk, bytes(digest) if digest is not None else None
+
+
+def diff_row_hashes(
+    src_hashes: Iterable[Tuple[Any, bytes]],
+    dest_hashes: Iterable[Tuple[Any, bytes]],
+) -> Tuple[List[Any], Dict[str, int]]:
+    """Merge two PK-ordered hash streams and return keys needing a full fetch.
+
+    Returns ``(pks, stats)`` where ``pks`` is sorted and holds keys whose
+    hashes differ or which exist on one side only. ``stats`` counts
+    ``matched``, ``changed``, ``source_only`` and ``dest_only`` keys.
+    """
+    stats = {"matched": 0, "changed": 0, "source_only": 0, "dest_only": 0}
+    pks: List[Any] = []
+    src_iter = iter(src_hashes)
+    dest_iter = iter(dest_hashes)
+    src = next(src_iter, None)
+    dest = next(dest_iter, None)
+    while src is not None or dest is not None:
+        if src is not None and dest is not None and src[0] == dest[0]:
+            if src[1] == dest[1]:
+                stats["matched"] += 1
+            else:
+                stats["changed"] += 1
+                pks.append(src[0])
+            src = next(src_iter, None)
+            dest = next(dest_iter, None)
+        elif dest is None or (src is not None and src[0] < dest[0]):
+            stats["source_only"] += 1
+            pks.append(src[0])
+            src = next(src_iter, None)
+        else:
+            stats["dest_only"] += 1
+            pks.append(dest[0])
+            dest = next(dest_iter, None)
+    return pks, stats
+
+
+# ---------------------------------------------------------------------------
+# Aggregate checksums
+# ---------------------------------------------------------------------------
+
+
+def pk_bucket_expression(
+    column: str,
+    kind: str,
+    dialect: str,
+    physical_kind: Optional[str] = None,
+) -> str:
+    """Return SQL mapping the primary key to a 32-bit unsigned integer.
+
+    The value is taken from the first four bytes of the MD5 digest of the
+    key's canonical text so both databases place a key in the same bucket
+    whatever its type.
+    """
+    text = _column_hash_expression(column, kind, dialect, physical_kind)
+    if dialect == "oracle":
+        text = _hash_input(f"NVL(TO_NCHAR({text}), NCHR(0))", dialect)
+        return (
+            f"TO_NUMBER(SUBSTR(RAWTOHEX(STANDARD_HASH({text}, 'MD5')), 1, 8), "
+            f"'XXXXXXXX')"
+        )
+    text = _hash_input(f"COALESCE(CAST({text} AS NVARCHAR(MAX)), NCHAR(0))", dialect)
+    return f"CAST(SUBSTRING(HASHBYTES('MD5', {text}), 1, 4) AS BIGINT)"
+
+
+def fetch_bucket_checksums(
+    conn,
+    schema: str,
+    table: str,
+    columns: Dict,
+    partition: Dict,
+    primary_key: str,
+    year_column: str,
+    month_column: str,
+    plan: ComparisonPlan,
+    *,
+    modulus: int = 1,
+    parent: Optional[Tuple[int, Sequence[int]]] = None,
+    dialect: str = "sqlserver",
+    week_column: Optional[str] = None,
+    config: Optional[dict] = None,
+    algorithm: str = "MD5",
+    physical_plan: Optional[ComparisonPlan] = None,
+    widths: Optional[Dict[str, Optional[int]]] = None,
+    max_bytes: int = HASH_GROUP_BYTES,
+) -> Dict[int, Tuple[int, int, int]]:
+    """Return ``{bucket: (row_count, checksum_1, checksum_2)}`` for *partition*.
+
+    Rows are grouped by ``pk_bucket mod modulus``. Each checksum is the sum of
+    one 32-bit word of the server-side row hash (see
+    :func:`row_hash_expression`) so the aggregate does not depend on row
+    order. ``parent`` is a ``(modulus, buckets)`` tuple limiting the query to
+    buckets found to differ at the previous level. ``modulus=1`` returns a
+    single bucket covering the whole partition.
+    """
+    dialect = dialect.lower()
+    pk_col = columns[primary_key]
+    bucket_expr = pk_bucket_expression(
+        pk_col,
+        plan.kind(primary_key),
+        dialect,
+        physical_plan.kind(primary_key) if physical_plan is not None else None,
+    )
+    hash_expr = row_hash_expression(
+        columns, plan, dialect, algorithm=algorithm, physical_plan=physical_plan,
+        widths=widths, max_bytes=max_bytes,
+    )
+    full_table = f"{schema}.{table}" if schema else table
+    where_clause, params = _partition_filter(
+        dialect,
+        columns,
+        partition,
+        primary_key,
+        year_column,
+        month_column,
+        week_column,
+    )
+    outer_where = ""
+    if parent is not None:
+        outer_where = "WHERE " + _bucket_filter(dialect, "pkw", parent[0], parent[1])
+
+    if dialect == "oracle":
+        words = (
+            "TO_NUMBER(SUBSTR(hx, 1, 8), 'XXXXXXXX') AS w1, "
+            "TO_NUMBER(SUBSTR(hx, 9, 8), 'XXXXXXXX') AS w2"
+        )
+        inner = f"SELECT {bucket_expr} AS pkw, RAWTOHEX({hash_expr}) AS hx"
+        bucket = f"MOD(pkw, {int(modulus)})"
+    elif dialect == "sqlserver":
+        words = (
+            "CAST(SUBSTRING(h, 1, 4) AS BIGINT) AS w1, "
+            "CAST(SUBSTRING(h, 5, 4) AS BIGINT) AS w2"
+        )
+        inner = f"SELECT {bucket_expr} AS pkw, {hash_expr} AS h"
+        bucket = f"pkw % {int(modulus)}"
+    else:
+        raise ValueError(f"Unsupported SQL dialect: {dialect}")
+
+    query = f"""
+            SELECT {bucket} AS bucket, COUNT(*), SUM(w1), SUM(w2)
+            FROM (
+                SELECT pkw, {words}
+                FROM ({inner} FROM {full_table} WHERE {where_clause}) hashed
+            ) words
+            {outer_where}
+            GROUP BY {bucket}"""
+    params = tuple(params)
+
+    debug_log(
+        f"Executing checksum query: {query.strip()} | Params: {params}",
+        config,
+        level="medium",
+    )
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+    except Exception as exc:  # pragma: no cover - database error
+        debug_log(f"Checksum query execution failed: {exc}", config, level="low")
+        raise
+    return {
+        int(b): (int(count), int(w1 or 0), int(w2 or 0))
+        for b, count, w1, w2 in cursor.fetchall()
+    }
+
+
+def count_partition_rows(
+    conn,
+    schema: str,
+    table: str,
+    columns: Dict,
+    partition: Dict,
+    primary_key: str,
+    year_column: str,
+    month_column: str,
+    *,
+    dialect: str = "sqlserver",
+    week_column: Optional[str] = None,
+    config: Optional[dict] = None,
+) -> int:
+    """Return the number of rows in *partition*.
+
+    Used to schedule the largest partitions first.
+    """
+    dialect = dialect.lower()
+    full_table = f"{schema}.{table}" if schema else table
+    where_clause, params = _partition_filter(
+        dialect,
+        columns,
+        partition,
+        primary_key,
+        year_column,
+        month_column,
+        week_column,
+    )
+    query = f"SELECT COUNT(*) FROM {full_table} WHERE {where_clause}"
+    debug_log("Executing count query: %s | Params: %s", config, query, params, level="medium")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, tuple(params))
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+def fetch_pk_boundaries(
+    conn,
+    schema: str,
+    table: str,
+    columns: Dict,
+    partition: Dict,
+    primary_key: str,
+    year_column: str,
+    month_column: str,
+    pieces: int,
+    *,
+    dialect: str = "sqlserver",
+    week_column: Optional[str] = None,
+    config: Optional[dict] = None,
+) -> List[Any]:
+    """Return ``pieces - 1`` primary keys splitting *partition* evenly.
+
+    ``NTILE`` numbers the partition's keys in order; the lowest key of every
+    tile but the first is a boundary.
+    """
+    dialect = dialect.lower()
+    pk_col = columns[primary_key]
+    full_table = f"{schema}.{table}" if schema else table
+    where_clause, params = _partition_filter(
+        dialect,
+        columns,
+        partition,
+        primary_key,
+        year_column,
+        month_column,
+        week_column,
+    )
+    query = f"""
+            SELECT MIN(pk) FROM (
+                SELECT {pk_col} AS pk, NTILE({int(pieces)}) OVER (ORDER BY {pk_col}) AS tile
+                FROM {full_table}
+                WHERE {where_clause}
+            ) tiles
+            GROUP BY tile
+            ORDER BY tile"""
+    debug_log(
+        "Executing boundary query: %s | Params: %s", config, query.strip(), params, level="medium"
+    )
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, tuple(params))
+        return [row[0] for row in cursor.fetchall()][1:]
+    finally:
+        cursor.close()
@@ -4,12 +4,13 @@ from __future__ import annotations
 
 import argparse
 from collections import defaultdict
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from logic.partitioner import get_partitions
 
 
 from logic.config_loader import load_config
+from logic.reporter import TYPE_CODES, pk_range_clauses
 from connectors.sqlserver_connector import get_sqlserver_connection
 from utils.logger import debug_log
 from utils import format_partition
@@ -18,8 +19,103 @@ from tqdm import tqdm
 
 # Note: record_insert_datetime is managed during initial load, not needed during fix phase.
 
-def fix_mismatches(config: Dict, *, dry_run: Optional[bool] = None) -> None:
-    """Apply or print updates for mismatched rows using set-based joins."""
+# Bits of the BIGINT mask per staging pass, keeping the sign bit clear.
+MASK_BITS = 62
+FIX_TABLE = "#fix_rows"
+
+
+def _fix_statements(
+    columns: List[str],
+    *,
+    full_output: str,
+    full_dest: str,
+    dest_cols: Dict,
+    join_on: List[str],
+    filters: List[str],
+    range_clauses: List[str],
+) -> Dict[str, str]:
+    """Return the statements fixing *columns* of one partition.
+
+    ``create`` makes an empty ``#fix_rows`` with the output table's column
+    types; it takes no parameters so the temp table lives in the session
+    rather than in a parameterised batch's scope. ``stage`` pivots the
+    partition's mismatch rows into one row per key, with a value column per
+    field and a ``mask`` whose bit *i* says ``columns[i]`` needs updating.
+    ``update`` and ``delete`` then handle the staged rows whose ``rn`` lies
+    in a batch. Parameters: ``stage`` takes the column names twice, then the
+    *filters* parameters; ``update`` and ``delete`` take the batch bounds,
+    then the range parameters, and ``delete`` additionally the *filters*
+    parameters.
+    """
+    pivot = ", ".join(
+        f"MAX(CASE WHEN src.[column] = ? THEN src.source_value END) AS [v{i}]"
+        for i in range(len(columns))
+    )
+    # Each column contributes its own power of two at most once per key,
+    # so the sum is the bitwise OR of the columns staged for that key.
+    mask = " + ".join(
+        f"MAX(CASE WHEN src.[column] = ? THEN CAST({1 << i} AS BIGINT) ELSE 0 END)"
+        for i in range(len(columns))
+    )
+    where = " AND ".join(filters)
+    keys = "src.primary_key, src.[year], src.[month], src.[week]"
+    create = (
+        f"IF OBJECT_ID('tempdb..{FIX_TABLE}') IS NOT NULL DROP TABLE {FIX_TABLE}; "
+        f"SELECT TOP 0 CAST(0 AS BIGINT) AS rn, {keys}, "
+        + ", ".join(f"src.source_value AS [v{i}]" for i in range(len(columns)))
+        + f", CAST(0 AS BIGINT) AS mask INTO {FIX_TABLE} FROM {full_output} src; "
+        f"CREATE CLUSTERED INDEX ix_rn ON {FIX_TABLE} (rn)"
+    )
+    stage = (
+        f"INSERT INTO {FIX_TABLE} WITH (TABLOCK) "
+        f"SELECT ROW_NUMBER() OVER (ORDER BY src.primary_key), {keys}, {pivot}, {mask} "
+        f"FROM {full_output} src WHERE {where} GROUP BY {keys}"
+    )
+    set_clause = ", ".join(
+        f"dest.[{dest_cols.get(col, col)}] = CASE WHEN f.mask & {1 << i} <> 0 "
+        f"THEN f.[v{i}] ELSE dest.[{dest_cols.get(col, col)}] END"
+        for i, col in enumerate(columns)
+    )
+    join_clause = " AND ".join(join_on)
+    batch = " AND ".join(["f.rn > ?", "f.rn <= ?"] + range_clauses)
+    update = (
+        f"UPDATE dest SET {set_clause} "
+        f"FROM {full_dest} dest INNER JOIN {FIX_TABLE} f ON {join_clause} "
+        f"WHERE {batch}"
+    )
+    # Remove the applied records so they are not fixed again.
+    delete = (
+        f"DELETE src FROM {full_output} src "
+        f"INNER JOIN {FIX_TABLE} f ON src.primary_key = f.primary_key "
+        f"AND src.[year] = f.[year] AND src.[month] = f.[month] "
+        f"AND (src.[week] = f.[week] OR (src.[week] IS NULL AND f.[week] IS NULL)) "
+        f"INNER JOIN {full_dest} dest ON {join_clause} "
+        f"WHERE {batch} AND {where}"
+    )
+    return {"create": create, "stage": stage, "update": update, "delete": delete, "drop": f"DROP TABLE {FIX_TABLE}"}
+
+
+def fix_mismatches(
+    config: Dict,
+    *,
+    dry_run: Optional[bool] = None,
+    pool=None,
+    partitions: Optional[List[Dict]] = None,
+    show_progress: bool = True,
+) -> None:
+    """Apply or print updates for mismatched rows using set-based joins.
+
+    Each partition's mismatch records are pivoted into one staged row per
+    primary key (see :func:`_fix_statements`), so a row with several wrong
+    columns is updated by a single statement. Staged rows are applied in
+    batches of ``updates.batch_size`` keys, each committed with the delete
+    of its applied records to keep transactions and locks short.
+
+    When *pool* is given the destination connection is borrowed from it
+    instead of opening a new one. *partitions* limits the fix to those
+    partitions instead of every configured one, so concurrently processed
+    partitions each fix only their own rows.
+    """
 
     dry_run = (
         dry_run
@@ -27,6 +123,7 @@ def fix_mismatches(config: Dict, *, dry_run: Optional[bool] = None) -> None:
         else config.get("updates", {}).get("dry_run", True)
     )
     skip_nulls = config.get("updates", {}).get("skip_nulls", True)
+    batch_size = int(config.get("updates", {}).get("batch_size", 50_000))
 
     dest_env = config["destination"]["resolved_env"]
     dest_schema = config["destination"].get("schema", "")
@@ -35,6 +132,8 @@ def fix_mismatches(config: Dict, *, dry_run: Optional[bool] = None) -> None:
 
     output_schema = config["output"].get("schema", "")
     output_table = config["output"]["table"]
+    # The typed output layout stores a one character type code.
+    mismatch_type = TYPE_CODES["mismatch"] if config["output"].get("typed", False) else "mismatch"
 
     primary_key = config["primary_key"]
     year_logical = config["partitioning"]["year_column"]
@@ -47,115 +146,146 @@ def fix_mismatches(config: Dict, *, dry_run: Optional[bool] = None) -> None:
     full_dest = f"[{dest_schema}].[{dest_table}]" if dest_schema else f"[{dest_table}]"
     full_output = f"[{output_schema}].[{output_table}]" if output_schema else f"[{output_table}]"
 
-    with get_sqlserver_connection(dest_env, config) as conn:
+    conn_ctx = pool.connection() if pool is not None else get_sqlserver_connection(dest_env, config)
+    with conn_ctx as conn:
         cur = conn.cursor()
         summary: Dict[str, Dict] = defaultdict(lambda: {"updates": 0, "columns": defaultdict(int)})
 
-        partitions = list(get_partitions(config)) or [{}]
-        with tqdm(total=len(partitions), desc="partitions", unit="part") as part_bar:
+        if partitions is None:
+            partitions = list(get_partitions(config)) or [{}]
+        with tqdm(
+            total=len(partitions), desc="partitions", unit="part", disable=not show_progress
+        ) as part_bar:
             for partition in partitions:
                 part_bar.set_postfix_str(format_partition(partition))
                 part_bar.update(1)
-                part_params = []
-                where_clauses = ["[type] = 'mismatch'"]
+                part_params = [mismatch_type]
+                where_clauses = ["src.[type] = ?"]
                 if partition.get("year"):
                     part_params.append(partition["year"])
-                    where_clauses.append("[year] = ?")
+                    where_clauses.append("src.[year] = ?")
                 if partition.get("month"):
                     part_params.append(partition["month"])
-                    where_clauses.append("[month] = ?")
+                    where_clauses.append("src.[month] = ?")
 
                 if partition.get("week"):
                     part_params.append(partition["week"])
-                    where_clauses.append("[week] = ?")
+                    where_clauses.append("src.[week] = ?")
+
+                range_clauses = []
+                range_params = []
+                low, high = partition.get("pk_range") or (None, None)
+                if low is not None:
+                    range_clauses.append(f"dest.[{pk_col}] >= ?")
+                    range_params.append(low)
+                if high is not None:
+                    range_clauses.append(f"dest.[{pk_col}] < ?")
+                    range_params.append(high)
+
+                # Range sub-partitions stage only their own keys.
+                src_range, src_range_params = pk_range_clauses(partition, "src.primary_key")
 
                 debug_log(f"Processing partition {partition}", config, level="low")
 
                 cur.execute(
-                    f"SELECT DISTINCT [column] FROM {full_output} WHERE {' AND '.join(where_clauses)}",
-                    tuple(part_params),
+                    f"SELECT DISTINCT src.[column] FROM {full_output} src "
+                    f"WHERE {' AND '.join(where_clauses + src_range)}",
+                    tuple(part_params + src_range_params),
                 )
                 columns_to_update = [row[0] for row in cur.fetchall()]
 
-                with tqdm(
-                    columns_to_update,
-                    desc=f"{format_partition(partition)} columns",
-                    unit="col",
-                    leave=False,
-                ) as col_bar:
-                    col_bar.set_postfix_str(format_partition(partition))
-                    for col in columns_to_update:
-                        dest_column = dest_cols.get(col, col)
-
-                        join_on = [
-                            f"dest.[{pk_col}] = src.primary_key",
-                            f"dest.[{year_col}] = src.[year]",
-                            f"dest.[{month_col}] = src.[month]",
-                        ]
-                        if partition.get("week"):
-                            week_key = config["partitioning"].get("week_column", "week")
-                            dest_week_col = dest_cols.get(week_key, week_key)
-                            join_on.append(f"dest.[{dest_week_col}] = src.[week]")
-
-                        join_clause = " AND ".join(join_on)
-
-                        where = where_clauses + ["src.[column] = ?"]
-                        params = part_params + [col]
-                        if skip_nulls:
-                            where.append("src.source_value IS NOT NULL AND src.source_value <> ''")
-
-                        update_sql = (
-                            f"UPDATE dest SET dest.[{dest_column}] = src.source_value "
-                            f"FROM {full_dest} dest INNER JOIN {full_output} src ON {join_clause} "
-                            f"WHERE {' AND '.join(where)}"
-                        )
-
-                        debug_log(f"Prepared update SQL: {update_sql} | {params}", config, level="medium")
-
-                        if dry_run:
-                            print(update_sql, tuple(params))
-
-                            delete_sql = (
-                                f"DELETE FROM {full_output} "
-                                f"WHERE primary_key IN ("
-                                f"SELECT src.primary_key FROM {full_output} src "
-                                f"JOIN {full_dest} dest ON {join_clause} "
-                                f"WHERE {' AND '.join(where + [f'src.[column] = ?'])}"
-                                f")"
+                join_on = [
+                    f"dest.[{pk_col}] = f.primary_key",
+                    f"dest.[{year_col}] = f.[year]",
+                    f"dest.[{month_col}] = f.[month]",
+                ]
+                if partition.get("week"):
+                    week_key = config["partitioning"].get("week_column", "week")
+                    dest_week_col = dest_cols.get(week_key, week_key)
+                    join_on.append(f"dest.[{dest_week_col}] = f.[week]")
+
+                key = f"{partition.get('year', 'ALL')}-{partition.get('month', 'ALL')}"
+                if partition.get('week'):
+                    key += f"-{partition['week']}"
+
+                # More columns than mask bits are fixed in several passes.
+                for start in range(0, len(columns_to_update), MASK_BITS):
+                    group = columns_to_update[start:start + MASK_BITS]
+                    filters = where_clauses + [
+                        f"src.[column] IN ({', '.join('?' for _ in group)})"
+                    ]
+                    filter_params = part_params + list(group)
+                    filters += src_range
+                    filter_params += src_range_params
+                    if skip_nulls:
+                        filters.append("src.source_value IS NOT NULL AND src.source_value <> ''")
+                    sql = _fix_statements(
+                        group,
+                        full_output=full_output,
+                        full_dest=full_dest,
+                        dest_cols=dest_cols,
+                        join_on=join_on,
+                        filters=filters,
+                        range_clauses=range_clauses,
+                    )
+                    stage_params = tuple(group) * 2 + tuple(filter_params)
+                    debug_log("Prepared stage SQL: %s | %s", config, sql["stage"], stage_params, level="medium")
+                    debug_log("Prepared update SQL: %s", config, sql["update"], level="medium")
+                    debug_log("Prepared delete SQL: %s", config, sql["delete"], level="medium")
+
+                    if dry_run:
+                        print(sql["create"])
+                        print(sql["stage"], stage_params)
+                        print(sql["update"], ("<rn from>", "<rn to>", *range_params))
+                        print(sql["delete"], ("<rn from>", "<rn to>", *range_params, *filter_params))
+                        continue
+
+                    try:
+                        cur.execute(sql["create"])
+                        cur.execute(sql["stage"], stage_params)
+                        cur.execute(
+                            f"SELECT COUNT(*), "
+                            + ", ".join(
+                                f"SUM(CASE WHEN mask & {1 << i} <> 0 THEN 1 ELSE 0 END)"
+                                for i in range(len(group))
                             )
-                            print(delete_sql, tuple(params + [col]))
-                            affected = 0
-                        else:
+                            + f" FROM {FIX_TABLE}"
+                        )
+                        staged, *per_column = cur.fetchone()
+                        conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        debug_log(f"Error staging fixes: {e}", config, level="low")
+                        continue
+
+                    affected = 0
+                    with tqdm(
+                        total=staged or 0,
+                        desc=f"{format_partition(partition)} rows",
+                        unit="row",
+                        leave=False,
+                        disable=not show_progress,
+                    ) as row_bar:
+                        for lo in range(0, staged or 0, batch_size):
+                            bounds = (lo, lo + batch_size)
                             try:
-                                cur.execute(update_sql, tuple(params))
-                                affected = cur.rowcount
+                                cur.execute(sql["update"], bounds + tuple(range_params))
+                                affected += max(cur.rowcount, 0)
+                                cur.execute(
+                                    sql["delete"],
+                                    bounds + tuple(range_params) + tuple(filter_params),
+                                )
                                 conn.commit()
                             except Exception as e:
-                                debug_log(f"Error executing update: {e}", config, level="low")
-                                continue
-
-                        # Delete the updated records from the output table to prevent reprocessing
-                        delete_sql = (
-                            f"DELETE src FROM {full_output} src "
-                            f"INNER JOIN {full_dest} dest ON {join_clause} "
-                            f"WHERE {' AND '.join(where)} AND src.[column] = ?"
-                        )
-
-                        try:
-                            debug_log(f"Prepared delete SQL: {delete_sql} | {tuple(params + [col])}", config, level="medium")
-                            cur.execute(delete_sql, tuple(params + [col]))
-                            conn.commit()
-                        except Exception as e:
-                            debug_log(f"Error executing delete: {e}", config, level="low")
-                            continue
-
-                        col_bar.update(1)
-
-                        key = f"{partition.get('year', 'ALL')}-{partition.get('month', 'ALL')}"
-                        if partition.get('week'):
-                            key += f"-{partition['week']}"
-                        summary[key]["updates"] += affected
-                        summary[key]["columns"][col] += affected
+                                conn.rollback()
+                                debug_log(f"Error executing fix batch {bounds}: {e}", config, level="low")
+                            row_bar.update(min(batch_size, staged - lo))
+                    cur.execute(sql["drop"])
+                    conn.commit()
+
+                    summary[key]["updates"] += affected
+                    for col, cnt in zip(group, per_column):
+                        summary[key]["columns"][col] += cnt or 0
 
         for part, info in summary.items():
             print(f"Partition: {part}")
@@ -7,29 +7,61 @@ import argparse
 from typing import Any
 from concurrent.futures import ThreadPoolExecutor
 from pqdm.processes import pqdm as pqdm_processes
-from contextlib import nullcontext
+from operator import itemgetter
 import subprocess
 import sys
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import partial
 import time
+from contextlib import contextmanager
 
 from logic.config_loader import load_config
-from connectors.oracle_connector import get_oracle_connection
-from connectors.sqlserver_connector import get_sqlserver_connection
-from logic.partitioner import get_partitions
-from runners.reconcile import fetch_rows
+from connectors.oracle_connector import create_oracle_pool, get_oracle_connection
+from connectors.sqlserver_connector import create_sqlserver_pool, get_sqlserver_connection
+from logic.partitioner import drill_down_checksums, get_partitions, split_large_partitions
+from runners.reconcile import (
+    HASH_GROUP_BYTES,
+    count_partition_rows,
+    diff_row_hashes,
+    diff_incremental_keys,
+    fetch_bucket_checksums,
+    fetch_pk_boundaries,
+    fetch_pks,
+    fetch_row_hashes,
+    fetch_rows,
+    fetch_rows_by_pk,
+    hash_column_widths,
+    pk_bucket_expression,
+)
 from logic.comparator import compare_row_pairs, discard_matching_rows_by_hash
-from logic.reporter import DiscrepancyWriter
-from utils.logger import debug_log
+from logic.comparison_plan import (
+    AUTO,
+    STRING,
+    ComparisonPlan,
+    build_plan_from_description,
+    build_plan_from_rows,
+)
+from logic.reporter import AsyncDiscrepancyWriter, DiscrepancyWriter, clear_partition_output
+from logic.sinks import open_sink
+from logic.row_schema import RowSchema, as_dict
+from utils.logger import configure_logging, debug_log
 from utils import format_partition
+from utils.read_ahead import ReadAhead
+from utils.run_state import RunState
+from utils.snapshot_cache import SnapshotCache, cache_key
+from utils.scheduler import (
+    ConcurrencyLimits,
+    RunProgress,
+    estimate_partition_size,
+    run_scheduled,
+)
 from utils.system_resources import get_optimal_worker_count
 import psutil
-from tqdm import tqdm
 import threading
 
-from scripts.fix_mismatches import main as fix_mismatches_main
+from scripts.fix_mismatches import fix_mismatches
 
 
 def fetch_all_rows(**kwargs):
@@ -37,6 +69,397 @@ def fetch_all_rows(**kwargs):
     return list(fetch_rows(**kwargs))
 
 
+def resolve_comparison_plan(
+    plans: dict,
+    descriptions: dict,
+    src_rows: list,
+    dest_rows: list,
+    src_cols: dict,
+    dest_cols: dict,
+) -> ComparisonPlan:
+    """Return the table's comparison plan, building it on first use.
+
+    Cursor descriptions from both sides are preferred. Columns they cannot
+    classify, and character columns which may hold numbers or dates rendered
+    as text, are refined from a sample of the fetched rows. The plan is cached
+    in *plans* so later partitions reuse it.
+    """
+    plan = plans.get("comparison")
+    if plan is not None:
+        return plan
+
+    kinds = {c: AUTO for c in src_cols}
+    if descriptions.get("source") and descriptions.get("destination"):
+        # Per-side plans record how each database stores the columns which
+        # the hash-first mode needs to render canonical text in SQL.
+        plans["source"] = build_plan_from_description(
+            descriptions["source"], list(src_cols.keys())
+        )
+        plans["destination"] = build_plan_from_description(
+            descriptions["destination"], list(dest_cols.keys())
+        )
+        described = plans["source"].merge(plans["destination"])
+        kinds.update({c: described.kind(c) for c in src_cols})
+    unresolved = [c for c, kind in kinds.items() if kind in (AUTO, STRING)]
+    if unresolved:
+        if not src_rows and not dest_rows:
+            # Nothing to sample yet; let a later partition build the plan.
+            return ComparisonPlan(kinds)
+        sampled = build_plan_from_rows(
+            src_rows[:1000] + dest_rows[:1000], unresolved, sample_size=2000
+        )
+        for col in unresolved:
+            if sampled.kind(col) != AUTO:
+                kinds[col] = sampled.kind(col)
+    plan = ComparisonPlan(kinds)
+    return plans.setdefault("comparison", plan)
+
+
+def ensure_comparison_plan(
+    src_conn, dest_conn, src_fetch: dict, dest_fetch: dict, plans: dict
+) -> ComparisonPlan:
+    """Return the cached plan or build it from a small sample of both sides.
+
+    Modes that push hashing into the databases never stream full partitions
+    so they sample up to 1000 rows once per table instead.
+    """
+    plan = plans.get("comparison")
+    if plan is not None:
+        return plan
+    descriptions: dict = {}
+    src_sample = list(fetch_rows(
+        src_conn,
+        **{**src_fetch, "limit": 1000},
+        on_description=lambda d: descriptions.__setitem__("source", d),
+    ))
+    dest_sample = list(fetch_rows(
+        dest_conn,
+        **{**dest_fetch, "limit": 1000},
+        on_description=lambda d: descriptions.__setitem__("destination", d),
+    ))
+    return resolve_comparison_plan(
+        plans,
+        descriptions,
+        src_sample,
+        dest_sample,
+        src_fetch["columns"],
+        dest_fetch["columns"],
+    )
+
+
+def hash_options(plan: ComparisonPlan, plans: dict, columns: dict, config: dict) -> dict:
+    """Return the ``widths`` and ``max_bytes`` arguments of server-side hashes.
+
+    Both sides get the same widths so their hash expressions match. LOB
+    columns cannot be hashed in SQL and are reported once per partition.
+    """
+    widths = hash_column_widths(
+        columns, plan, plans.get("source"), plans.get("destination")
+    )
+    lobs = [c for c, width in widths.items() if width is None]
+    if lobs:
+        debug_log(f"Server-side hashes skip LOB columns {lobs}", config, level="medium")
+    max_bytes = config.get("comparison", {}).get("hash_group_bytes", HASH_GROUP_BYTES)
+    return {"widths": widths, "max_bytes": max_bytes}
+
+
+def fetch_drilldown_rows(
+    src_conn,
+    dest_conn,
+    src_fetch: dict,
+    dest_fetch: dict,
+    plans: dict,
+    config: dict,
+) -> tuple[list, list, ComparisonPlan]:
+    """Return rows from primary key buckets whose aggregate checksums differ.
+
+    Row counts and checksums are compared per partition in SQL first and only
+    mismatching buckets are split further (see
+    :func:`logic.partitioner.drill_down_checksums`). Identical partitions
+    return two empty lists after a single round trip per side.
+    """
+    comparison_cfg = config.get("comparison", {})
+    plan = ensure_comparison_plan(src_conn, dest_conn, src_fetch, dest_fetch, plans)
+    algorithm = comparison_cfg.get("hash_algorithm", "MD5")
+    options = hash_options(plan, plans, src_fetch["columns"], config)
+    primary_key = src_fetch["primary_key"]
+    checksum_keys = ("schema", "table", "columns", "partition", "primary_key",
+                     "year_column", "month_column", "dialect", "week_column",
+                     "config")
+
+    def checksum_fetcher(conn, fetch_kwargs, side):
+        def fetch(modulus, parent):
+            return fetch_bucket_checksums(
+                conn,
+                plan=plan,
+                modulus=modulus,
+                parent=parent,
+                algorithm=algorithm,
+                physical_plan=plans.get(side),
+                **options,
+                **{k: fetch_kwargs[k] for k in checksum_keys},
+            )
+        return fetch
+
+    modulus, buckets, stats = drill_down_checksums(
+        checksum_fetcher(src_conn, src_fetch, "source"),
+        checksum_fetcher(dest_conn, dest_fetch, "destination"),
+        fanout=comparison_cfg.get("drilldown_fanout", 16),
+        leaf_size=comparison_cfg.get("drilldown_leaf_size", 10_000),
+        max_depth=comparison_cfg.get("drilldown_max_depth", 6),
+    )
+    debug_log(
+        f"Checksum drill-down {format_partition(src_fetch['partition'])}: "
+        f"{len(buckets)} of modulus {modulus} buckets differ {stats}",
+        config,
+        level="medium",
+    )
+    if not buckets:
+        return [], [], plan
+
+    def fetch_side(conn, fetch_kwargs, side):
+        physical = plans.get(side)
+        bucket_expr = pk_bucket_expression(
+            fetch_kwargs["columns"][primary_key],
+            plan.kind(primary_key),
+            fetch_kwargs["dialect"],
+            physical.kind(primary_key) if physical is not None else None,
+        )
+        return list(fetch_rows(
+            conn, pk_buckets=(bucket_expr, modulus, buckets), **fetch_kwargs
+        ))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_src = executor.submit(fetch_side, src_conn, src_fetch, "source")
+        future_dest = executor.submit(fetch_side, dest_conn, dest_fetch, "destination")
+        return future_src.result(), future_dest.result(), plan
+
+
+def fetch_changed_rows(
+    src_conn,
+    dest_conn,
+    src_fetch: dict,
+    dest_fetch: dict,
+    plans: dict,
+    config: dict,
+) -> tuple[list, list, ComparisonPlan]:
+    """Return rows whose server-side hashes differ plus the comparison plan.
+
+    Both databases first return only ``(pk, hash)`` tuples. Full rows are
+    fetched afterwards for keys whose hashes differ or that exist on one
+    side only. ``src_fetch`` and ``dest_fetch`` hold the keyword arguments
+    normally passed to :func:`fetch_rows`.
+    """
+    comparison_cfg = config.get("comparison", {})
+    src_cols = src_fetch["columns"]
+    dest_cols = dest_fetch["columns"]
+    primary_key = src_fetch["primary_key"]
+
+    plan = ensure_comparison_plan(src_conn, dest_conn, src_fetch, dest_fetch, plans)
+
+    only_cols = comparison_cfg.get("only_columns")
+
+    def hashed_columns(cols: dict) -> dict:
+        return {
+            c: v for c, v in cols.items()
+            if c == primary_key or not only_cols or c in only_cols
+        }
+
+    algorithm = comparison_cfg.get("hash_algorithm", "MD5")
+    options = hash_options(plan, plans, src_cols, config)
+    hash_keys = ("schema", "table", "partition", "primary_key", "year_column",
+                 "month_column", "dialect", "week_column", "config", "limit",
+                 "pk_value")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_src = executor.submit(lambda: list(fetch_row_hashes(
+            src_conn,
+            columns=hashed_columns(src_cols),
+            plan=plan,
+            physical_plan=plans.get("source"),
+            algorithm=algorithm,
+            **options,
+            **{k: src_fetch[k] for k in hash_keys},
+        )))
+        future_dest = executor.submit(lambda: list(fetch_row_hashes(
+            dest_conn,
+            columns=hashed_columns(dest_cols),
+            plan=plan,
+            physical_plan=plans.get("destination"),
+            algorithm=algorithm,
+            **options,
+            **{k: dest_fetch[k] for k in hash_keys},
+        )))
+        src_hashes = future_src.result()
+        dest_hashes = future_dest.result()
+
+    pks, stats = diff_row_hashes(src_hashes, dest_hashes)
+    total = max(len(src_hashes), len(dest_hashes))
+    del src_hashes, dest_hashes
+    debug_log(
+        f"Hash-first {format_partition(src_fetch['partition'])}: {stats}",
+        config,
+        level="medium",
+    )
+    if not pks:
+        return [], [], plan
+    src_rows, dest_rows = fetch_rows_for_pks(
+        src_conn, dest_conn, src_fetch, dest_fetch, pks, total, config
+    )
+    return src_rows, dest_rows, plan
+
+
+def fetch_rows_for_pks(
+    src_conn,
+    dest_conn,
+    src_fetch: dict,
+    dest_fetch: dict,
+    pks: list,
+    total: int,
+    config: dict,
+) -> tuple[list, list]:
+    """Return both sides' rows for the sorted *pks* of a partition of *total* rows.
+
+    Keys are fetched in ``IN`` lists unless they exceed
+    ``comparison.hash_first_full_fetch_ratio`` of the partition, in which
+    case the partition is streamed once and filtered locally.
+    """
+    primary_key = src_fetch["primary_key"]
+    full_fetch_ratio = config.get("comparison", {}).get("hash_first_full_fetch_ratio", 0.25)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        if len(pks) > full_fetch_ratio * total:
+            # Long IN lists cost more than streaming the partition once.
+            wanted = set(pks)
+
+            def fetch_side(conn, fetch_kwargs):
+                return [
+                    r for r in fetch_rows(conn, **fetch_kwargs)
+                    if r[primary_key] in wanted
+                ]
+
+        else:
+
+            def fetch_side(conn, fetch_kwargs):
+                return list(fetch_rows_by_pk(
+                    conn,
+                    pk_values=pks,
+                    **{k: v for k, v in fetch_kwargs.items() if k != "pk_value"},
+                ))
+
+        future_src = executor.submit(fetch_side, src_conn, src_fetch)
+        future_dest = executor.submit(fetch_side, dest_conn, dest_fetch)
+        return future_src.result(), future_dest.result()
+
+
+def fetch_incremental_rows(
+    src_conn,
+    dest_conn,
+    src_fetch: dict,
+    dest_fetch: dict,
+    plans: dict,
+    config: dict,
+    *,
+    watermark,
+) -> tuple[list, list, ComparisonPlan]:
+    """Return rows modified after *watermark* or present on one side only.
+
+    Each side lists the keys whose ``modified_column`` is later than the
+    watermark and, for delete detection, all of its keys; only those two
+    primary key queries scan the partition. Full rows are fetched for the
+    changed keys and for keys missing on either side.
+    """
+    plan = ensure_comparison_plan(src_conn, dest_conn, src_fetch, dest_fetch, plans)
+    key_args = ("schema", "table", "columns", "partition", "primary_key",
+                "year_column", "month_column", "dialect", "week_column",
+                "config", "pk_value", "fetch_options")
+
+    def list_keys(conn, fetch_kwargs, side):
+        kwargs = {k: fetch_kwargs[k] for k in key_args}
+        column = config[side]["modified_column"]
+        changed = fetch_pks(conn, modified_since=(column, watermark), **kwargs)
+        return changed, fetch_pks(conn, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_src = executor.submit(list_keys, src_conn, src_fetch, "source")
+        future_dest = executor.submit(list_keys, dest_conn, dest_fetch, "destination")
+        src_changed, src_pks = future_src.result()
+        dest_changed, dest_pks = future_dest.result()
+
+    pks, stats = diff_incremental_keys(src_changed, dest_changed, src_pks, dest_pks)
+    total = max(len(src_pks), len(dest_pks))
+    del src_pks, dest_pks
+    debug_log(
+        f"Incremental {format_partition(src_fetch['partition'])} since {watermark}: {stats}",
+        config,
+        level="medium",
+    )
+    if not pks:
+        return [], [], plan
+    src_rows, dest_rows = fetch_rows_for_pks(
+        src_conn, dest_conn, src_fetch, dest_fetch, pks, total, config
+    )
+    return src_rows, dest_rows, plan
+
+
+def cached_fetch_rows(
+    cache: SnapshotCache | None,
+    side: str,
+    conn,
+    env: dict,
+    fetch_kwargs: dict,
+    *,
+    row_mode: str,
+    on_description,
+):
+    """Return :func:`fetch_rows` for *side*, served from *cache* when possible.
+
+    A cached partition is used when its row count still matches a
+    ``COUNT(*)`` (``cache.validate: count``, the default) or unconditionally
+    with ``validate: none``. Otherwise rows are written to the cache while
+    they stream. A single ``--record`` is looked up in its cached partition
+    but never cached on its own; ``--limit`` runs bypass the cache.
+    """
+    config = fetch_kwargs["config"]
+    cache_cfg = config.get("cache") or {}
+    if (
+        cache is None
+        or side not in cache_cfg.get("sides", ("source", "destination"))
+        or fetch_kwargs.get("limit")
+    ):
+        return fetch_rows(conn, on_description=on_description, row_mode=row_mode, **fetch_kwargs)
+
+    columns = fetch_kwargs["columns"]
+    partition = fetch_kwargs["partition"]
+    key = cache_key(env, fetch_kwargs["schema"], fetch_kwargs["table"], columns, partition)
+    expected = None
+    if cache_cfg.get("validate", "count") == "count":
+        expected = count_partition_rows(
+            conn,
+            **{k: fetch_kwargs[k] for k in (
+                "schema", "table", "columns", "partition", "primary_key",
+                "year_column", "month_column", "dialect", "week_column", "config",
+            )},
+        )
+    pk_value = fetch_kwargs.get("pk_value")
+    if cache.lookup(key, expected) is not None:
+        debug_log(
+            f"Reading {side} {format_partition(partition)} from the snapshot cache",
+            config,
+            level="low",
+        )
+        rows = cache.rows(key, row_mode)
+        if pk_value is None:
+            return rows
+        primary_key = fetch_kwargs["primary_key"]
+        pk_of = itemgetter(list(columns).index(primary_key) if row_mode == "tuple" else primary_key)
+        return (r for r in rows if str(pk_of(r)) == str(pk_value))
+    rows = fetch_rows(conn, on_description=on_description, row_mode=row_mode, **fetch_kwargs)
+    if pk_value is not None:
+        return rows
+    return cache.tee(
+        key, rows, list(columns), table=fetch_kwargs["table"], partition=partition
+    )
+
+
 def process_partition(
     partition: dict,
     config: dict,
@@ -62,8 +485,31 @@ def process_partition(
     use_row_hash: bool,
     sample: list,
     seen_pks: set,
-) -> None:
-    """Process a single partition using its own database connections."""
+    plans: dict,
+    src_pool=None,
+    dest_pool=None,
+    limits: ConcurrencyLimits | None = None,
+    run_state: RunState | None = None,
+    watermark: datetime | None = None,
+    cache: SnapshotCache | None = None,
+) -> dict:
+    """Process a single partition.
+
+    Connections come from *src_pool* and *dest_pool* when given and are
+    returned to them afterwards; otherwise the partition opens and closes its
+    own connections. Reads hold a ``source_read`` and ``destination_read``
+    slot of *limits* until both sides are consumed. Each discrepancy batch
+    written and the fix phase hold a ``destination_write`` slot. *pbar* is the
+    run's :class:`utils.scheduler.RunProgress`.
+
+    Progress is checkpointed in *run_state*; output rows left by an
+    interrupted earlier attempt are deleted first, except in incremental
+    mode, where the merge overwrites them. With a *watermark* only
+    rows modified after it, and keys present on one side only, are compared
+    (see :func:`fetch_incremental_rows`). Streamed partitions are read from
+    and written to *cache* (see :func:`cached_fetch_rows`). Returns the
+    partition's row and discrepancy counts.
+    """
 
     part_label = format_partition(partition)
     debug_log(
@@ -72,61 +518,167 @@ def process_partition(
         level="low",
     )
     part_start = time.perf_counter()
-    pbar.set_description(f"mismatches {part_label}")
+    limits = limits or ConcurrencyLimits()
+    counts = {"source_rows": 0, "dest_rows": 0, "discrepancies": 0}
     src_rows = dest_rows = []
-    try:
-        # Fetch source and destination rows concurrently using ThreadPoolExecutor.
-        from concurrent.futures import ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            future_src = executor.submit(lambda: list(fetch_all_rows(
-                conn=get_oracle_connection(src_env, config).__enter__(),
-                schema=src_schema,
-                table=src_table,
-                columns=src_cols,
-                partition=partition,
-                primary_key=primary_key,
-                year_column=year_column,
-                month_column=month_column,
-                dialect=src_dialect,
-                week_column=week_column,
-                config=config,
-                limit=config.get("limit"),
-                pk_value=config.get("record_pk"),
-            )))
-            future_dest = executor.submit(lambda: list(fetch_all_rows(
-                conn=get_sqlserver_connection(dest_env, config).__enter__(),
-                schema=dest_schema,
-                table=dest_table,
-                columns=dest_cols,
-                partition=partition,
-                primary_key=primary_key,
-                year_column=year_column,
-                month_column=month_column,
-                dialect=dest_dialect,
-                week_column=week_column,
-                config=config,
-                limit=config.get("limit"),
-                pk_value=config.get("record_pk"),
-            )))
-            try:
-                src_rows = future_src.result()
-            except Exception as e:
-                debug_log(f"[ERROR] Failed to fetch source rows: {e}", config, level="low")
-                raise
-            try:
-                dest_rows = future_dest.result()
-            except Exception as e:
-                debug_log(f"[ERROR] Failed to fetch destination rows: {e}", config, level="low")
-                raise
+    schema = None
+    descriptions: dict = {}
+    connections: list = []
+    readers: list = []
+    held: list = []
 
-        debug_log(
-            f"Fetched {len(src_rows)} source rows and {len(dest_rows)} destination rows",
-            config,
-            level="medium",
-        )
+    def release_reads() -> None:
+        """Close the streams and hand back read connections and slots."""
+        for reader in readers:
+            reader.close()
+        readers.clear()
+        for pool, conn in connections:
+            if pool is not None:
+                pool.release(conn)
+            else:
+                conn.close()
+        connections.clear()
+        while held:
+            limits.release(held.pop())
 
+    src_fetch = {
+        "schema": src_schema,
+        "table": src_table,
+        "columns": src_cols,
+        "partition": partition,
+        "primary_key": primary_key,
+        "year_column": year_column,
+        "month_column": month_column,
+        "dialect": src_dialect,
+        "week_column": week_column,
+        "config": config,
+        "limit": config.get("limit"),
+        "pk_value": config.get("record_pk"),
+        "fetch_options": config["source"].get("fetch"),
+    }
+    dest_fetch = {
+        **src_fetch,
+        "schema": dest_schema,
+        "table": dest_table,
+        "columns": dest_cols,
+        "dialect": dest_dialect,
+        "fetch_options": config["destination"].get("fetch"),
+    }
+    try:
+        if run_state is not None:
+            # File sinks replace the partition's file, so only tables need
+            # cleanup. An incremental pass rechecks only changed keys and
+            # merges, so deleting would lose discrepancies it cannot find again.
+            if (
+                run_state.needs_cleanup(partition)
+                and writes_table(config)
+                and watermark is None
+            ):
+                with limits.hold("destination_write"), (
+                    dest_pool.connection()
+                    if dest_pool is not None
+                    else get_sqlserver_connection(dest_env, config)
+                ) as conn:
+                    clear_partition_output(conn, output_schema, output_table, partition)
+            run_state.start(partition)
         comparison_cfg = config.get("comparison", {})
-        if use_row_hash and comparison_cfg.get("aggressive_memory_cleanup"):
+        limits.acquire("source_read")
+        held.append("source_read")
+        if src_pool is not None:
+            src_conn = src_pool.acquire()
+        else:
+            src_conn = get_oracle_connection(src_env, config)
+        connections.append((src_pool, src_conn))
+        limits.acquire("destination_read")
+        held.append("destination_read")
+        if dest_pool is not None:
+            dest_conn = dest_pool.acquire()
+        else:
+            dest_conn = get_sqlserver_connection(dest_env, config)
+        connections.append((dest_pool, dest_conn))
+        if (
+            watermark is not None
+            or comparison_cfg.get("checksum_drilldown")
+            or comparison_cfg.get("hash_first")
+        ):
+            if watermark is not None:
+                fetch_pushdown = partial(fetch_incremental_rows, watermark=watermark)
+            elif comparison_cfg.get("checksum_drilldown"):
+                fetch_pushdown = fetch_drilldown_rows
+            else:
+                fetch_pushdown = fetch_changed_rows
+            src_rows, dest_rows, plan = fetch_pushdown(
+                src_conn, dest_conn, src_fetch, dest_fetch, plans, config
+            )
+            debug_log(
+                f"Fetched {len(src_rows)} source rows and {len(dest_rows)} destination rows",
+                config,
+                level="medium",
+            )
+            counts["source_rows"], counts["dest_rows"] = len(src_rows), len(dest_rows)
+            release_reads()
+        else:
+            # Stream both sides through bounded read-ahead queues so fetching
+            # overlaps the merge-join and memory stays flat.
+            read_ahead_batches = comparison_cfg.get("read_ahead_batches", 8)
+            row_mode = comparison_cfg.get("row_mode", "dict")
+            if row_mode == "tuple" and list(src_cols) != list(dest_cols):
+                debug_log(
+                    "Source and destination columns differ in order; using dict rows",
+                    config,
+                    level="low",
+                )
+                row_mode = "dict"
+            if row_mode == "tuple":
+                # Driver tuples share one column index instead of a dict per row.
+                schema = RowSchema(src_cols)
+            src_rows = ReadAhead(
+                cached_fetch_rows(
+                    cache,
+                    "source",
+                    src_conn,
+                    src_env,
+                    src_fetch,
+                    on_description=lambda d: descriptions.__setitem__("source", d),
+                    row_mode=row_mode,
+                ),
+                max_batches=read_ahead_batches,
+                name=f"source {part_label}",
+            )
+            readers.append(src_rows)
+            dest_rows = ReadAhead(
+                cached_fetch_rows(
+                    cache,
+                    "destination",
+                    dest_conn,
+                    dest_env,
+                    dest_fetch,
+                    on_description=lambda d: descriptions.__setitem__("destination", d),
+                    row_mode=row_mode,
+                ),
+                max_batches=read_ahead_batches,
+                name=f"destination {part_label}",
+            )
+            readers.append(dest_rows)
+            plan = resolve_comparison_plan(
+                plans,
+                descriptions,
+                [as_dict(r, schema) for r in src_rows.peek(1000)],
+                [as_dict(r, schema) for r in dest_rows.peek(1000)],
+                src_cols,
+                dest_cols,
+            )
+
+        debug_log(f"Comparison plan: {plan}", config, level="medium")
+
+        # Streamed rows are hashed and released pair by pair so the up-front
+        # cleanup only applies to the row lists returned by pushdown modes.
+        if (
+            use_row_hash
+            and comparison_cfg.get("aggressive_memory_cleanup")
+            and isinstance(src_rows, list)
+        ):
+            discard_stats: dict = {}
             src_rows, dest_rows, discarded, kept = discard_matching_rows_by_hash(
                 src_rows,
                 dest_rows,
@@ -134,99 +686,108 @@ def process_partition(
                 workers=workers,
                 mode=comparison_cfg.get("parallel_mode", "thread"),
                 config=config,
+                plan=plan,
+                stats=discard_stats,
             )
             debug_log(
-                f"Discarded {discarded} matching rows, {kept} remain for comparison",
+                f"{format_partition(partition)}: discarded {discarded} matching rows, "
+                f"{kept} changed pairs remain, {discard_stats['source_only']} source-only, "
+                f"{discard_stats['dest_only']} destination-only",
                 config,
                 level="medium",
             )
 
-        # Re-establish destination connection for writing, as previous connection was closed after fetching.
-        with get_sqlserver_connection(dest_env, config) as dest_conn, DiscrepancyWriter(dest_conn, output_schema, output_table) as writer:
+        with discrepancy_writer(
+            config,
+            partition,
+            dest_pool=dest_pool,
+            dest_env=dest_env,
+            limits=limits,
+            output_schema=output_schema,
+            output_table=output_table,
+            on_flush=(lambda n: run_state.flushed(partition, n)) if run_state else None,
+            incremental=watermark is not None,
+        ) as writer:
 
             def write_record(record: dict) -> None:
-                debug_log(f"WRITING: {record}", config, level="medium")
+                debug_log("WRITING: %s", config, record, level="medium")
                 writer.write(record)
+                counts["discrepancies"] += 1
+                pbar.record()
                 if config.get("output_mismatches"):
                     print(record)
 
+            # Every record carries the same fields so writers and file sinks
+            # see one column set.
+            no_hashes = {"source_hash": None, "dest_hash": None} if use_row_hash else {}
+
             src_iter = iter(src_rows)
             dest_iter = iter(dest_rows)
 
             src_row = next(src_iter, None)
             dest_row = next(dest_iter, None)
 
-            total_rows = max(len(src_rows), len(dest_rows))
-
             def row_pairs():
-                use_bar = total_rows <= 1000
-                bar_ctx = (
-                    tqdm(
-                        total=total_rows,
-                        desc=f"rows {format_partition(partition)}",
-                        unit="row",
-                    )
-                    if use_bar
-                    else nullcontext()
-                )
-                with bar_ctx as progress:
-                    if use_bar:
-                        progress.set_postfix_str(format_partition(partition))
-                    nonlocal src_row, dest_row
-                    while src_row is not None or dest_row is not None:
-                        if src_row is not None:
-                            assert primary_key in src_row, f"Primary key '{primary_key}' missing in source row: {src_row}"
-                        if dest_row is not None:
-                            assert primary_key in dest_row, f"Primary key '{primary_key}' missing in destination row: {dest_row}"
-
-                        src_key = src_row[primary_key] if src_row else None
-                        dest_key = dest_row[primary_key] if dest_row else None
-
-                        if src_row and dest_row and src_key == dest_key:
-                            yield (src_row, dest_row, src_cols, config, partition)
-                            src_row = next(src_iter, None)
-                            dest_row = next(dest_iter, None)
-                        elif dest_row is None or (src_row and src_key < dest_key):
-                            write_record({
-                                "primary_key": src_key,
-                                "type": "missing_in_dest",
-                                "column": None,
-                                "source_value": src_row,
-                                "dest_value": None,
-                                "year": partition["year"],
-                                "month": partition["month"],
-                                "week": partition.get("week"),
-                            })
-                            src_row = next(src_iter, None)
-                        else:
-                            write_record({
-                                "primary_key": dest_key,
-                                "type": "extra_in_dest",
-                                "column": None,
-                                "source_value": None,
-                                "dest_value": dest_row,
-                                "year": partition["year"],
-                                "month": partition["month"],
-                                "week": partition.get("week"),
-                            })
-                            dest_row = next(dest_iter, None)
-
-                        if use_bar:
-                            progress.update(1)
+                nonlocal src_row, dest_row
+                pk_of = itemgetter(schema.index[primary_key] if schema else primary_key)
+                while src_row is not None or dest_row is not None:
+                    if schema is None and src_row is not None:
+                        assert primary_key in src_row, f"Primary key '{primary_key}' missing in source row: {src_row}"
+                    if schema is None and dest_row is not None:
+                        assert primary_key in dest_row, f"Primary key '{primary_key}' missing in destination row: {dest_row}"
+
+                    src_key = pk_of(src_row) if src_row else None
+                    dest_key = pk_of(dest_row) if dest_row else None
+
+                    if src_row and dest_row and src_key == dest_key:
+                        yield (src_row, dest_row, src_cols, config, partition)
+                        src_row = next(src_iter, None)
+                        dest_row = next(dest_iter, None)
+                    elif dest_row is None or (src_row and src_key < dest_key):
+                        write_record({
+                            "primary_key": src_key,
+                            "type": "missing_in_dest",
+                            "column": None,
+                            "source_value": as_dict(src_row, schema),
+                            "dest_value": None,
+                            **no_hashes,
+                            "year": partition["year"],
+                            "month": partition["month"],
+                            "week": partition.get("week"),
+                        })
+                        src_row = next(src_iter, None)
+                    else:
+                        write_record({
+                            "primary_key": dest_key,
+                            "type": "extra_in_dest",
+                            "column": None,
+                            "source_value": None,
+                            "dest_value": as_dict(dest_row, schema),
+                            **no_hashes,
+                            "year": partition["year"],
+                            "month": partition["month"],
+                            "week": partition.get("week"),
+                        })
+                        dest_row = next(dest_iter, None)
 
             for result in compare_row_pairs(
                 row_pairs(),
                 workers=workers,
                 progress=pbar,
+                plan=plan,
+                schema=schema,
             ):
-                debug_log(f"Compare result: {result}", config, level="low")
+                debug_log("Compare result: %s", config, result, level="low")
                 src_key = result["primary_key"]
                 part = result.get("partition", {})
-                if result["mismatches"]:
+                # The vectorized serial engine yields one flat record per
+                # mismatching column instead of a per-row ``mismatches`` list.
+                diffs = result["mismatches"] if "mismatches" in result else [result]
+                if diffs:
                     if src_key not in seen_pks and len(sample) < 2:
-                        sample.append((src_key, result["mismatches"][0]))
+                        sample.append((src_key, diffs[0]))
                         seen_pks.add(src_key)
-                    for diff in result["mismatches"]:
+                    for diff in diffs:
                         write_record(
                             {
                                 "primary_key": src_key,
@@ -250,35 +811,213 @@ def process_partition(
 
             writer.flush()
 
-        partition_env = {
-            "PARTITION_YEAR": str(partition.get("year", "")),
-            "PARTITION_MONTH": str(partition.get("month", "")),
-            "PARTITION_WEEK": str(partition.get("week", "")),
-        }
+        if readers:
+            debug_log(
+                f"Streamed {src_rows.count} source rows and {dest_rows.count} destination rows",
+                config,
+                level="medium",
+            )
+            counts["source_rows"], counts["dest_rows"] = src_rows.count, dest_rows.count
+        release_reads()
+
+        if writes_table(config):
+            debug_log(f"Running fix_mismatches for partition {part_label}", config, level="low")
+            with limits.hold("destination_write"):
+                fix_mismatches(
+                    config,
+                    dry_run=False,
+                    pool=dest_pool,
+                    partitions=[partition],
+                    show_progress=False,
+                )
+        else:
+            debug_log(
+                f"Skipping fix_mismatches for {part_label}: discrepancies were written to files",
+                config,
+                level="low",
+            )
+        if cache is not None and counts["discrepancies"] and writes_table(config):
+            # The fix phase changed the destination; its snapshot is stale.
+            cache.invalidate(
+                cache_key(dest_env, dest_schema, dest_table, dest_cols, partition)
+            )
 
+        if run_state is not None:
+            run_state.finish(partition, **counts)
         debug_log(
-            f"Running fix_mismatches.py for partition: {partition_env}",
+            f"Partition {part_label} finished in {time.perf_counter() - part_start:.2f}s",
             config,
             level="low",
         )
+        return counts
+    except Exception as exc:
+        if run_state is not None:
+            run_state.fail(partition, exc)
+        raise
+    finally:
+        release_reads()
 
-        original_environ = os.environ.copy()
-        os.environ.update(partition_env)
 
-        sys.argv = ["fix_mismatches", "--apply"]
+def writes_table(config: dict) -> bool:
+    """Return ``True`` if discrepancies go to the SQL Server output table."""
+    return config.get("output", {}).get("format", "table") == "table"
 
-        fix_mismatches_main()
 
-        os.environ.clear()
-        os.environ.update(original_environ)
+@contextmanager
+def discrepancy_writer(
+    config: dict,
+    partition: dict,
+    *,
+    dest_pool,
+    dest_env: dict,
+    limits: ConcurrencyLimits,
+    output_schema: str,
+    output_table: str,
+    on_flush=None,
+    incremental: bool = False,
+):
+    """Yield the writer for *partition*'s discrepancy records.
 
-        debug_log(
-            f"Partition {part_label} finished in {time.perf_counter() - part_start:.2f}s",
-            config,
-            level="low",
+    ``output.format: table`` writes to SQL Server on its own destination
+    connection, holding a ``destination_write`` slot for each batch. The file formats
+    (``jsonl``, ``csv``, ``parquet``) write through
+    :func:`logic.sinks.open_sink` and never touch the destination.
+    """
+    output_cfg = config.get("output", {})
+    if not writes_table(config):
+        with open_sink(config, partition, on_flush=on_flush) as sink:
+            yield sink
+        return
+
+    writer_kwargs = {}
+    if output_cfg.get("async_writer", True):
+        # Batches are written by a dedicated thread on the write connection.
+        writer_cls = AsyncDiscrepancyWriter
+        writer_kwargs["max_pending"] = output_cfg.get("max_pending_batches", 2)
+    else:
+        writer_cls = DiscrepancyWriter
+    strategy = output_cfg.get("write_strategy", "merge")
+    if incremental:
+        # An incremental pass only sees changed keys, so it must not wipe
+        # the partition's earlier discrepancies.
+        strategy = "merge"
+    # The destination stream may still hold its connection, so the writer uses another one.
+    write_conn = (
+        dest_pool.connection()
+        if dest_pool is not None
+        else get_sqlserver_connection(dest_env, config)
+    )
+    with write_conn as dest_conn, writer_cls(
+        dest_conn,
+        output_schema,
+        output_table,
+        batch_size=output_cfg.get("batch_size", 1000),
+        on_flush=on_flush,
+        strategy=strategy,
+        partition=partition,
+        typed=output_cfg.get("typed", False),
+        # Held per batch so partitions keep comparing while another writes.
+        write_slot=partial(limits.hold, "destination_write"),
+        **writer_kwargs,
+    ) as writer:
+        yield writer
+
+
+def scheduler_limits(config: dict) -> tuple[int, ConcurrencyLimits]:
+    """Return the partition concurrency and per-database caps from ``scheduler``.
+
+    Pool sizes in the config are raised when they are too small for the caps
+    so a partition never waits for a connection while holding a slot.
+    """
+    sched = config.get("scheduler") or {}
+    max_partitions = max(1, int(sched.get("max_partitions", 1)))
+
+    def cap(key: str, default: int) -> int:
+        return min(int(sched.get(key) or default), max_partitions)
+
+    limits = ConcurrencyLimits({
+        "source_read": cap("source_reads", max_partitions),
+        "destination_read": cap("destination_reads", max_partitions),
+        "destination_write": cap("destination_writes", 1),
+    })
+    # A reading partition also keeps its discrepancy writer's connection
+    # open between batches.
+    needed = {
+        "source": limits.limits["source_read"],
+        "destination": 2 * limits.limits["destination_read"] + limits.limits["destination_write"],
+    }
+    for side, count in needed.items():
+        pool_cfg = config[side].get("pool") or {}
+        config[side]["pool"] = pool_cfg
+        if pool_cfg.get("max_size", 4) < count:
+            debug_log(
+                f"Raising {side} pool max_size to {count} for the scheduler limits",
+                config,
+                level="low",
+            )
+            pool_cfg["max_size"] = count
+    return max_partitions, limits
+
+
+def estimate_partition_sizes(partitions: list, config: dict, src_pool, fetch_kwargs: dict) -> list:
+    """Return a relative size per partition used to start large ones first.
+
+    ``scheduler.estimate: count`` counts each partition's source rows;
+    otherwise month-only partitions weigh more than weekly ones.
+    """
+    sched = config.get("scheduler") or {}
+    if sched.get("estimate", "heuristic") != "count":
+        return [estimate_partition_size(p) for p in partitions]
+    with src_pool.connection() as conn:
+        return [
+            count_partition_rows(conn, partition=p, **fetch_kwargs)
+            for p in partitions
+        ]
+
+
+def split_oversized_partitions(
+    partitions: list, config: dict, src_pool, fetch_kwargs: dict, run_state: RunState
+) -> list:
+    """Split partitions over ``partitioning.split_rows`` rows into PK ranges.
+
+    Rows are counted on the source and each oversized partition is cut into
+    ranges of about ``split_target_rows`` rows which are scheduled as
+    separate partitions. Split points are kept in *run_state* so a resumed
+    run reuses the ranges of the interrupted one.
+    """
+    part_cfg = config.get("partitioning", {})
+    threshold = part_cfg.get("split_rows")
+    if not threshold:
+        return partitions
+
+    with src_pool.connection() as conn:
+
+        def count_rows(partition: dict) -> int:
+            if run_state.boundaries(partition) is not None:
+                # Already split by the interrupted run; reuse its ranges.
+                return threshold + 1
+            return count_partition_rows(conn, partition=partition, **fetch_kwargs)
+
+        def boundaries(partition: dict, pieces: int) -> list:
+            saved = run_state.boundaries(partition)
+            if saved is not None:
+                return saved
+            bounds = fetch_pk_boundaries(conn, partition=partition, pieces=pieces, **fetch_kwargs)
+            run_state.set_boundaries(partition, bounds)
+            debug_log(
+                f"Splitting {format_partition(partition)} into {len(bounds) + 1} PK ranges",
+                config,
+                level="low",
+            )
+            return bounds
+
+        return split_large_partitions(
+            partitions,
+            count_rows,
+            boundaries,
+            threshold=int(threshold),
+            target_rows=int(part_cfg.get("split_target_rows", 1_000_000)),
         )
-    finally:
-        pass
 
 
 if __name__ == "__main__":
@@ -315,6 +1054,20 @@ def main():
         "--record",
         help="process only the record with this primary key value",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip partitions completed by the previous run and redo interrupted ones",
+    )
+    parser.add_argument(
+        "--state-file",
+        help="run state file used for --resume (default: state_file in the config)",
+    )
+    parser.add_argument(
+        "--invalidate-cache",
+        action="store_true",
+        help="drop cached snapshots of the configured tables before running",
+    )
     args = parser.parse_args()
 
     config = load_config(args.config)
@@ -326,6 +1079,11 @@ def main():
         config["output_mismatches"] = True
     if args.record:
         config["record_pk"] = args.record
+    configure_logging(
+        config.get("log_file"),
+        max_bytes=(config["log_max_mb"] * 1024 * 1024) if config.get("log_max_mb") else None,
+        backups=config.get("log_backups"),
+    )
 
     run_start_dt = datetime.now()
     run_start = time.perf_counter()
@@ -364,13 +1122,63 @@ def main():
     dest_dialect = config["destination"].get("type", "sqlserver").lower()
     use_row_hash = config.get("comparison", {}).get("use_row_hash", False)
 
+    max_partitions, limits = scheduler_limits(config)
+    # One pool per database, shared by every partition of the run.
+    cache = SnapshotCache.from_config(config)
+    if cache is not None and args.invalidate_cache:
+        removed = cache.invalidate(table=src_table) + cache.invalidate(table=dest_table)
+        debug_log(f"Invalidated {removed} cached snapshots", config, level="low")
+    src_pool = create_oracle_pool(src_env, config)
+    dest_pool = create_sqlserver_pool(dest_env, config)
+
     try:
         sample: list[tuple[Any, dict]] = []
         seen_pks: set[Any] = set()
+        plans: dict = {}
         workers = comparison_cfg.get("workers", 4)
         partitions = list(get_partitions(config))
+        run_state = RunState.open(
+            args.state_file or config.get("state_file", "reconcile_state.json"),
+            config,
+            resume=args.resume,
+        )
+        count_kwargs = {
+            "schema": src_schema,
+            "table": src_table,
+            "columns": src_cols,
+            "primary_key": primary_key,
+            "year_column": year_column,
+            "month_column": month_column,
+            "dialect": src_dialect,
+            "week_column": week_column,
+            "config": config,
+        }
+        partitions = split_oversized_partitions(
+            partitions, config, src_pool, count_kwargs, run_state
+        )
+        if args.resume:
+            remaining = [p for p in partitions if not run_state.is_done(p)]
+            debug_log(
+                f"Resuming: {len(partitions) - len(remaining)} of {len(partitions)} "
+                f"partitions already done",
+                config,
+                level="low",
+            )
+            partitions = remaining
 
-        with tqdm(desc="mismatches found", unit="row") as pbar:
+        watermark = None
+        if comparison_cfg.get("incremental"):
+            watermark = run_state.watermark()
+            if watermark is None:
+                debug_log("No watermark yet; comparing full partitions", config, level="low")
+            else:
+                # Overlap absorbs clock skew and transactions committed late.
+                watermark -= timedelta(
+                    minutes=comparison_cfg.get("incremental_overlap_minutes", 10)
+                )
+                debug_log(f"Comparing rows modified after {watermark}", config, level="low")
+
+        with RunProgress(len(partitions)) as pbar:
             tasks = []
             for idx, part in enumerate(partitions):
                 tasks.append(
@@ -398,12 +1206,45 @@ def main():
                         "use_row_hash": use_row_hash,
                         "sample": sample,
                         "seen_pks": seen_pks,
+                        "plans": plans,
+                        "src_pool": src_pool,
+                        "dest_pool": dest_pool,
+                        "limits": limits,
+                        "run_state": run_state,
+                        "watermark": watermark,
+                        "cache": cache,
                     }
                 )
 
-            debug_log(f"Processing partitions sequentially", config, level="medium")
-            for task in tasks:
-                process_partition(**task)
+            sched = config.get("scheduler") or {}
+            sizes = None
+            if sched.get("order", "size") == "size":
+                sizes = estimate_partition_sizes(partitions, config, src_pool, count_kwargs)
+
+            def run_task(task: dict) -> None:
+                pbar.start(task["partition"])
+                try:
+                    process_partition(**task)
+                finally:
+                    pbar.finish(task["partition"])
+
+            debug_log(
+                f"Processing {len(tasks)} partitions, {max_partitions} at a time, "
+                f"limits {limits.limits}",
+                config,
+                level="medium",
+            )
+            run_scheduled(
+                tasks,
+                run_task,
+                max_workers=max_partitions,
+                stagger_seconds=sched.get("stagger_seconds", 0),
+                sizes=sizes,
+            )
+
+        # Only runs covering every row advance the incremental watermark.
+        if not config.get("limit") and not config.get("record_pk"):
+            run_state.complete()
 
         for pk, diff in sample:
             debug_log(
@@ -424,6 +1265,9 @@ def main():
     except Exception as exc:  # pragma: no cover - runtime failure
         debug_log(f"Reconciliation failed: {exc}", config, level="low")
         raise
+    finally:
+        src_pool.close()
+        dest_pool.close()
 
 
 if __name__ == "__main__":
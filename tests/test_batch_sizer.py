@@ -0,0 +1,35 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.batch_sizer import BatchSizer, estimate_row_bytes
+
+
+def test_start_size_follows_row_width():
+    narrow = [("id", int, None, 8, 10, 0, False)]
+    wide = narrow + [("blob", str, None, 4000, None, None, True)] * 20
+    assert estimate_row_bytes(wide) > estimate_row_bytes(narrow)
+    assert BatchSizer().start(narrow) > BatchSizer().start(wide) >= 100
+    assert BatchSizer(initial_rows=250).start(wide) == 250
+
+
+def test_observe_grows_on_fast_trips_and_shrinks_on_slow_ones():
+    sizer = BatchSizer(initial_rows=1000, max_rows=5000, memory_budget_mb=1024)
+    sizer.start([("id", int, None, 8, 10, 0, False)])
+    full = [(1,)] * 1000
+    assert sizer.observe(full, 0.01) == 2000
+    assert sizer.observe([(1,)] * 2000, 0.01) == 4000
+    assert sizer.observe([(1,)] * 4000, 0.01) == 5000
+    assert sizer.observe([(1,)] * 5000, 5.0) == 2500
+    # a short final batch does not grow the size
+    assert sizer.observe([(1,)] * 10, 0.001) == 2500
+
+
+def test_memory_budget_caps_batch():
+    sizer = BatchSizer(initial_rows=1000, memory_budget_mb=0.1, min_rows=10)
+    sizer.start(None)
+    row = ("x" * 1000,)
+    assert sizer.observe([row] * 1000, 0.01) < 1000
+
+
+def test_from_config_disabled():
+    assert BatchSizer.from_config({"adaptive": False}) is None
+    assert BatchSizer.from_config({"batch_size": 300, "min_rows": 50}).size == 300
@@ -3,6 +3,8 @@ from logic.comparator import (
     compare_rows,
     compute_row_hash,
     compare_row_pairs,
+    compare_row_pairs_serial,
+    compare_row_pairs_parallel_detailed,
     discard_matching_rows_by_hash,
 )
 from decimal import Decimal
@@ -76,8 +78,33 @@ def test_compare_row_pairs_dataframe():
             "column": "col",
             "source_value": "b",
             "dest_value": "c",
+            "source_hash": results[0]["source_hash"],
+            "dest_hash": results[0]["dest_hash"],
         }
     ]
+    # The parallel engine reports the same hashes.
+    parallel_config = {**config, "comparison": {"use_row_hash": True, "parallel": True}}
+    parallel = list(compare_row_pairs(
+        [(s, d, columns, parallel_config) for s, d, *_ in pairs], workers=2
+    ))
+    assert parallel[0]["mismatches"][0]["source_hash"] == results[0]["source_hash"]
+    assert parallel[0]["mismatches"][0]["dest_hash"] == results[0]["dest_hash"]
+
+
+def test_compare_row_pairs_serial_progress_counts_pairs():
+    class Progress:
+        total = None
+        n = 0
+
+        def update(self, n):
+            self.n += n
+
+    progress = Progress()
+    columns = {"id": "id", "col": "col"}
+    config = {"primary_key": "id"}
+    pairs = [({"id": i, "col": "a"}, {"id": i, "col": "a"}, columns, config) for i in range(5)]
+    assert list(compare_row_pairs(pairs, progress=progress)) == []
+    assert progress.n == 5
 
 
 def test_compare_row_pairs_only_columns():
@@ -154,3 +181,107 @@ def test_discard_matching_rows_by_hash():
     assert len(filtered_src) == len(filtered_dest) == 500
     assert filtered_src[0]["id"] == 500
     assert filtered_dest[0]["id"] == 500
+
+
+def test_compare_row_pairs_serial_vectorized_blocks():
+    columns = {"id": "id", "amount": "amount", "day": "day", "name": "name"}
+    config = {"primary_key": "id", "comparison": {"include_nulls": False}}
+    pairs = [
+        (
+            {"id": i, "amount": Decimal(i), "day": "2021-01-01 00:00:00", "name": f" n{i}"},
+            {"id": i, "amount": float(i) + 1e-7, "day": "2021-01-01", "name": f"n{i}"},
+            columns,
+            config,
+        )
+        for i in range(10)
+    ]
+    # numeric mismatch, null skipped, non-ISO date resolved by the fallback
+    pairs[3][1]["amount"] = 99
+    pairs[4][1]["name"] = None
+    pairs[5][1]["day"] = "Jan 1 2021"
+    pairs[6][1]["day"] = "2021-01-02"
+    results = list(compare_row_pairs_serial(pairs, block_size=4))
+    assert [(r["primary_key"], r["column"]) for r in results] == [
+        (3, "amount"),
+        (6, "day"),
+    ]
+    assert results[0]["source_value"] == 3.0
+    assert results[0]["dest_value"] == 99.0
+
+
+def test_compare_row_pairs_parallel_detailed_ordered_batches():
+    columns = {"id": "id", "col": "col"}
+    config = {"primary_key": "id", "comparison": {}}
+    pairs = [
+        ({"id": i, "col": "a"}, {"id": i, "col": "a" if i % 3 else "b"}, columns, config)
+        for i in range(50)
+    ]
+    for mode in ("thread", "process"):
+        results = list(
+            compare_row_pairs_parallel_detailed(
+                iter(pairs),
+                workers=2,
+                parallel_mode=mode,
+                batch_size=4,
+                max_in_flight=2,
+            )
+        )
+        assert [r["primary_key"] for r in results] == list(range(0, 50, 3))
+
+
+def test_discard_matching_rows_by_hash_merges_in_place():
+    src_rows = [{"id": i, "val": i} for i in (1, 2, 3, 5, 7)]
+    dest_rows = [{"id": i, "val": i if i != 3 else 0} for i in (0, 2, 3, 5, 6)]
+    stats: dict = {}
+
+    filtered_src, filtered_dest, discarded, kept = discard_matching_rows_by_hash(
+        src_rows, dest_rows, "id", workers=1, chunk_size=1, stats=stats
+    )
+
+    assert filtered_src is src_rows and filtered_dest is dest_rows
+    assert [r["id"] for r in src_rows] == [1, 3, 7]
+    assert [r["id"] for r in dest_rows] == [0, 3, 6]
+    assert (discarded, kept) == (2, 1)
+    assert stats == {"pairs": 3, "discarded": 2, "kept": 1, "source_only": 2, "dest_only": 2}
+
+
+def test_compare_row_pairs_tuple_rows_match_dict_rows():
+    from logic.row_schema import RowSchema
+
+    columns = {"id": "id", "amount": "amount", "name": "name"}
+    schema = RowSchema(columns)
+    src = [(1, Decimal("1.0"), "a"), (2, Decimal("2.5"), "b"), (3, None, "c")]
+    dest = [(1, 1.0, "a"), (2, 2.0, "b"), (3, 3.0, "x")]
+    for comparison in (
+        {"include_nulls": True},
+        {"include_nulls": True, "parallel": True, "parallel_mode": "thread", "use_row_hash": True},
+        {"include_nulls": True, "parallel": True, "parallel_mode": "process"},
+    ):
+        config = {"primary_key": "id", "comparison": comparison}
+        tuple_pairs = [(s, d, columns, config) for s, d in zip(src, dest)]
+        dict_pairs = [
+            (schema.to_dict(s), schema.to_dict(d), columns, config) for s, d in zip(src, dest)
+        ]
+        assert list(compare_row_pairs(tuple_pairs, workers=2, schema=schema)) == list(
+            compare_row_pairs(dict_pairs, workers=2)
+        )
+
+
+def test_batch_mode_passes_parallel_settings(monkeypatch):
+    import logic.comparator as comparator
+
+    seen = {}
+
+    def fake_detailed(pairs, **kwargs):
+        seen.update(kwargs)
+        return iter(())
+
+    monkeypatch.setattr(comparator, "compare_row_pairs_parallel_detailed", fake_detailed)
+    columns = {"id": "id", "col": "col"}
+    config = {"primary_key": "id", "comparison": {
+        "parallel": True, "parallel_mode": "batch", "task_batch_size": 7,
+        "max_in_flight": 3, "shared_memory": False,
+    }}
+    pairs = [({"id": 1, "col": "a"}, {"id": 1, "col": "b"}, columns, config)]
+    assert list(compare_row_pairs(pairs, workers=2)) == []
+    assert (seen["batch_size"], seen["max_in_flight"], seen["shared_memory"]) == (7, 3, False)
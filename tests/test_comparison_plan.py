@@ -0,0 +1,83 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import date, datetime
+from decimal import Decimal
+
+from logic.comparison_plan import (
+    AUTO,
+    DATE,
+    DATETIME,
+    NUMERIC,
+    STRING,
+    build_plan_from_description,
+    build_plan_from_rows,
+)
+from logic.comparator import compare_row_pair_by_pk, compute_row_hash
+
+
+class FakeDbType:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_build_plan_from_rows_infers_kinds():
+    rows = [
+        {"id": 1, "amount": Decimal("1.50"), "name": "a", "day": "2021-01-01", "empty": None},
+        {"id": 2, "amount": "2.0", "name": "b", "day": date(2021, 1, 2), "empty": None},
+    ]
+    plan = build_plan_from_rows(rows, ["id", "amount", "name", "day", "empty"])
+    assert plan.kinds == {
+        "id": NUMERIC,
+        "amount": NUMERIC,
+        "name": STRING,
+        "day": DATE,
+        "empty": AUTO,
+    }
+
+
+def test_build_plan_from_description_handles_both_drivers():
+    pyodbc_desc = [("id", int), ("created", datetime), ("name", str)]
+    oracle_desc = [
+        ("ID", FakeDbType("DB_TYPE_NUMBER")),
+        ("CREATED", FakeDbType("DB_TYPE_DATE")),
+        ("NAME", FakeDbType("DB_TYPE_VARCHAR")),
+    ]
+    cols = ["id", "created", "name"]
+    plan = build_plan_from_description(oracle_desc, cols)
+    assert plan == build_plan_from_description(pyodbc_desc, cols)
+    assert plan.kinds == {"id": NUMERIC, "created": DATETIME, "name": STRING}
+
+
+def test_build_plan_from_description_records_sizes():
+    oracle_desc = [
+        ("NAME", FakeDbType("DB_TYPE_NVARCHAR"), 50, 100, None, None, True),
+        ("NOTES", FakeDbType("DB_TYPE_CLOB"), None, None, None, None, True),
+    ]
+    pyodbc_desc = [
+        ("name", str, None, 50, 50, 0, True),
+        ("notes", str, None, 0, 0, 0, True),
+    ]
+    cols = ["name", "notes"]
+    assert build_plan_from_description(oracle_desc, cols).sizes == {"name": 50, "notes": None}
+    assert build_plan_from_description(pyodbc_desc, cols).sizes == {"name": 50, "notes": None}
+    assert build_plan_from_description([("name", str)], ["name"]).sizes == {}
+
+
+def test_plan_normalizers_do_not_probe_strings():
+    plan = build_plan_from_rows([{"code": "abc"}], ["code"])
+    # A string column keeps numeric-looking values as text.
+    assert plan.normalize("code", " 001 ") == "001"
+    assert not plan.values_equal("code", "001", "1")
+
+
+def test_compare_row_pair_by_pk_uses_plan():
+    plan = build_plan_from_rows([{"id": 1, "amount": 1.0, "day": "2021-01-01"}], ["id", "amount", "day"])
+    config = {"primary_key": "id", "comparison": {"use_row_hash": True}}
+    src = {"id": 1, "amount": Decimal("10.000001"), "day": datetime(2021, 1, 1, 5, 0)}
+    dest = {"id": 1, "amount": "10", "day": "2021-01-01 00:00:00.0000000"}
+    assert compute_row_hash(src, plan) == compute_row_hash(dest, plan)
+    assert compare_row_pair_by_pk(src, dest, ["amount", "day"], config, plan=plan) is None
+
+    dest["amount"] = "11"
+    result = compare_row_pair_by_pk(src, dest, ["amount", "day"], config, plan=plan)
+    assert result["primary_key"] == 1
+    assert [m["column"] for m in result["mismatches"]] == ["amount"]
@@ -1,7 +1,18 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from runners.reconcile import fetch_rows
+from logic.comparison_plan import ComparisonPlan
+from runners.reconcile import (
+    _partition_filter,
+    diff_incremental_keys,
+    diff_row_hashes,
+    fetch_rows,
+    fetch_pks,
+    fetch_rows_by_pk,
+    hash_column_widths,
+    pk_bucket_expression,
+    row_hash_expression,
+)
 
 class DummyCursor:
     def __init__(self, rows=None):
@@ -140,3 +151,179 @@ def test_fetch_rows_pk_value_oracle():
         )
     )
     assert conn.cursor_obj.executed == ("2021", "1", "99")
+
+
+def test_partition_filter_pk_range():
+    columns = {"id": "ID", "year": "yr", "month": "mon"}
+    partition = {"year": 2021, "month": 1, "pk_range": (100, 200)}
+    where, params = _partition_filter("oracle", columns, partition, "id", "yr", "mon")
+    assert where.endswith("ID >= :3 AND ID < :4")
+    assert params == ["2021", "1", 100, 200]
+
+    partition["pk_range"] = (None, 50)
+    where, params = _partition_filter("sqlserver", columns, partition, "id", "yr", "mon")
+    assert where.endswith("ID < ?") and ">=" not in where
+    assert params == ["2021", "1", 50]
+
+
+def test_fetch_rows_pk_values_in_list():
+    conn = DummyConn()
+    columns = {"id": "id", "year": "yr", "month": "mon"}
+    partition = {"year": 2021, "month": 1}
+    list(
+        fetch_rows_by_pk(
+            conn,
+            "dbo",
+            "t",
+            columns,
+            partition,
+            "id",
+            "yr",
+            "mon",
+            [1, 2, 3],
+            chunk_size=2,
+            dialect="oracle",
+        )
+    )
+    # the last chunk is the one left on the cursor
+    assert conn.cursor_obj.executed == ("2021", "1", 3)
+
+
+def test_row_hash_expression_dialects():
+    plan = ComparisonPlan({"id": "numeric", "name": "string", "day": "date"})
+    columns = {"id": "ID", "name": "NAME", "day": "DAY"}
+    oracle = row_hash_expression(columns, plan, "oracle")
+    sqlserver = row_hash_expression(columns, plan, "sqlserver", algorithm="sha256")
+    assert oracle.startswith("STANDARD_HASH(") and "'MD5'" in oracle
+    assert "CHR(31)" in oracle and "TO_CHAR(DAY, 'YYYY-MM-DD')" in oracle
+    assert sqlserver.startswith("HASHBYTES('SHA2_256'")
+    assert "CHAR(31)" in sqlserver and "CONVERT(CHAR(10), DAY, 23)" in sqlserver
+
+
+def test_row_hash_expression_groups_by_width():
+    columns = {f"c{i}": f"C{i}" for i in range(5)}
+    plan = ComparisonPlan({c: "string" for c in columns})
+    # 101 characters with the separator: four columns per 500 character group
+    expr = row_hash_expression(columns, plan, "sqlserver", widths={c: 100 for c in columns})
+    assert expr.count("HASHBYTES(") == 3
+    # unknown widths hash every column on its own
+    expr = row_hash_expression(columns, plan, "sqlserver")
+    assert expr.count("HASHBYTES(") == 6
+
+
+def test_row_hash_expression_slices_wide_and_skips_lob_columns():
+    columns = {"id": "ID", "body": "BODY", "doc": "DOC"}
+    plan = ComparisonPlan({"id": "numeric", "body": "string", "doc": "string"})
+    widths = {"id": 41, "body": 1200, "doc": None}
+    for dialect, substr in (("oracle", "SUBSTR(TRIM(BODY)"), ("sqlserver", "SUBSTRING(")):
+        expr = row_hash_expression(columns, plan, dialect, widths=widths)
+        assert expr.count(substr) == 3  # 499 character slices
+        assert "DOC" not in expr
+
+
+def test_row_hash_expression_hashes_utf16_with_null_marker():
+    columns = {"id": "ID", "name": "NAME"}
+    plan = ComparisonPlan({"id": "numeric", "name": "string"})
+    oracle = row_hash_expression(columns, plan, "oracle")
+    sqlserver = row_hash_expression(columns, plan, "sqlserver")
+    # Non-ASCII text such as "Zoë" must reach both hashes as UTF-16LE bytes.
+    assert "UTL_I18N.STRING_TO_RAW(" in oracle and "'AL16UTF16LE'" in oracle
+    assert "TO_NCHAR(TRIM(NAME))" in oracle and "TO_CHAR(NAME)" not in oracle
+    assert "CAST(NAME AS NVARCHAR(MAX))" in sqlserver
+    assert "AS VARCHAR(MAX)" not in sqlserver
+    for expr in (oracle, sqlserver):
+        assert "'NULL'" not in expr
+    assert "NVL(TO_NCHAR(" in oracle and "NCHR(0)" in oracle
+    assert "NCHAR(0)" in sqlserver
+    bucket = pk_bucket_expression("NAME", "string", "oracle")
+    assert "'AL16UTF16LE'" in bucket and "'NULL'" not in bucket
+
+
+def test_hash_column_widths_combines_both_sides():
+    plan = ComparisonPlan({"id": "numeric", "name": "string", "day": "date", "doc": "string"})
+    source = ComparisonPlan(
+        {"id": "numeric", "name": "string", "day": "datetime", "doc": "string"},
+        {"id": 22, "name": 40, "day": None, "doc": None},
+    )
+    dest = ComparisonPlan(
+        {"id": "string", "name": "string", "day": "string", "doc": "string"},
+        {"id": 60, "name": 50, "day": 10, "doc": 4000},
+    )
+    widths = hash_column_widths(list(plan.kinds) + ["extra"], plan, source, dest)
+    assert widths == {"id": 60, "name": 50, "day": 10, "doc": None}
+    assert hash_column_widths(["id"], plan, source, None) == {}
+
+
+def test_diff_row_hashes():
+    src = [(1, b"a"), (2, b"b"), (3, b"c")]
+    dest = [(2, b"b"), (3, b"x"), (4, b"d")]
+    pks, stats = diff_row_hashes(src, dest)
+    assert pks == [1, 3, 4]
+    assert stats == {"matched": 1, "changed": 1, "source_only": 1, "dest_only": 1}
+
+
+def test_fetch_rows_tuple_mode_yields_driver_rows():
+    from logic.row_schema import RowSchema
+
+    rows = [(1, 2021, 1), (2, 2021, 1)]
+    conn = DummyConn(rows)
+    columns = {"id": "id", "year": "yr", "month": "mon"}
+    partition = {"year": 2021, "month": 1}
+    fetched = list(
+        fetch_rows(conn, "dbo", "t", columns, partition, "id", "yr", "mon", row_mode="tuple")
+    )
+    assert fetched == rows
+    assert RowSchema(columns).to_dict(fetched[1]) == {"id": 2, "year": 2021, "month": 1}
+
+
+def test_fetch_rows_sets_array_and_prefetch_sizes_before_execute():
+    conn = DummyConn([(1, 2021, 1)])
+    columns = {"id": "id", "year": "yr", "month": "mon"}
+    list(
+        fetch_rows(
+            conn, "s", "t", columns, {"year": 2021, "month": 1}, "id", "yr", "mon",
+            batch_size=500, dialect="oracle",
+        )
+    )
+    assert conn.cursor_obj.arraysize == 500
+    assert conn.cursor_obj.prefetchrows == 501
+
+
+def test_fetch_rows_adaptive_batches_return_every_row():
+    rows = [(i, 2021, 1) for i in range(50)]
+    conn = DummyConn(rows)
+    columns = {"id": "id", "year": "yr", "month": "mon"}
+    fetched = list(
+        fetch_rows(
+            conn, "dbo", "t", columns, {"year": 2021, "month": 1}, "id", "yr", "mon",
+            fetch_options={"batch_size": 2, "min_rows": 1, "target_seconds": 10},
+        )
+    )
+    assert [r["id"] for r in fetched] == list(range(50))
+    # fast round trips doubled the batch after each full fetch
+    assert conn.cursor_obj.arraysize > 2
+
+
+def test_fetch_pks_modified_since():
+    conn = DummyConn(rows=[(1,), (5,)])
+    columns = {"id": "ID", "year": "yr", "month": "mon", "val": "VAL"}
+    pks = fetch_pks(
+        conn,
+        "dbo",
+        "t",
+        columns,
+        {"year": 2021, "month": 1},
+        "id",
+        "yr",
+        "mon",
+        dialect="oracle",
+        modified_since=("LAST_MODIFIED", "2024-01-01"),
+    )
+    assert pks == [1, 5]
+    assert conn.cursor_obj.executed == ("2021", "1", "2024-01-01")
+
+
+def test_diff_incremental_keys_finds_changes_and_deletes():
+    pks, stats = diff_incremental_keys([3], [7], [1, 2, 3, 4], [1, 3, 5, 7])
+    assert pks == [2, 3, 4, 5, 7]
+    assert stats == {"changed": 2, "source_only": 2, "dest_only": 2, "compared": 5}
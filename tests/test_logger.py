@@ -0,0 +1,37 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import logger
+
+
+def test_debug_log_is_lazy_and_rotates(tmp_path):
+    path = tmp_path / "debug.log"
+    original = (logger.LOG_FILE, logger.LOG_MAX_BYTES, logger.LOG_BACKUPS)
+    logger.configure_logging(str(path), max_bytes=64, backups=2)
+    try:
+        config = {"debug": "medium"}
+        calls = []
+
+        def expensive():
+            calls.append(1)
+            return "built"
+
+        logger.debug_log(expensive, config, level="high")
+        assert calls == []
+        assert not logger.log_enabled("high", config)
+
+        logger.debug_log(expensive, config, level="medium")
+        logger.debug_log("row %s of %s", config, 1, 2, level="low")
+        for i in range(20):
+            logger.debug_log("line %d", config, i, level="low")
+        logger.flush_logs()
+
+        assert calls == [1]
+        assert (tmp_path / "debug.log.1").exists()
+        assert not (tmp_path / "debug.log.3").exists()
+        rotated = (tmp_path / "debug.log.2").read_text() + (tmp_path / "debug.log.1").read_text()
+        assert "line 19\n" in rotated + path.read_text()
+
+        config["debug"] = "high"
+        assert logger.log_enabled("high", config)
+    finally:
+        logger.configure_logging(original[0], max_bytes=original[1], backups=original[2])
@@ -1,5 +1,11 @@
 import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from logic.partitioner import get_partitions
+from logic.partitioner import (
+    drill_down_checksums,
+    get_partitions,
+    split_large_partitions,
+    split_pk_ranges,
+)
+from utils import format_partition
 
 
 def test_get_partitions_month_only():
@@ -33,3 +39,71 @@ def test_get_partitions_with_weeks():
         {"year": "2022", "month": "05", "week": "1"},
         {"year": "2022", "month": "05", "week": "2"},
     ]
+
+
+def _fake_checksums(rows):
+    """Return a fetcher grouping ``{pk_bucket: row_hash}`` like the SQL query."""
+
+    def fetch(modulus, parent):
+        result = {}
+        for pkw, h in rows.items():
+            if parent and pkw % parent[0] not in parent[1]:
+                continue
+            count, s1, s2 = result.get(pkw % modulus, (0, 0, 0))
+            result[pkw % modulus] = (count + 1, s1 + h, s2 + 2 * h)
+        return result
+
+    return fetch
+
+
+def test_drill_down_checksums_identical_single_round_trip():
+    rows = {i: i * 7 for i in range(100)}
+    modulus, buckets, stats = drill_down_checksums(
+        _fake_checksums(rows), _fake_checksums(dict(rows))
+    )
+    assert buckets == []
+    assert modulus == 1
+    assert stats["levels"] == 1
+
+
+def test_drill_down_checksums_narrows_to_changed_bucket():
+    src = {i: i * 7 for i in range(1000)}
+    dest = dict(src)
+    dest[123] = 0
+    del dest[456]
+    modulus, buckets, _ = drill_down_checksums(
+        _fake_checksums(src), _fake_checksums(dest), fanout=4, leaf_size=10
+    )
+    assert modulus > 1
+    assert sorted(buckets) == sorted({123 % modulus, 456 % modulus})
+    assert all(sum(1 for k in src if k % modulus == b) <= 10 for b in buckets)
+
+
+def test_split_pk_ranges_cover_all_keys():
+    parts = split_pk_ranges({"year": "2024", "month": "05"}, [30, 10, 20])
+    assert [p["pk_range"] for p in parts] == [(None, 10), (10, 20), (20, 30), (30, None)]
+    assert [p["range"] for p in parts] == [1, 2, 3, 4]
+    assert all(p["ranges"] == 4 and p["month"] == "05" for p in parts)
+    assert format_partition(parts[1]) == "2024-05-R2"
+
+
+def test_split_large_partitions_only_splits_oversized():
+    small = {"year": "2024", "month": "05", "week": "1"}
+    large = {"year": "2024", "month": "06"}
+    counts = {"1": 50, None: 2500}
+    requested = []
+
+    def boundaries(partition, pieces):
+        requested.append(pieces)
+        return [100 * i for i in range(1, pieces)]
+
+    parts = split_large_partitions(
+        [small, large],
+        lambda p: counts[p.get("week")],
+        boundaries,
+        threshold=1000,
+        target_rows=1000,
+    )
+    assert parts[0] is small
+    assert requested == [3]
+    assert [p["pk_range"] for p in parts[1:]] == [(None, 100), (100, 200), (200, None)]
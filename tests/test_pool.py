@@ -0,0 +1,84 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+
+import pytest
+
+from connectors.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConn:
+    def __init__(self, n):
+        self.n = n
+        self.closed = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def factory():
+        conn = FakeConn(len(created))
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(factory, **kwargs), created
+
+
+def test_pool_reuses_released_connections():
+    pool, created = make_pool(max_size=2)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert len(created) == 1
+    assert first.rollbacks == 1
+
+
+def test_pool_bounds_open_connections():
+    pool, created = make_pool(max_size=1)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.05)
+
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=5)))
+    waiter.start()
+    pool.release(conn)
+    waiter.join()
+    assert got == [conn]
+    assert len(created) == 1
+
+
+def test_pool_replaces_unhealthy_connections():
+    pool, created = make_pool(max_size=2, health_check=lambda c: c.n > 0, check_after=0)
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+    assert second is not first
+    assert first.closed
+    assert len(created) == 2
+
+
+def test_connection_context_commits_or_discards():
+    pool, created = make_pool(max_size=2)
+    with pool.connection() as conn:
+        pass
+    assert conn.commits == 1 and not conn.closed
+
+    with pytest.raises(ValueError):
+        with pool.connection() as again:
+            raise ValueError("boom")
+    assert again is conn and again.closed
+
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
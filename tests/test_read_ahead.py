@@ -0,0 +1,59 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+
+import pytest
+
+from utils.read_ahead import ReadAhead
+
+
+def test_read_ahead_preserves_order_and_peek():
+    reader = ReadAhead(iter(range(25)), max_batches=2, batch_size=4)
+    assert reader.peek(6) == [0, 1, 2, 3, 4, 5]
+    assert list(reader) == list(range(25))
+    assert reader.count == 25
+    reader.close()
+
+
+def test_read_ahead_bounded_buffer():
+    produced = []
+
+    def rows():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    with ReadAhead(rows(), max_batches=2, batch_size=10) as reader:
+        assert next(reader) == 0
+        # the producer blocks once the queue is full
+        time.sleep(0.2)
+        assert len(produced) <= 50
+
+
+def test_read_ahead_propagates_errors():
+    def rows():
+        yield 1
+        raise RuntimeError("boom")
+
+    reader = ReadAhead(rows(), batch_size=1)
+    assert next(reader) == 1
+    with pytest.raises(RuntimeError):
+        next(reader)
+    reader.close()
+
+
+def test_read_ahead_close_waits_for_producer_and_closes_source():
+    closed = []
+
+    def rows():
+        try:
+            for i in range(1000):
+                time.sleep(0.001)
+                yield i
+        finally:
+            closed.append(True)
+
+    reader = ReadAhead(rows(), max_batches=1, batch_size=5)
+    assert next(reader) == 0
+    reader.close()
+    assert not reader._thread.is_alive()
+    assert closed == [True]
@@ -1,20 +1,31 @@
 import types
-from logic.reporter import DiscrepancyWriter
+import threading
+
+import pytest
+
+from logic.reporter import (
+    AsyncDiscrepancyWriter,
+    DiscrepancyWriter,
+    clear_partition_output,
+    encode_record,
+)
 
 class DummyConn:
     def __init__(self):
-        self.cursor_obj = types.SimpleNamespace(executed=[], rowcount=0)
+        self.cursor_obj = types.SimpleNamespace(executed=[], rowcount=0, batches=[])
+        self.commits = 0
     def cursor(self):
         def execute(sql, *params):
             self.cursor_obj.executed.append(sql)
         def executemany(sql, vals):
             self.cursor_obj.executed.append(sql)
+            self.cursor_obj.batches.append(vals)
             self.cursor_obj.rowcount += len(vals)
         self.cursor_obj.execute = execute
         self.cursor_obj.executemany = executemany
         return self.cursor_obj
     def commit(self):
-        pass
+        self.commits += 1
 
 
 def test_discrepancy_writer_context_manager():
@@ -24,3 +35,189 @@ def test_discrepancy_writer_context_manager():
         writer.write({"a": "2"})
     # ensure flush was called and table created
     assert conn.cursor().executed
+
+
+def test_discrepancy_writer_reports_flushed_records():
+    conn = DummyConn()
+    flushed = []
+    with DiscrepancyWriter(conn, "dbo", "t", batch_size=2, on_flush=flushed.append) as writer:
+        for i in range(3):
+            writer.write({"a": str(i)})
+    assert flushed == [2, 3]
+    assert writer.flushed == 3
+
+
+def test_clear_partition_output_filters_week():
+    conn = DummyConn()
+    conn.cursor_obj.rowcount = 4
+    assert clear_partition_output(conn, "recon", "d", {"year": "2024", "month": "05"}) == 4
+    sql = conn.cursor_obj.executed[-1]
+    assert "DELETE FROM recon.d" in sql and "[week] IS NULL" in sql
+
+
+def test_async_writer_writes_all_batches_in_background():
+    conn = DummyConn()
+    flushed = []
+    with AsyncDiscrepancyWriter(conn, "dbo", "t", batch_size=2, on_flush=flushed.append) as writer:
+        for i in range(5):
+            writer.write({"a": str(i)})
+    assert flushed == [2, 4, 5]
+    assert writer.flushed == 5
+
+
+def test_async_writer_applies_backpressure():
+    release = threading.Event()
+    conn = DummyConn()
+    calls = []
+
+    def slow_flush(n):
+        calls.append(n)
+        release.wait(5)
+
+    writer = AsyncDiscrepancyWriter(conn, "dbo", "t", batch_size=1, on_flush=slow_flush, max_pending=1)
+    writer.write({"a": "1"})  # taken by the writer thread, which then blocks
+    writer.write({"a": "2"})  # waits in the queue
+    done = threading.Event()
+
+    def produce():
+        writer.write({"a": "3"})  # queue full: blocks until the thread frees it
+        done.set()
+
+    threading.Thread(target=produce).start()
+    assert not done.wait(0.1)
+    release.set()
+    assert done.wait(5)
+    writer.close()
+    assert calls == [1, 2, 3]
+
+
+def test_async_writer_propagates_errors():
+    class FailingConn(DummyConn):
+        def commit(self):
+            raise RuntimeError("merge failed")
+
+    writer = AsyncDiscrepancyWriter(FailingConn(), "dbo", "t", batch_size=1)
+    writer.write({"a": "1"})
+    with pytest.raises(RuntimeError, match="merge failed"):
+        writer.flush()
+    with pytest.raises(RuntimeError):
+        writer.write({"a": "2"})
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_discrepancy_writer_reuses_staging_table():
+    conn = DummyConn()
+    with DiscrepancyWriter(conn, "dbo", "t", batch_size=1) as writer:
+        writer.write({"primary_key": "1", "column": "a"})
+        writer.write({"primary_key": "2", "column": "a"})
+    executed = conn.cursor_obj.executed
+    assert sum(sql.startswith("CREATE TABLE #temp_discrepancies") for sql in executed) == 1
+    assert "TRUNCATE TABLE #temp_discrepancies" in executed
+    assert sum("MERGE dbo.t" in sql for sql in executed) == 2
+    merge_sql = next(sql for sql in executed if "MERGE dbo.t" in sql)
+    assert "target.[column] IS NULL AND source.[column] IS NULL" in merge_sql
+
+
+def test_discrepancy_writer_delete_insert_clears_partition_once():
+    conn = DummyConn()
+    partition = {"year": "2024", "month": "05", "week": "1"}
+    with DiscrepancyWriter(
+        conn, "dbo", "t", batch_size=1, strategy="delete_insert", partition=partition
+    ) as writer:
+        writer.write({"primary_key": "1", "column": "a"})
+        writer.write({"primary_key": "2", "column": "a"})
+    executed = conn.cursor_obj.executed
+    assert sum("DELETE FROM dbo.t" in sql for sql in executed) == 1
+    assert sum(sql.startswith("INSERT INTO dbo.t (") for sql in executed) == 2
+    assert conn.commits == 3  # table creation and one per batch, the delete included
+    assert not any("MERGE" in sql for sql in executed)
+
+
+def test_discrepancy_writer_delete_insert_without_partition_deletes_keys():
+    conn = DummyConn()
+    with DiscrepancyWriter(conn, "dbo", "t", batch_size=5, strategy="delete_insert") as writer:
+        writer.write({"primary_key": "1", "column": None})
+    delete_sql = next(sql for sql in conn.cursor_obj.executed if sql.startswith("DELETE target"))
+    assert "target.[column] IS NULL AND source.[column] IS NULL" in delete_sql
+    with pytest.raises(ValueError):
+        DiscrepancyWriter(conn, "dbo", "t", strategy="upsert")
+
+
+def test_discrepancy_writer_without_keys_appends_batches():
+    conn = DummyConn()
+    with DiscrepancyWriter(conn, "dbo", "t", batch_size=3) as writer:
+        for i in range(4):
+            writer.write({"a": str(i), "b": "x"})
+    inserts = [sql for sql in conn.cursor_obj.executed if sql.startswith("INSERT INTO dbo.t")]
+    assert len(inserts) == 2 and inserts[0] is inserts[1]  # cached statement text
+    assert conn.cursor_obj.rowcount == 4
+    assert not any("MERGE" in sql or "#temp" in sql for sql in conn.cursor_obj.executed)
+
+
+def test_encode_record_moves_full_rows_to_payload():
+    record = {"primary_key": 1, "type": "missing_in_dest", "column": None,
+              "source_value": {"id": 1, "val": "x"}, "dest_value": None}
+    typed = encode_record(record, typed=True)
+    assert typed["type"] == "S"
+    assert typed["source_value"] is None
+    assert typed["payload"] == '{"id": 1, "val": "x"}'
+    legacy = encode_record(record)
+    assert legacy["type"] == "missing_in_dest" and "payload" not in legacy
+    assert legacy["source_value"] == typed["payload"]
+    assert encode_record({"a": 1}) == {"a": 1}
+
+
+def test_discrepancy_writer_creates_typed_indexed_table():
+    conn = DummyConn()
+    with DiscrepancyWriter(conn, "recon", "d", batch_size=5, typed=True) as writer:
+        writer.write({"primary_key": "1", "type": "mismatch", "column": "val",
+                      "source_value": "a", "dest_value": "b",
+                      "year": "2024", "month": "05", "week": "1"})
+    create_sql, *rest = conn.cursor_obj.executed
+    assert "[type] CHAR(1)" in create_sql and "[month] TINYINT" in create_sql
+    assert "[payload] VARBINARY(MAX)" in create_sql
+    assert ("CREATE CLUSTERED INDEX [CX_d_partition] ON recon.d "
+            "([year], [month], [week], [type], [column], [primary_key])") in create_sql
+    assert "[payload] NVARCHAR(MAX)" in next(sql for sql in rest if "CREATE TABLE #temp" in sql)
+    merge_sql = next(sql for sql in rest if "MERGE" in sql)
+    assert "COMPRESS(source.[payload])" in merge_sql
+
+
+def test_async_writer_encodes_typed_records():
+    conn = DummyConn()
+    with AsyncDiscrepancyWriter(conn, "recon", "d", batch_size=5, typed=True) as writer:
+        writer.write({"primary_key": 1, "type": "missing_in_dest", "column": None,
+                      "source_value": {"id": 1, "x": "a"}, "dest_value": None,
+                      "year": "2024", "month": "05", "week": "1"})
+    assert "[payload] VARBINARY(MAX)" in conn.cursor_obj.executed[0]
+    assert conn.cursor_obj.batches == [
+        [[1, "S", None, None, None, "2024", "05", "1", '{"id": 1, "x": "a"}']]
+    ]
+
+
+def test_delete_insert_clears_partition_without_discrepancies():
+    conn = DummyConn()
+    partition = {"year": "2024", "month": "05", "week": "1"}
+    with AsyncDiscrepancyWriter(
+        conn, "dbo", "t", strategy="delete_insert", partition=partition
+    ):
+        pass
+    assert sum("DELETE FROM dbo.t" in sql for sql in conn.cursor_obj.executed) == 1
+
+
+def test_discrepancy_writer_holds_write_slot_per_batch():
+    conn = DummyConn()
+    held = []
+
+    class Slot:
+        def __enter__(self):
+            held.append(len(conn.cursor_obj.executed))
+
+        def __exit__(self, *exc):
+            pass
+
+    with DiscrepancyWriter(conn, "dbo", "t", batch_size=2, write_slot=Slot) as writer:
+        for i in range(3):
+            writer.write({"primary_key": str(i), "column": "a"})
+    assert len(held) == 3  # table creation and two batches
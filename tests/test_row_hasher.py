@@ -0,0 +1,37 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from logic.comparison_plan import build_plan_from_rows
+from logic.comparator import compute_row_hash
+from logic.row_hasher import RowHasher
+
+
+def test_field_separators_prevent_concatenation_collisions():
+    hasher = RowHasher(["a", "b"])
+    assert hasher.hash_values(("ab", "c")) != hasher.hash_values(("a", "bc"))
+    assert hasher.hash_values((None, "x")) != hasher.hash_values(("NULL", "x"))
+
+
+def test_batch_api_matches_row_api_and_compute_row_hash():
+    rows = [
+        {"id": 1, "amount": Decimal("18.20"), "day": datetime(2021, 1, 1, 5), "name": " a "},
+        {"id": 2, "amount": "18.2", "day": "2021-01-01", "name": None},
+    ]
+    plan = build_plan_from_rows(rows, ["id", "amount", "day", "name"])
+    hasher = RowHasher.for_plan(plan)
+    assert hasher.columns == ("amount", "day", "id", "name")
+    expected = [compute_row_hash(row, plan) for row in rows]
+    assert hasher.hash_rows(rows) == expected
+    tuples = [tuple(row[c] for c in hasher.columns) for row in rows]
+    assert hasher.hash_batch(tuples) == expected
+    # equivalent values hash alike through the per-kind encoders
+    assert hasher.hash_values((18.2, date(2021, 1, 1), 1, "a")) == expected[0]
+
+
+def test_xxh3_128_and_unknown_algorithm():
+    assert len(RowHasher(["a"], algorithm="xxh3_128").hash_values(("x",))) == 32
+    with pytest.raises(ValueError):
+        RowHasher(["a"], algorithm="md5")
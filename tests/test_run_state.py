@@ -0,0 +1,65 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+
+import pytest
+
+from utils.run_state import RunState
+
+CONFIG = {
+    "source": {"schema": "s", "table": "t", "columns": {"id": "ID"}},
+    "destination": {"schema": "d", "table": "t", "columns": {"id": "id"}},
+    "primary_key": "id",
+    "output": {"schema": "recon", "table": "discrepancies"},
+}
+WEEK1 = {"year": "2024", "month": "05", "week": "1"}
+WEEK2 = {"year": "2024", "month": "05", "week": "2"}
+
+
+def test_run_state_resume_skips_done_and_cleans_interrupted(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = RunState.open(path, CONFIG)
+    state.start(WEEK1)
+    state.finish(WEEK1, source_rows=10, dest_rows=9, discrepancies=1)
+    state.start(WEEK2)
+    state.flushed(WEEK2, 1000)
+
+    saved = json.load(open(path))
+    assert saved["partitions"]["2024-05-W1"]["status"] == "done"
+    assert saved["partitions"]["2024-05-W2"]["flushed"] == 1000
+
+    resumed = RunState.open(path, CONFIG, resume=True)
+    assert resumed.is_done(WEEK1)
+    assert not resumed.is_done(WEEK2)
+    assert resumed.needs_cleanup(WEEK2)
+    resumed.start(WEEK2)
+    assert resumed.get(WEEK2)["attempts"] == 2
+
+    fresh = RunState.open(path, CONFIG)
+    assert not fresh.is_done(WEEK1)
+
+
+def test_run_state_records_failures_and_rejects_other_config(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = RunState.open(path, CONFIG)
+    state.start(WEEK1)
+    state.fail(WEEK1, RuntimeError("network dropped"))
+    assert state.needs_cleanup(WEEK1)
+    assert "network dropped" in state.get(WEEK1)["error"]
+
+    other = {**CONFIG, "source": {**CONFIG["source"], "table": "other"}}
+    with pytest.raises(ValueError):
+        RunState.open(path, other, resume=True)
+
+
+def test_watermark_survives_new_runs(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = RunState.open(path, CONFIG)
+    assert state.watermark() is None
+    state.complete()
+    mark = state.watermark()
+    assert mark is not None
+
+    assert RunState.open(path, CONFIG).watermark() == mark
+    assert RunState.open(path, CONFIG, resume=True).watermark() == mark
+    other = {**CONFIG, "primary_key": "other"}
+    assert RunState.open(path, other).watermark() is None
@@ -0,0 +1,100 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import (
+    ConcurrencyLimits,
+    RunProgress,
+    estimate_partition_size,
+    run_scheduled,
+)
+
+
+def test_run_scheduled_orders_by_size_and_keeps_result_order():
+    started = []
+
+    def run(task):
+        started.append(task)
+        return task * 10
+
+    results = run_scheduled([1, 2, 3], run, max_workers=1, sizes=[1.0, 5.0, 3.0])
+    assert started == [2, 3, 1]
+    assert results == [10, 20, 30]
+
+
+def test_run_scheduled_runs_concurrently_within_limits():
+    limits = ConcurrencyLimits({"source_read": 2})
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def run(task):
+        with limits.hold("source_read"):
+            with lock:
+                active.append(task)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(task)
+
+    run_scheduled(list(range(6)), run, max_workers=4)
+    assert max(peak) == 2
+
+
+def test_run_scheduled_staggers_starts():
+    starts = []
+    run_scheduled(
+        [0, 1, 2],
+        lambda t: starts.append(time.monotonic()),
+        max_workers=3,
+        stagger_seconds=0.03,
+    )
+    starts.sort()
+    assert all(b - a >= 0.025 for a, b in zip(starts, starts[1:]))
+
+
+def test_run_scheduled_reraises_and_skips_pending():
+    ran = []
+
+    def run(task):
+        ran.append(task)
+        if task == 0:
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        run_scheduled(list(range(5)), run, max_workers=1)
+    assert ran == [0]
+
+
+def test_run_progress_aggregates_partitions():
+    class Bar:
+        total = 2
+        n = 0
+        postfix = ""
+
+        def update(self, n):
+            self.n += n
+
+        def set_postfix_str(self, text):
+            self.postfix = text
+
+        def refresh(self):
+            pass
+
+        def close(self):
+            pass
+
+    progress = RunProgress(2, bar=Bar())
+    part = {"year": "2024", "month": "05", "week": "1"}
+    progress.start(part)
+    progress.total = 500  # set by the comparator per partition, ignored
+    progress.update(3)
+    progress.record(2)
+    assert "active=2024-05-W1" in progress.bar.postfix
+    progress.finish(part)
+    assert progress.bar.n == 1
+    assert progress.total == 2
+    assert progress.rows == 3 and progress.discrepancies == 2
+    assert estimate_partition_size(part) < estimate_partition_size({"year": "2024", "month": "05"})
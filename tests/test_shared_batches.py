@@ -0,0 +1,78 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import date, datetime
+from decimal import Decimal
+
+from logic.comparison_plan import build_plan_from_rows
+from logic.comparator import (
+    _compare_pair_batch,
+    compare_row_pairs_parallel_detailed,
+    compute_row_hash,
+    compute_row_hashes_parallel,
+)
+from logic.shared_batches import SharedBatch, compare_shared_batches, hash_shared_rows
+
+ROWS = [
+    {"id": 1, "amount": Decimal("1.50"), "day": date(2021, 1, 1), "name": " a ", "raw": b"\x01"},
+    {"id": 2, "amount": "oops", "day": "2021-02-03 10:00:00", "name": None, "raw": None},
+    {"id": 3, "amount": None, "day": "03/04/2021", "name": "c", "raw": b""},
+    {"id": 4, "amount": float("nan"), "day": None, "name": "", "raw": b"\xff"},
+]
+PLAN = build_plan_from_rows(
+    [{"id": 1, "amount": 1.0, "day": date(2021, 1, 1), "name": "a", "raw": b"\x00"}],
+    ["id", "amount", "day", "name", "raw"],
+)
+
+
+def test_shared_hashes_match_compute_row_hash():
+    with SharedBatch(ROWS, sorted(ROWS[0]), PLAN) as batch:
+        hashes = [f"{int(h):016x}" for h in hash_shared_rows(batch.layout, 0, len(ROWS))]
+    assert hashes == [compute_row_hash(row, PLAN) for row in ROWS]
+    assert compute_row_hashes_parallel(ROWS, workers=2, mode="process", plan=PLAN) == hashes
+
+
+def test_shared_comparison_matches_row_comparison():
+    config = {"primary_key": "id", "comparison": {"include_nulls": True}}
+    columns = ["amount", "day", "name", "raw"]
+    dest = [
+        {"id": 1, "amount": "1.500001", "day": "2021-01-01", "name": "a", "raw": b"\x01"},
+        {"id": 2, "amount": "oops", "day": datetime(2021, 2, 4), "name": None, "raw": None},
+        {"id": 3, "amount": 0, "day": date(2021, 3, 4), "name": "c", "raw": b""},
+        {"id": 4, "amount": None, "day": None, "name": "x", "raw": b"\xff"},
+    ]
+    with SharedBatch(ROWS, columns, PLAN) as src_batch, SharedBatch(dest, columns, PLAN) as dest_batch:
+        candidates = compare_shared_batches(src_batch.layout, dest_batch.layout)
+    assert (0, 0) not in candidates and (1, 1) in candidates
+
+    pairs = [(s, d, {"id": "id", **{c: c for c in columns}}, config) for s, d in zip(ROWS, dest)]
+    results = list(
+        compare_row_pairs_parallel_detailed(
+            pairs, workers=2, parallel_mode="process", plan=PLAN, batch_size=3
+        )
+    )
+    expected = _compare_pair_batch(
+        [(s, d, None) for s, d in zip(ROWS, dest)], ["id"] + columns, config, PLAN
+    )
+    assert results == expected
+    assert [r["primary_key"] for r in results] == [2, 3, 4]
+
+
+def test_discard_by_hash_reuses_one_process_pool(monkeypatch):
+    import logic.comparator as comparator
+    from concurrent.futures import ProcessPoolExecutor
+
+    pools = []
+
+    class CountingPool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(comparator, "ProcessPoolExecutor", CountingPool)
+    dest = [dict(row) for row in ROWS]
+    dest[1]["name"] = "changed"
+    src, dest, discarded, kept = comparator.discard_matching_rows_by_hash(
+        list(ROWS), dest, "id", workers=2, mode="process", plan=PLAN, chunk_size=2
+    )
+    assert len(pools) == 1
+    assert (discarded, kept) == (3, 1)
+    assert [r["id"] for r in src] == [r["id"] for r in dest] == [2]
@@ -0,0 +1,81 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import csv
+import gzip
+import json
+
+import pytest
+
+from logic.reporter import write_discrepancies_to_csv
+from logic.sinks import CsvSink, FileSink, JsonlSink, open_sink, sink_path
+
+WEEK1 = {"year": "2024", "month": "05", "week": "1"}
+RECORDS = [
+    {"primary_key": 1, "type": "mismatch", "column": "val", "source_value": "a", "dest_value": "b"},
+    {"primary_key": 2, "type": "missing_in_dest", "column": None,
+     "source_value": {"id": 2, "val": "c"}, "dest_value": None},
+]
+
+
+def test_open_sink_writes_partition_file_in_batches(tmp_path):
+    config = {"output": {"format": "jsonl", "directory": str(tmp_path), "table": "d",
+                         "batch_size": 1, "compression": "gzip"}}
+    flushed = []
+    with open_sink(config, WEEK1, on_flush=flushed.append) as sink:
+        for record in RECORDS:
+            sink.write(record)
+        assert not os.path.exists(sink.path)  # published on close only
+    assert flushed == [1, 2]
+    assert sink.path == sink_path(str(tmp_path), "d", WEEK1, "jsonl", "gzip")
+    assert sink.path.endswith(os.path.join("d", "2024-05-W1.jsonl.gz"))
+    with gzip.open(sink.path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == RECORDS
+
+
+def test_sink_discards_file_on_error(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with pytest.raises(RuntimeError):
+        with CsvSink(path, batch_size=1) as sink:
+            sink.write(RECORDS[0])
+            raise RuntimeError("boom")
+    assert os.listdir(tmp_path) == []
+
+
+def test_csv_sink_flattens_full_rows(tmp_path):
+    path = str(tmp_path / "out.csv")
+    write_discrepancies_to_csv(iter(RECORDS), path)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[1]["source_value"] == '{"id": 2, "val": "c"}'
+    write_discrepancies_to_csv(iter([]), str(tmp_path / "empty.csv"))
+    assert not os.path.exists(tmp_path / "empty.csv")
+
+
+def test_open_sink_rejects_unknown_format_and_compression(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink({"output": {"format": "xml"}})
+    with pytest.raises(ValueError):
+        JsonlSink(str(tmp_path / "x.jsonl"), compression="zstd")
+
+
+def test_parquet_sink_writes_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    config = {"output": {"format": "parquet", "directory": str(tmp_path), "table": "d",
+                         "row_group_rows": 1}}
+    with open_sink(config, WEEK1) as sink:
+        for record in RECORDS:
+            sink.write(record)
+    parquet = pq.ParquetFile(sink.path)
+    assert parquet.num_row_groups == 2
+    assert parquet.read().column("primary_key").to_pylist() == ["1", "2"]
+
+
+def test_incomplete_sink_fails_on_creation(tmp_path):
+    class NoWrite(FileSink):
+        def _open(self):
+            pass
+
+        def _close(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoWrite(str(tmp_path / "x"))
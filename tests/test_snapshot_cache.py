@@ -0,0 +1,73 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+
+import pytest
+
+from utils.snapshot_cache import SnapshotCache, cache_key
+
+ENV = {"host": "db1", "service": "ORCL", "user": "u", "password": "secret"}
+COLUMNS = {"id": "ID", "val": "VAL"}
+WEEK1 = {"year": "2024", "month": "05", "week": "1"}
+
+
+def add_fake_entry(cache, key, size, table="t", partition="2024-05"):
+    file = f"{key}.parquet"
+    with open(os.path.join(cache.directory, file), "wb") as f:
+        f.write(b"x" * size)
+    cache._add_entry(key, file, rows=1, columns=["id"], table=table, partition=partition)
+
+
+def test_cache_key_ignores_secrets_and_tracks_partition():
+    key = cache_key(ENV, "s", "t", COLUMNS, WEEK1)
+    assert key == cache_key({**ENV, "password": "other"}, "s", "t", COLUMNS, WEEK1)
+    assert key != cache_key({**ENV, "host": "db2"}, "s", "t", COLUMNS, WEEK1)
+    assert key != cache_key(ENV, "s", "t", COLUMNS, {**WEEK1, "week": "2"})
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SnapshotCache(str(tmp_path), max_bytes=250)
+    add_fake_entry(cache, "a", 100)
+    time.sleep(0.01)
+    add_fake_entry(cache, "b", 100)
+    time.sleep(0.01)
+    assert cache.lookup("a") is not None  # "a" is now the most recent
+    add_fake_entry(cache, "c", 100)
+    assert set(cache.index) == {"a", "c"}
+    assert cache.total_bytes() == 200
+    assert not os.path.exists(tmp_path / "b.parquet")
+
+    reopened = SnapshotCache(str(tmp_path), max_bytes=250)
+    assert set(reopened.index) == {"a", "c"}
+
+
+def test_cache_validation_and_invalidate(tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    add_fake_entry(cache, "a", 10, table="t1", partition="2024-05-W1")
+    add_fake_entry(cache, "b", 10, table="t2")
+    assert cache.lookup("a", expected_rows=2) is None  # stale, removed
+    assert "a" not in cache.index
+    add_fake_entry(cache, "a", 10, table="t1", partition="2024-05-W1")
+    assert cache.invalidate(table="t1", partition=WEEK1) == 1
+    assert cache.invalidate() == 1
+    assert cache.index == {}
+
+
+def test_cache_tee_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    cache = SnapshotCache(str(tmp_path), batch_rows=2)
+    rows = [{"id": i, "val": f"v{i}"} for i in range(5)]
+    key = cache_key(ENV, "s", "t", COLUMNS, WEEK1)
+    assert list(cache.tee(key, iter(rows), list(COLUMNS), table="t", partition=WEEK1)) == rows
+    assert cache.lookup(key, expected_rows=5)["partition"] == "2024-05-W1"
+    assert list(cache.rows(key)) == rows
+    assert list(cache.rows(key, "tuple")) == [(r["id"], r["val"]) for r in rows]
+
+
+def test_cache_tee_abandoned_stream_leaves_no_entry(tmp_path):
+    pytest.importorskip("pyarrow")
+    cache = SnapshotCache(str(tmp_path), batch_rows=2)
+    stream = cache.tee("k", iter([(1, "a"), (2, "b"), (3, "c")]), ["id", "val"])
+    next(stream)
+    stream.close()
+    assert cache.index == {}
+    assert not any(name.endswith(".parquet") for name in os.listdir(tmp_path))
@@ -17,6 +17,8 @@ def format_partition(partition: dict) -> str:
         parts.append(str(month))
     if week is not None:
         parts.append(f"W{week}")
+    if partition.get("range") is not None:
+        parts.append(f"R{partition['range']}")
 
     return "-".join(parts)
 
@@ -0,0 +1,112 @@
+"""Adaptive ``fetchmany`` sizing for :func:`runners.reconcile.fetch_rows`."""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Optional, Sequence
+
+# Python object overhead added to every fetched value on top of its payload.
+_VALUE_OVERHEAD = 56
+# Width assumed for columns whose description carries no size.
+_DEFAULT_COLUMN_BYTES = 32
+
+
+def estimate_row_bytes(description: Optional[Sequence[Sequence[Any]]]) -> int:
+    """Estimate the in-memory size of one fetched row from ``cursor.description``.
+
+    Uses each column's ``internal_size`` (or ``display_size``) capped at 4000
+    bytes so LOB columns reporting huge sizes do not dominate the estimate.
+    """
+    if not description:
+        return _DEFAULT_COLUMN_BYTES + _VALUE_OVERHEAD
+    total = 0
+    for desc in description:
+        size = None
+        if len(desc) > 3:
+            size = desc[3] or desc[2]
+        if not isinstance(size, int) or size <= 0:
+            size = _DEFAULT_COLUMN_BYTES
+        total += min(size, 4000) + _VALUE_OVERHEAD
+    return total
+
+
+def measure_row_bytes(row: Sequence[Any]) -> int:
+    """Return the approximate in-memory size of one fetched row."""
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+
+class BatchSizer:
+    """Grow or shrink the fetch batch from measured round trips.
+
+    The first batch holds ``initial_rows`` or, when omitted, as many rows as
+    fit ``start_bytes`` according to the row width estimated from the cursor
+    description. After each full batch the size doubles while a round trip
+    takes under half of ``target_seconds`` and halves once it takes more than
+    twice that. Measured row sizes keep the batch within
+    ``memory_budget_mb`` and the result always stays between ``min_rows`` and
+    ``max_rows``.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_rows: Optional[int] = None,
+        min_rows: int = 100,
+        max_rows: int = 100_000,
+        memory_budget_mb: float = 64,
+        target_seconds: float = 0.5,
+        start_bytes: int = 1024 * 1024,
+    ):
+        self.min_rows = max(1, int(min_rows))
+        self.max_rows = max(self.min_rows, int(max_rows))
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.target_seconds = target_seconds
+        self.start_bytes = start_bytes
+        self.initial_rows = initial_rows
+        self.row_bytes: Optional[float] = None
+        self.size = self._clamp(initial_rows or 1000)
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> Optional["BatchSizer"]:
+        """Build a sizer from a side's ``fetch`` YAML section.
+
+        Returns ``None`` when ``adaptive`` is false so the caller keeps the
+        fixed ``batch_size``.
+        """
+        cfg = cfg or {}
+        if not cfg.get("adaptive", True):
+            return None
+        keys = ("min_rows", "max_rows", "memory_budget_mb", "target_seconds")
+        return cls(
+            initial_rows=cfg.get("batch_size"),
+            **{k: cfg[k] for k in keys if cfg.get(k) is not None},
+        )
+
+    def _clamp(self, rows: float) -> int:
+        upper = self.max_rows
+        if self.row_bytes:
+            upper = min(upper, max(self.min_rows, int(self.memory_budget // self.row_bytes)))
+        return int(max(self.min_rows, min(upper, rows)))
+
+    def start(self, description: Optional[Sequence[Sequence[Any]]]) -> int:
+        """Seed the row width from *description* and return the first size."""
+        self.row_bytes = float(estimate_row_bytes(description))
+        if self.initial_rows:
+            self.size = self._clamp(self.initial_rows)
+        else:
+            self.size = self._clamp(self.start_bytes // self.row_bytes)
+        return self.size
+
+    def observe(self, rows: Sequence[Sequence[Any]], seconds: float) -> int:
+        """Record one ``fetchmany`` result and return the next batch size."""
+        if not rows:
+            return self.size
+        measured = measure_row_bytes(rows[0])
+        self.row_bytes = measured if self.row_bytes is None else 0.5 * (self.row_bytes + measured)
+        size = self.size
+        if len(rows) >= size and seconds < self.target_seconds / 2:
+            size *= 2
+        elif seconds > self.target_seconds * 2:
+            size //= 2
+        self.size = self._clamp(size)
+        return self.size
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+import atexit
 import os
+import queue
+import threading
+from typing import Any, Callable, Optional, Union
+
+RANKS = {"low": 1, "medium": 2, "high": 3}
 
 
 def _get_config_level(config: dict | None) -> str:
@@ -21,12 +27,182 @@ def _get_config_level(config: dict | None) -> str:
 
 
 LOG_FILE = os.getenv("DEBUG_LOG_FILE", "debug.log")
+LOG_MAX_BYTES = int(os.getenv("DEBUG_LOG_MAX_BYTES", str(100 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("DEBUG_LOG_BACKUPS", "5"))
+
+# ``id(config) -> (config, raw debug value, rank)``. The raw value is kept so
+# a config whose ``debug`` entry changes is re-resolved.
+_LEVEL_CACHE: dict = {}
+_STOP = object()
+
+
+def _config_rank(config: dict | None) -> int:
+    if not config:
+        return RANKS["low"]
+    raw = config.get("debug", False)
+    entry = _LEVEL_CACHE.get(id(config))
+    if entry is not None and entry[0] is config and entry[1] == raw:
+        return entry[2]
+    if len(_LEVEL_CACHE) > 256:
+        _LEVEL_CACHE.clear()
+    rank = RANKS[_get_config_level(config)]
+    _LEVEL_CACHE[id(config)] = (config, raw, rank)
+    return rank
+
+
+def log_enabled(level: str, config: dict | None = None) -> bool:
+    """Return ``True`` if a message at *level* would be written for *config*.
+
+    Use it to skip building expensive diagnostics altogether.
+    """
+    return _config_rank(config) >= RANKS.get(level, 3)
+
+
+class _LogWriter:
+    """Append lines to a size-rotated file from a background thread.
+
+    Callers only enqueue strings. The writer drains everything queued,
+    writes it through one buffered handle and flushes once per drain, so
+    bursts cost a single system call. When the file reaches ``max_bytes`` it
+    is renamed to ``<path>.1`` (older backups shift up to ``backups``).
+    """
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.pid = os.getpid()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="debug-log", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        self._queue.put(line)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _open(self):
+        handle = open(self.path, "a", encoding="utf-8", buffering=1 << 16)
+        return handle, handle.tell()
+
+    def _rotate(self, handle):
+        handle.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        return self._open()
+
+    def _run(self) -> None:
+        handle, size = self._open()
+        try:
+            while True:
+                items = [self._queue.get()]
+                while True:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                waiters = []
+                for item in items:
+                    if item is _STOP:
+                        handle.flush()
+                        for event in waiters:
+                            event.set()
+                        return
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                        continue
+                    handle.write(item)
+                    size += len(item)
+                    if self.max_bytes and size >= self.max_bytes:
+                        handle, size = self._rotate(handle)
+                handle.flush()
+                for event in waiters:
+                    event.set()
+        finally:
+            handle.close()
+
+
+_writer: Optional[_LogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _LogWriter:
+    global _writer
+    writer = _writer
+    # A forked worker inherits the object but not the writer thread.
+    if writer is None or writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = _LogWriter(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUPS)
+            writer = _writer
+    return writer
+
+
+def configure_logging(
+    path: Optional[str] = None,
+    *,
+    max_bytes: Optional[int] = None,
+    backups: Optional[int] = None,
+) -> None:
+    """Change the log file or rotation settings, flushing pending messages."""
+    global LOG_FILE, LOG_MAX_BYTES, LOG_BACKUPS
+    shutdown_logging()
+    if path:
+        LOG_FILE = path
+    if max_bytes is not None:
+        LOG_MAX_BYTES = int(max_bytes)
+    if backups is not None:
+        LOG_BACKUPS = int(backups)
+
+
+def flush_logs(timeout: Optional[float] = 5.0) -> None:
+    """Block until every queued message has been written."""
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.flush(timeout)
+
+
+def shutdown_logging(timeout: Optional[float] = 5.0) -> None:
+    """Write pending messages and stop the writer thread."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None and writer.pid == os.getpid():
+        writer.close(timeout)
+
+
+atexit.register(shutdown_logging)
+
 
+def debug_log(
+    message: Union[str, Callable[[], str]],
+    config: dict | None = None,
+    *args: Any,
+    level: str = "high",
+) -> None:
+    """Write debug *message* to ``LOG_FILE`` when enabled.
 
-def debug_log(message: str, config: dict | None = None, *, level: str = "high") -> None:
-    """Write debug *message* to ``LOG_FILE`` when enabled."""
-    current = _get_config_level(config)
-    ranks = {"low": 1, "medium": 2, "high": 3}
-    if ranks.get(current, 1) >= ranks.get(level, 3):
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(f"{message}\n")
+    The level check runs before the message is built: pass ``%``-style
+    *args* or a zero-argument callable instead of an f-string when the
+    message is expensive, e.g. ``debug_log("WRITING: %s", config, record)``.
+    Lines are written asynchronously; call :func:`flush_logs` to wait.
+    """
+    if _config_rank(config) < RANKS.get(level, 3):
+        return
+    if callable(message):
+        message = message()
+    elif args:
+        message = message % args
+    _get_writer().write(f"{message}\n")
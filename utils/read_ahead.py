@@ -0,0 +1,134 @@
+"""Bounded background read-ahead for row iterators."""
+
+from __future__ import annotations
+
+import queue
+import threading
+from collections import deque
+from typing import Any, Iterable, Iterator, List
+
+
+class _Failure:
+    """Wrap an exception raised by the producer thread."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+_DONE = object()
+
+
+class ReadAhead(Iterator[Any]):
+    """Consume *iterable* on a background thread through a bounded queue.
+
+    Items are handed over in lists of ``batch_size`` and at most
+    ``max_batches`` lists are buffered, so memory stays bounded while the
+    producer (typically :func:`runners.reconcile.fetch_rows`) keeps fetching
+    as the consumer works. Exceptions raised by the producer are re-raised
+    from :meth:`__next__`. Fetching starts as soon as the object is created.
+    """
+
+    def __init__(
+        self,
+        iterable: Iterable[Any],
+        *,
+        max_batches: int = 8,
+        batch_size: int = 1000,
+        name: str = "read-ahead",
+    ):
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_batches))
+        self._stop = threading.Event()
+        self._pending: deque = deque()
+        self._finished = False
+        self.batch_size = max(1, batch_size)
+        self.count = 0
+        self._thread = threading.Thread(
+            target=self._produce, args=(iter(iterable),), name=name, daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, iterator: Iterator[Any]) -> None:
+        try:
+            batch: List[Any] = []
+            for item in iterator:
+                if self._stop.is_set():
+                    return
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+            if batch and not self._put(batch):
+                return
+            self._put(_DONE)
+        except BaseException as exc:  # propagate to the consumer
+            self._put(_Failure(exc))
+        finally:
+            # Close the source on this thread so its cursor is released
+            # before close() returns and the connection is reused.
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    def _fill(self) -> bool:
+        """Move the next batch into the pending buffer. Return ``False`` at EOF."""
+        if self._finished:
+            return False
+        item = self._queue.get()
+        if item is _DONE:
+            self._finished = True
+            return False
+        if isinstance(item, _Failure):
+            self._finished = True
+            raise item.exc
+        self._pending.extend(item)
+        return True
+
+    def peek(self, n: int) -> List[Any]:
+        """Return up to *n* upcoming items without consuming them."""
+        while len(self._pending) < n and self._fill():
+            pass
+        return [self._pending[i] for i in range(min(n, len(self._pending)))]
+
+    def __iter__(self) -> "ReadAhead":
+        return self
+
+    def __next__(self) -> Any:
+        while not self._pending:
+            if not self._fill():
+                raise StopIteration
+        self.count += 1
+        return self._pending.popleft()
+
+    def close(self) -> None:
+        """Stop the producer thread and discard buffered items.
+
+        Waits until the producer has finished its current fetch and closed
+        the source iterator, so the caller may release the connection.
+        """
+        self._stop.set()
+        self._pending.clear()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+
+    def __enter__(self) -> "ReadAhead":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
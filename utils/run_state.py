@@ -0,0 +1,171 @@
+"""Persistent per-partition progress used to resume interrupted runs.
+
+The state is a small JSON document rewritten atomically on every change::
+
+    {
+      "fingerprint": "...",
+      "started_at": "...",
+      "partitions": {
+        "2024-05-W1": {"status": "done", "source_rows": 10, "dest_rows": 10,
+                       "discrepancies": 2, "flushed": 2, ...}
+      }
+    }
+
+Partitions are keyed by :func:`utils.format_partition`. A partition whose
+status is ``running`` or ``failed`` was interrupted after it may have written
+discrepancies, so the runner clears its output rows before processing it
+again. Primary key split points of oversized partitions are kept under
+``splits`` so a resumed run reuses the same ranges. ``watermark`` holds the
+start time of the last run that completed every partition; it survives new
+runs and drives the incremental mode.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from utils import format_partition
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Config entries identifying the compared tables. Resuming with different
+# values would mix results of unrelated runs.
+_FINGERPRINT_KEYS = ("source", "destination", "primary_key", "output")
+_FINGERPRINT_FIELDS = ("schema", "table", "columns")
+
+
+def config_fingerprint(config: dict) -> str:
+    """Return a digest of the tables, columns and output *config* compares."""
+    ident: Dict[str, Any] = {}
+    for key in _FINGERPRINT_KEYS:
+        value = config.get(key)
+        if isinstance(value, dict):
+            value = {f: value.get(f) for f in _FINGERPRINT_FIELDS}
+        ident[key] = value
+    payload = json.dumps(ident, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class RunState:
+    """Thread-safe record of each partition's status and counters."""
+
+    def __init__(self, path: str, fingerprint: str, data: Optional[dict] = None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.data = data or {
+            "fingerprint": fingerprint,
+            "started_at": datetime.now().isoformat(),
+            "partitions": {},
+        }
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str, config: dict, *, resume: bool = False) -> "RunState":
+        """Load the state at *path* when resuming, otherwise start a new one.
+
+        Raises ``ValueError`` when the saved state belongs to a run over
+        different tables.
+        """
+        fingerprint = config_fingerprint(config)
+        data = None
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        if resume and data is not None:
+            if data.get("fingerprint") != fingerprint:
+                raise ValueError(
+                    f"Run state {path} was written for a different configuration"
+                )
+            state = cls(path, fingerprint, data)
+        else:
+            state = cls(path, fingerprint)
+            if data is not None and data.get("fingerprint") == fingerprint:
+                # A new run keeps the watermark of the last complete one.
+                if data.get("watermark"):
+                    state.data["watermark"] = data["watermark"]
+        state.save()
+        return state
+
+    def save(self) -> None:
+        """Write the state atomically so a crash never leaves a torn file."""
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+
+    def _update(self, partition: dict, **fields: Any) -> None:
+        with self._lock:
+            entry = self.data["partitions"].setdefault(format_partition(partition), {})
+            entry.update(fields)
+            self._save()
+
+    def watermark(self) -> Optional[datetime]:
+        """Return the start time of the last complete run, if any."""
+        with self._lock:
+            value = self.data.get("watermark")
+        return datetime.fromisoformat(value) if value else None
+
+    def complete(self) -> None:
+        """Mark the run complete, advancing the watermark to its start time."""
+        with self._lock:
+            self.data["watermark"] = self.data["started_at"]
+            self.data["completed_at"] = datetime.now().isoformat()
+            self._save()
+
+    def boundaries(self, partition: dict) -> Optional[list]:
+        """Return the saved primary key split points of *partition*, if any."""
+        with self._lock:
+            return self.data.get("splits", {}).get(format_partition(partition))
+
+    def set_boundaries(self, partition: dict, boundaries: list) -> None:
+        """Save *partition*'s split points so a resumed run reuses its ranges."""
+        with self._lock:
+            self.data.setdefault("splits", {})[format_partition(partition)] = list(boundaries)
+            self._save()
+
+    def get(self, partition: dict) -> dict:
+        with self._lock:
+            return dict(self.data["partitions"].get(format_partition(partition), {}))
+
+    def status(self, partition: dict) -> Optional[str]:
+        return self.get(partition).get("status")
+
+    def is_done(self, partition: dict) -> bool:
+        return self.status(partition) == DONE
+
+    def needs_cleanup(self, partition: dict) -> bool:
+        """Return ``True`` if an earlier attempt may have written output rows."""
+        return self.status(partition) in (RUNNING, FAILED)
+
+    def start(self, partition: dict) -> None:
+        attempts = self.get(partition).get("attempts", 0) + 1
+        self._update(
+            partition,
+            status=RUNNING,
+            attempts=attempts,
+            started_at=datetime.now().isoformat(),
+            flushed=0,
+        )
+
+    def flushed(self, partition: dict, count: int) -> None:
+        """Record that *count* discrepancy records reached the output table."""
+        self._update(partition, flushed=count)
+
+    def finish(self, partition: dict, **counts: Any) -> None:
+        self._update(
+            partition, status=DONE, finished_at=datetime.now().isoformat(), **counts
+        )
+
+    def fail(self, partition: dict, error: BaseException) -> None:
+        self._update(partition, status=FAILED, error=f"{type(error).__name__}: {error}")
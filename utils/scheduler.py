@@ -0,0 +1,176 @@
+"""Run reconciliation partitions concurrently.
+
+:func:`run_scheduled` processes partitions on a thread pool, largest first,
+optionally staggering their starts. Inside a partition the runner holds
+named :class:`ConcurrencyLimits` slots (``source_read``,
+``destination_read`` and ``destination_write``) so each database sees a
+bounded number of concurrent queries no matter how many partitions run.
+:class:`RunProgress` aggregates every partition into one progress bar.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from tqdm import tqdm
+
+from utils import format_partition
+
+# Rows in a month-only partition relative to a weekly one.
+MONTH_WEIGHT = 4.3
+
+
+class ConcurrencyLimits:
+    """Named bounded semaphores capping concurrent work per resource.
+
+    Names without a configured limit are unbounded. Acquire slots in a fixed
+    order (reads before writes) to avoid deadlocks between partitions.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Optional[int]]] = None):
+        self.limits = {k: int(v) for k, v in (limits or {}).items() if v}
+        self._sems = {k: threading.BoundedSemaphore(v) for k, v in self.limits.items()}
+
+    def acquire(self, name: str) -> None:
+        sem = self._sems.get(name)
+        if sem is not None:
+            sem.acquire()
+
+    def release(self, name: str) -> None:
+        sem = self._sems.get(name)
+        if sem is not None:
+            sem.release()
+
+    @contextmanager
+    def hold(self, name: str) -> Iterator[None]:
+        """Context manager holding one *name* slot for the block."""
+        self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+
+def estimate_partition_size(partition: dict) -> float:
+    """Return a relative size for *partition* when no row count is known."""
+    weight = 1.0 if partition.get("week") else MONTH_WEIGHT
+    return weight / partition.get("ranges", 1)
+
+
+class RunProgress:
+    """One progress bar over all partitions of a run.
+
+    The bar counts finished partitions and shows rows compared, discrepancies
+    written and the partitions in flight as postfix. It accepts the
+    ``update``/``total``/``refresh`` calls :func:`logic.comparator.compare_row_pairs`
+    makes on a progress object, counting them as compared rows, so it can be
+    shared by partitions running concurrently.
+    """
+
+    def __init__(self, total: int, *, desc: str = "partitions", bar: Any = None):
+        self.bar = bar if bar is not None else tqdm(total=total, desc=desc, unit="part")
+        self.rows = 0
+        self.discrepancies = 0
+        self.active: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> Optional[int]:
+        return self.bar.total
+
+    @total.setter
+    def total(self, value: Optional[int]) -> None:
+        # Per-partition totals from the comparator do not apply to the run.
+        pass
+
+    def _postfix(self) -> None:
+        self.bar.set_postfix_str(
+            f"rows={self.rows} discrepancies={self.discrepancies} "
+            f"active={','.join(self.active) or '-'}"
+        )
+
+    def start(self, partition: dict) -> None:
+        with self._lock:
+            self.active.append(format_partition(partition))
+            self._postfix()
+
+    def finish(self, partition: dict) -> None:
+        with self._lock:
+            label = format_partition(partition)
+            if label in self.active:
+                self.active.remove(label)
+            self.bar.update(1)
+            self._postfix()
+
+    def update(self, rows: int = 1) -> None:
+        with self._lock:
+            self.rows += rows
+            self._postfix()
+
+    def record(self, count: int = 1) -> None:
+        """Count *count* discrepancy records written."""
+        with self._lock:
+            self.discrepancies += count
+
+    def refresh(self) -> None:
+        self.bar.refresh()
+
+    def close(self) -> None:
+        self.bar.close()
+
+    def __enter__(self) -> "RunProgress":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def run_scheduled(
+    tasks: Sequence[Any],
+    run: Callable[[Any], Any],
+    *,
+    max_workers: int = 1,
+    stagger_seconds: float = 0.0,
+    sizes: Optional[Sequence[float]] = None,
+) -> List[Any]:
+    """Call ``run(task)`` for every task on up to *max_workers* threads.
+
+    Tasks start largest first when *sizes* are given so long partitions do
+    not trail at the end of the run. Consecutive starts are at least
+    *stagger_seconds* apart. Results are returned in the original task
+    order. The first failure cancels tasks that have not started and is
+    re-raised once running tasks have finished.
+    """
+    order = list(range(len(tasks)))
+    if sizes is not None:
+        order.sort(key=lambda i: sizes[i], reverse=True)
+
+    gate = threading.Lock()
+    last_start = [float("-inf")]
+
+    def start(i: int) -> Any:
+        if stagger_seconds > 0:
+            with gate:
+                delay = last_start[0] + stagger_seconds - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                last_start[0] = time.monotonic()
+        return run(tasks[i])
+
+    results: List[Any] = [None] * len(tasks)
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        futures = {executor.submit(start, i): i for i in order}
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = [f for f in done if f.exception() is not None]
+        if failed:
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            raise failed[0].exception()
+        for future, i in futures.items():
+            results[i] = future.result()
+    return results
@@ -0,0 +1,296 @@
+"""On-disk Parquet cache of fetched partitions.
+
+:meth:`SnapshotCache.tee` writes rows to a Parquet file while they stream
+from :func:`runners.reconcile.fetch_rows`; :meth:`SnapshotCache.rows` reads
+a complete entry back through a memory-mapped Arrow file instead of querying
+the database again. Entries are keyed by connection, table, column set and
+partition (see :func:`cache_key`) and record their row count, which callers
+compare with a ``COUNT(*)`` before trusting an entry. The total size is
+bounded by least-recently-used eviction and entries can be invalidated
+explicitly.
+
+``pyarrow`` is optional; :func:`require_pyarrow` raises a helpful error when
+the cache is enabled without it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from utils import format_partition
+from utils.logger import debug_log
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+INDEX_FILE = "index.json"
+# Environment entries never included in keys.
+_SECRET_KEYS = ("password",)
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError(
+            "The snapshot cache needs 'pyarrow'. Install it via pip: pip install pyarrow"
+        )
+
+
+def cache_key(env: dict, schema: str, table: str, columns: dict, partition: dict) -> str:
+    """Return the cache key of one side's *partition*.
+
+    The connection is identified by its environment entries without secrets,
+    so the same table on another server gets its own entries.
+    """
+    ident = {
+        "connection": {k: v for k, v in sorted(env.items()) if k not in _SECRET_KEYS},
+        "schema": schema,
+        "table": table,
+        "columns": list(columns.items()),
+        "partition": {k: partition[k] for k in sorted(partition)},
+    }
+    payload = json.dumps(ident, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SnapshotCache:
+    """A size-bounded directory of Parquet partition snapshots.
+
+    The index (``index.json``) maps each key to its file, row count, size,
+    table, partition label and last use time. It is rewritten atomically and
+    guarded by a lock so partitions running on threads share one cache.
+    """
+
+    def __init__(self, directory: str, *, max_bytes: int = 10 * 1024**3, batch_rows: int = 50_000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self.index: Dict[str, dict] = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+        # Drop entries whose file disappeared.
+        self.index = {
+            k: v for k, v in self.index.items()
+            if os.path.exists(os.path.join(directory, v["file"]))
+        }
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["SnapshotCache"]:
+        """Build the cache from the ``cache`` section, ``None`` if disabled."""
+        cfg = config.get("cache") or {}
+        if not cfg.get("enabled"):
+            return None
+        require_pyarrow()
+        return cls(
+            cfg.get("directory", ".snapshot_cache"),
+            max_bytes=int(cfg.get("max_gb", 10) * 1024**3),
+        )
+
+    # -- index ---------------------------------------------------------------
+
+    def _save_index(self) -> None:
+        tmp = f"{self._index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp, self._index_path)
+
+    def _remove(self, key: str) -> None:
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except FileNotFoundError:
+                pass
+
+    def _add_entry(self, key: str, file: str, **meta: Any) -> None:
+        with self._lock:
+            self._remove(key)
+            self.index[key] = {
+                "file": file,
+                "bytes": os.path.getsize(os.path.join(self.directory, file)),
+                "created": time.time(),
+                "last_used": time.time(),
+                **meta,
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self) -> None:
+        total = sum(e["bytes"] for e in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]["bytes"]
+            debug_log(
+                "Evicting cached %s %s", None, self.index[key].get("table"),
+                self.index[key].get("partition"), level="medium",
+            )
+            self._remove(key)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(e["bytes"] for e in self.index.values())
+
+    def entry(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self.index.get(key)
+            return dict(entry) if entry is not None else None
+
+    def lookup(self, key: str, expected_rows: Optional[int] = None) -> Optional[dict]:
+        """Return the entry for *key* if present and still valid.
+
+        An entry whose row count differs from *expected_rows* is removed.
+        """
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            if expected_rows is not None and entry["rows"] != expected_rows:
+                debug_log(
+                    "Cached %s %s is stale (%s rows cached, %s now)", None,
+                    entry.get("table"), entry.get("partition"), entry["rows"],
+                    expected_rows, level="low",
+                )
+                self._remove(key)
+                self._save_index()
+                return None
+            entry["last_used"] = time.time()
+            self._save_index()
+            return dict(entry)
+
+    def invalidate(
+        self,
+        key: Optional[str] = None,
+        *,
+        table: Optional[str] = None,
+        partition: Optional[dict] = None,
+    ) -> int:
+        """Remove matching entries and return how many were removed.
+
+        Without arguments the whole cache is cleared.
+        """
+        label = format_partition(partition) if partition is not None else None
+        with self._lock:
+            keys = [
+                k for k, e in self.index.items()
+                if (key is None or k == key)
+                and (table is None or e.get("table") == table)
+                and (label is None or e.get("partition") == label)
+            ]
+            for k in keys:
+                self._remove(k)
+            self._save_index()
+        return len(keys)
+
+    # -- data ----------------------------------------------------------------
+
+    def tee(
+        self,
+        key: str,
+        rows: Iterable[Any],
+        columns: Sequence[str],
+        *,
+        table: str = "",
+        partition: Optional[dict] = None,
+    ) -> Iterator[Any]:
+        """Yield *rows* unchanged while writing them to a new entry for *key*.
+
+        Rows may be dictionaries or tuples in *columns* order. The entry is
+        only registered once the iterator is exhausted; an abandoned stream
+        or values that do not fit the schema inferred from the first batch
+        leave no entry behind.
+        """
+        require_pyarrow()
+        columns = list(columns)
+        file = f"{key}.{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(self.directory, file)
+        writer = None
+        failed = False
+        count = 0
+        batch: List[Any] = []
+
+        def flush() -> None:
+            nonlocal writer, failed
+            if failed or not batch:
+                batch.clear()
+                return
+            if isinstance(batch[0], dict):
+                data = {c: [r.get(c) for r in batch] for c in columns}
+            else:
+                data = {c: [r[i] for r in batch] for i, c in enumerate(columns)}
+            try:
+                if writer is None:
+                    arrow = pa.Table.from_pydict(data)
+                    writer = pq.ParquetWriter(path, arrow.schema)
+                else:
+                    arrow = pa.Table.from_pydict(data, schema=writer.schema_arrow)
+                writer.write_table(arrow)
+            except (pa.ArrowException, ValueError, TypeError) as exc:
+                debug_log(f"Not caching {table} {partition}: {exc}", None, level="low")
+                failed = True
+            batch.clear()
+
+        completed = False
+        try:
+            for row in rows:
+                count += 1
+                batch.append(row)
+                if len(batch) >= self.batch_rows:
+                    flush()
+                yield row
+            flush()
+            completed = not failed
+        finally:
+            if writer is None and completed:
+                # Empty partitions still get an entry with the column names.
+                writer = pq.ParquetWriter(
+                    path, pa.schema([(c, pa.null()) for c in columns])
+                )
+            if writer is not None:
+                writer.close()
+            if completed:
+                self._add_entry(
+                    key,
+                    file,
+                    rows=count,
+                    columns=columns,
+                    table=table,
+                    partition=format_partition(partition or {}),
+                )
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def rows(self, key: str, row_mode: str = "dict") -> Iterator[Any]:
+        """Yield the cached rows of *key* from a memory-mapped file.
+
+        ``row_mode`` matches :func:`runners.reconcile.fetch_rows`: dictionaries
+        or tuples in the cached column order.
+        """
+        require_pyarrow()
+        entry = self.entry(key)
+        if entry is None:
+            raise KeyError(key)
+        source = pa.memory_map(os.path.join(self.directory, entry["file"]))
+        try:
+            parquet = pq.ParquetFile(source)
+            for record_batch in parquet.iter_batches(batch_size=self.batch_rows):
+                if row_mode == "tuple":
+                    values = [col.to_pylist() for col in record_batch.columns]
+                    yield from zip(*values)
+                else:
+                    yield from record_batch.to_pylist()
+        finally:
+            source.close()